@@ -1,20 +1,38 @@
-from fastapi import FastAPI, UploadFile, File, HTTPException, Depends
+from fastapi import FastAPI, UploadFile, File, HTTPException, Depends, Request, Response, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, EmailStr
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
-from db import get_db, init_db
-from models import User, WeeklyUsage
-from auth import hash_password, verify_password, create_access_token, get_current_user
-from engine.transcriber import Transcriber
-from datetime import date, timedelta
-import tempfile
+from db import get_db, init_db, close_db, ping_db, pool_stats, SessionLocal
+from models import User
+from auth import hash_password, verify_password, create_access_token, get_current_user, user_from_token, require_admin, invalidate_user, password_pool
+from engine.streaming import StreamingSession
+from engine.decoding import load_audio
+from engine.registry import ModelRegistry
+from engine.uploads import UploadStore, ChunkOutOfOrder, TooManyUploads, trim_pcm
+from engine.long_audio import plan_chunks, stitch_piece, text_of
+from workers import WorkerPool, PoolSaturated
+from inference import InferenceClient
+from cache import ResultCache, TTLCache
+from usage import UsageCounter, ensure_usage_index, increment_usage, get_week_start, record_reports
+from corrections import create_correction, resolve_correction, get_correction
+from config import (
+    BEAM_SIZE, LANGUAGE, VAD_FILTER, VAD_PARAMETERS, INFERENCE_WORKERS, INFERENCE_QUEUE_DEPTH,
+    MODEL_SPECS, FREE_MODEL, PRO_MODEL, FAST_MODEL, MEMORY_BUDGET_MB, INFERENCE_SOCKETS, build_engine,
+)
+from jobs import JobQueue, create_job, get_job, queue_position, QUEUED, RUNNING, DONE, FAILED
+import metrics
+import asyncio
+import json
+import time
 import os
-import uuid
 
 app = FastAPI(title="Vox Easy API", version="1.0.0")
 
+if metrics.METRICS_ENABLED:
+    app.add_middleware(metrics.MetricsMiddleware)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -24,13 +42,116 @@ app.add_middleware(
 )
 
 FREE_WORD_LIMIT = 3000
+# Batch usage writes every USAGE_FLUSH_MS (0 = write each one through)
+USAGE_FLUSH_MS = int(os.getenv("USAGE_FLUSH_MS", "0"))
+# Cached weekly counts are re-read from the DB after this long, so words
+# charged by other workers are seen
+USAGE_CACHE_TTL_S = float(os.getenv("USAGE_CACHE_TTL_S", "5"))
+READY_DB_TIMEOUT_S = float(os.getenv("READY_DB_TIMEOUT_S", "2"))
+
+# Model and inference pool settings live in config.py
+
+# Upload formats offered to clients, most compact first. All of them are
+# decoded in memory (see engine.decoding).
+UPLOAD_FORMATS = [
+    f.strip() for f in os.getenv("UPLOAD_FORMATS", "opus,flac,wav").split(",") if f.strip()
+]
+
+# Result cache keyed by audio content hash plus decode options; repeat
+# uploads return the stored text and are only charged once per user.
+# RESULT_CACHE_DIR adds an on-disk tier shared across restarts.
+RESULT_CACHE_SIZE = int(os.getenv("RESULT_CACHE_SIZE", "1024"))
+RESULT_CACHE_TTL = int(os.getenv("RESULT_CACHE_TTL", "3600"))
+RESULT_CACHE_DIR = os.getenv("RESULT_CACHE_DIR") or None
+
+# Streaming: decode every STREAM_STEP_S seconds of new audio, commit
+# segments once the undecided window exceeds STREAM_WINDOW_S
+STREAM_STEP_S = float(os.getenv("STREAM_STEP_S", "1.0"))
+STREAM_WINDOW_S = float(os.getenv("STREAM_WINDOW_S", "10"))
+# ?stream= on /transcribe and finalize: segments are only sent one by one
+# for audio of STREAM_MIN_S and up. Clips of a few seconds are one segment
+# anyway and go through the micro-batcher, with just the final frame streamed.
+STREAM_MIN_S = float(os.getenv("STREAM_MIN_S", "5"))
+
+# Long recordings (LONG_AUDIO_MIN_S and up, 0 = never) are cut at pauses
+# into ~LONG_AUDIO_CHUNK_S pieces overlapping by LONG_AUDIO_OVERLAP_S and
+# decoded as separate inference jobs, LONG_AUDIO_PARALLEL at a time, so
+# they use every worker and short dictations still get turns in between
+LONG_AUDIO_MIN_S = float(os.getenv("LONG_AUDIO_MIN_S", "120"))
+LONG_AUDIO_CHUNK_S = float(os.getenv("LONG_AUDIO_CHUNK_S", "28"))
+LONG_AUDIO_OVERLAP_S = float(os.getenv("LONG_AUDIO_OVERLAP_S", "1"))
+LONG_AUDIO_PARALLEL = int(os.getenv("LONG_AUDIO_PARALLEL") or os.getenv("WHISPER_WORKERS", "2"))
+# A request's pieces wait out a full pool for at most LONG_AUDIO_WAIT_S in
+# total before it gets a 503; background jobs wait as long as it takes
+LONG_AUDIO_WAIT_S = float(os.getenv("LONG_AUDIO_WAIT_S", "120"))
+
+# Background jobs (POST /jobs): JOB_WORKERS jobs at a time per API process,
+# taken from a queue persisted in the database. Jobs whose process stopped
+# heartbeating for JOB_STALE_S are requeued; results are kept JOB_RETENTION_H.
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "1"))
+JOB_STALE_S = float(os.getenv("JOB_STALE_S", "60"))
+JOB_RETENTION_H = float(os.getenv("JOB_RETENTION_H", "24"))
 
-# Whisper config
-MODEL_SIZE = os.getenv("WHISPER_MODEL", "tiny")
-DEVICE = os.getenv("WHISPER_DEVICE", "cpu")
-COMPUTE_TYPE = os.getenv("WHISPER_COMPUTE_TYPE", "int8")
+# Chunked uploads: clients send PCM chunks while the user speaks and only
+# finalize after they stop. Uploads idle for UPLOAD_TTL_S are dropped.
+# UPLOAD_EARLY_DECODE=1 decodes long dictations window by window as chunks
+# arrive (like /transcribe/stream), leaving only the tail for finalize.
+UPLOAD_TTL_S = int(os.getenv("UPLOAD_TTL_S", "120"))
+UPLOAD_MAX_SECONDS = int(os.getenv("UPLOAD_MAX_SECONDS", "600"))
+UPLOAD_EARLY_DECODE = os.getenv("UPLOAD_EARLY_DECODE", "0") == "1"
+# Uploads a user may have open (not finalized) at once
+UPLOAD_MAX_PER_USER = int(os.getenv("UPLOAD_MAX_PER_USER", "3"))
+
+# Chunked uploads and X-Request-Id replay keep their state in this process,
+# so with several workers every request of a user must reach the same one.
+# Behind a proxy that routes by user (e.g. hashing the Authorization
+# header) set STICKY_ROUTING=1; otherwise, when INFERENCE_SOCKETS says the
+# API runs as several workers, both are turned off: creating an upload
+# answers 404 (clients fall back to one-shot /transcribe) and retries are
+# transcribed again instead of replayed.
+STICKY_ROUTING = os.getenv("STICKY_ROUTING", "0" if INFERENCE_SOCKETS else "1") == "1"
+
+# Clients retry /transcribe with the same X-Request-Id; within
+# REQUEST_ID_TTL_S the retry gets the first attempt's result (waiting for
+# it if still running) instead of being transcribed and charged again
+REQUEST_ID_TTL_S = int(os.getenv("REQUEST_ID_TTL_S", "600"))
+# Dictations the desktop client transcribed on-device are charged through
+# POST /usage; a report id seen within USAGE_REPORT_TTL_S isn't charged
+# again (the ids are kept in the database)
+USAGE_REPORT_TTL_S = int(os.getenv("USAGE_REPORT_TTL_S", str(7 * 86400)))
+MAX_USAGE_REPORTS = 500
+
+# ?mode= on /transcribe (fast and speculative use FAST_MODEL first)
+TRANSCRIBE_MODES = ("accurate", "fast", "speculative")
+# ?stream= formats for /transcribe and upload finalize
+STREAM_MEDIA_TYPES = {"ndjson": "application/x-ndjson", "sse": "text/event-stream"}
+
+if INFERENCE_SOCKETS:
+    models = InferenceClient(INFERENCE_SOCKETS, MODEL_SPECS)
+else:
+    models = ModelRegistry(MODEL_SPECS, build_engine, memory_budget_mb=MEMORY_BUDGET_MB)
+inference_pool = WorkerPool(
+    "inference", workers=INFERENCE_WORKERS, queue_depth=INFERENCE_QUEUE_DEPTH
+)
+uploads = UploadStore(ttl=UPLOAD_TTL_S, max_per_user=UPLOAD_MAX_PER_USER)
+result_cache = ResultCache(
+    maxsize=RESULT_CACHE_SIZE, ttl=RESULT_CACHE_TTL, directory=RESULT_CACHE_DIR
+)
+# "<content key>:<user id>" for results already charged to that user
+charged_results = TTLCache(maxsize=RESULT_CACHE_SIZE * 4, ttl=RESULT_CACHE_TTL)
+usage_counter = UsageCounter(flush_ms=USAGE_FLUSH_MS, ttl_s=USAGE_CACHE_TTL_S)
+# "<user id>:<request id>" -> task of the first attempt
+request_attempts = TTLCache(maxsize=4096, ttl=REQUEST_ID_TTL_S)
+# Keeps background second passes referenced until they finish
+background_tasks: set[asyncio.Task] = set()
 
-transcriber: Transcriber | None = None
+metrics.StatsGauges("vox_inference_pool", inference_pool.stats)
+metrics.StatsGauges("vox_password_pool", password_pool.stats)
+metrics.StatsGauges("vox_db_pool", pool_stats)
+metrics.StatsGauges("vox_result_cache", result_cache.stats)
+metrics.StatsGauges("vox_usage", usage_counter.stats)
+metrics.StatsGauges("vox_models", models.stats, labels={"sidecars": "sidecar", "models": "model"})
+metrics.StatsGauges("vox_uploads", uploads.stats)
 
 
 # ─── Schemas ───────────────────────────────────────────
@@ -50,48 +171,89 @@ class ActivateLicenseRequest(BaseModel):
     license_key: str
 
 
-# ─── Helpers ───────────────────────────────────────────
+class UsageReport(BaseModel):
+    id: str
+    words: int
 
-def get_week_start() -> date:
-    today = date.today()
-    return today - timedelta(days=today.weekday())
 
+class UsageReportBatch(BaseModel):
+    reports: list[UsageReport]
 
-async def get_weekly_usage(user_id: int, db: AsyncSession) -> WeeklyUsage:
-    week_start = get_week_start()
-    result = await db.execute(
-        select(WeeklyUsage).where(
-            WeeklyUsage.user_id == user_id,
-            WeeklyUsage.week_start == week_start,
-        )
-    )
-    usage = result.scalar_one_or_none()
-    if not usage:
-        usage = WeeklyUsage(user_id=user_id, week_start=week_start, words_used=0)
-        db.add(usage)
-        await db.commit()
-        await db.refresh(usage)
-    return usage
+
+# ─── Helpers ───────────────────────────────────────────
+
+def resolve_model(user: User, requested: str | None) -> str:
+    if not requested:
+        return PRO_MODEL if user.is_pro else FREE_MODEL
+    if requested not in models:
+        raise HTTPException(status_code=400, detail=f"Modelo desconocido: {requested}")
+    if not user.is_pro and requested != FREE_MODEL:
+        raise HTTPException(status_code=403, detail="Modelo disponible solo para usuarios Pro")
+    return requested
 
 
 # ─── Startup ───────────────────────────────────────────
 
 @app.on_event("startup")
 async def startup():
-    global transcriber
     await init_db()
-    transcriber = Transcriber(
-        model_size=MODEL_SIZE,
-        device=DEVICE,
-        compute_type=COMPUTE_TYPE,
-    )
+    await ensure_usage_index()
+    usage_counter.start()
+    job_queue.start()
+    # Serve auth and usage right away; /health/ready turns green once the
+    # default model is in memory. Other models load on first request.
+    task = asyncio.create_task(preload_model())
+    background_tasks.add(task)
+    task.add_done_callback(background_tasks.discard)
+
+
+async def preload_model():
+    start = time.perf_counter()
+    try:
+        await asyncio.to_thread(models.get, FREE_MODEL)
+    except Exception as e:
+        # Not fatal: the first request for the model retries the load
+        print(f"Failed to load model {FREE_MODEL}: {e}")
+        return
+    print(f"Model {FREE_MODEL} loaded in the background in {time.perf_counter() - start:.1f}s")
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    await job_queue.stop()
+    await usage_counter.stop()
+    models.close()
+    inference_pool.shutdown()
+    password_pool.shutdown()
+    await close_db()
 
 
 # ─── Health ────────────────────────────────────────────
 
 @app.get("/health")
 async def health():
-    return {"status": "ok"}
+    return {
+        "status": "ok",
+        "inference": inference_pool.stats(),
+        "password_hashing": password_pool.stats(),
+        "db_pool": pool_stats(),
+        "jobs": job_queue.stats(),
+    }
+
+
+@app.get("/health/ready")
+async def ready(response: Response):
+    # Readiness for load balancers: the DB answers and the default model is loaded
+    checks = {"model": models.is_loaded(FREE_MODEL)}
+    try:
+        await asyncio.wait_for(ping_db(), timeout=READY_DB_TIMEOUT_S)
+        checks["db"] = True
+    except Exception as e:
+        print(f"Readiness DB check failed: {e}")
+        checks["db"] = False
+    if not all(checks.values()):
+        response.status_code = 503
+    return {"ready": all(checks.values()), **checks, "db_pool": pool_stats()}
 
 
 # ─── Auth ──────────────────────────────────────────────
@@ -104,7 +266,7 @@ async def register(body: RegisterRequest, db: AsyncSession = Depends(get_db)):
 
     user = User(
         email=body.email,
-        password_hash=hash_password(body.password),
+        password_hash=await hash_password(body.password),
         name=body.name,
     )
     db.add(user)
@@ -128,8 +290,14 @@ async def login(body: LoginRequest, db: AsyncSession = Depends(get_db)):
     result = await db.execute(select(User).where(User.email == body.email))
     user = result.scalar_one_or_none()
 
-    if not user or not verify_password(body.password, user.password_hash):
+    if not user:
+        raise HTTPException(status_code=401, detail="Invalid email or password")
+    valid, new_hash = await verify_password(body.password, user.password_hash)
+    if not valid:
         raise HTTPException(status_code=401, detail="Invalid email or password")
+    if new_hash:
+        user.password_hash = new_hash
+        await db.commit()
 
     token = create_access_token(user.id)
     return {
@@ -155,52 +323,775 @@ async def me(user: User = Depends(get_current_user)):
 
 # ─── Transcripcion ────────────────────────────────────
 
+@app.get("/transcribe/formats")
+async def transcribe_formats():
+    return {"formats": UPLOAD_FORMATS, "sample_rate": 16000}
+
+
 @app.post("/transcribe")
 async def transcribe(
+    request: Request,
+    response: Response,
     file: UploadFile = File(...),
+    model: str | None = None,
+    mode: str = "accurate",
+    stream: str | None = None,
     user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db),
 ):
-    # Verificar limite semanal para usuarios free
-    usage = await get_weekly_usage(user.id, db)
-    if not user.is_pro and usage.words_used >= FREE_WORD_LIMIT:
-        raise HTTPException(
-            status_code=403,
-            detail=f"Limite semanal alcanzado ({FREE_WORD_LIMIT} palabras). Actualiza a Pro para uso ilimitado.",
+    # ?stream=ndjson|sse sends each segment as it is decoded, then a
+    # "done" frame with the usual JSON body
+    if stream is None:
+        return await once_per_request_id(
+            request, user, lambda: transcribe_file(response, file, model, mode, user)
         )
+    check_stream_format(stream)
+    return await stream_transcription(stream, lambda on_segment: once_per_request_id(
+        request, user, lambda: transcribe_file(None, file, model, mode, user, on_segment)
+    ))
+
+
+async def once_per_request_id(request: Request, user: User, run):
+    request_id = request.headers.get("x-request-id")
+    if not request_id or not STICKY_ROUTING:
+        return await run()
+    key = f"{user.id}:{request_id[:64]}"
+    attempt = request_attempts.get(key)
+    if attempt is None:
+        attempt = asyncio.ensure_future(run())
+        request_attempts.set(key, attempt)
+
+        def forget_failure(task):
+            # Only a success is replayed; a failed attempt may run again
+            if task.cancelled() or task.exception() is not None:
+                request_attempts.pop(key)
+
+        attempt.add_done_callback(forget_failure)
+    else:
+        metrics.RETRIED_REQUESTS.inc()
+    # A client that gives up on this attempt must not cancel the work its
+    # retry is waiting for
+    return await asyncio.shield(attempt)
+
 
+async def transcribe_file(
+    response: Response | None, file: UploadFile, model: str | None, mode: str, user: User, on_segment=None
+) -> dict:
+    await check_weekly_limit(user)
+    model_name = resolve_model(user, model)
+    if mode not in TRANSCRIBE_MODES:
+        raise HTTPException(status_code=400, detail=f"Modo invalido: {mode}")
+
+    contents = await read_audio_upload(file)
+    return await transcribe_contents(response, user, contents, file.content_type, model_name, mode, on_segment)
+
+
+async def read_audio_upload(file: UploadFile) -> bytes:
     # Validar que sea audio
     ext = os.path.splitext(file.filename or "")[1].lower()
-    if ext not in (".wav", ".mp3", ".m4a", ".ogg", ".flac", ".webm"):
+    if ext not in (".wav", ".mp3", ".m4a", ".ogg", ".opus", ".flac", ".webm"):
         if not file.content_type or not file.content_type.startswith("audio/"):
             raise HTTPException(status_code=400, detail="El archivo debe ser audio")
 
-    tmp_path = os.path.join(tempfile.gettempdir(), f"{uuid.uuid4()}{ext or '.wav'}")
-    try:
+    with metrics.span(metrics.UPLOAD_READ_SECONDS):
         contents = await file.read()
-        with open(tmp_path, "wb") as f:
-            f.write(contents)
+    if not contents:
+        raise HTTPException(status_code=400, detail="El archivo esta vacio")
+    return contents
 
-        text = transcriber.transcribe(tmp_path)
-        word_count = len(text.split()) if text else 0
 
-        # Actualizar uso semanal
-        usage.words_used += word_count
-        await db.commit()
-        await db.refresh(usage)
+def check_stream_format(stream: str):
+    if stream not in STREAM_MEDIA_TYPES:
+        raise HTTPException(status_code=400, detail=f"Formato de stream invalido: {stream}")
+
+
+async def stream_transcription(fmt: str, produce) -> StreamingResponse:
+    """Runs produce(on_segment), a coroutine returning the /transcribe
+    result, and streams a "segment" frame per decoded segment and a final
+    "done" frame with the result, as NDJSON lines or SSE events. Short
+    audio (see STREAM_MIN_S) only gets the "done" frame."""
+    loop = asyncio.get_running_loop()
+    segments = asyncio.Queue()
+
+    def on_segment(segment):
+        loop.call_soon_threadsafe(segments.put_nowait, segment)
+
+    task = asyncio.ensure_future(produce(on_segment))
+    # Segments are queued before the job's result comes back, so None
+    # always comes last
+    task.add_done_callback(lambda _: segments.put_nowait(None))
+    # Nothing is sent before the first segment, so failures up to then
+    # (weekly limit, busy server, bad audio) keep their status code
+    try:
+        first = await segments.get()
+    except asyncio.CancelledError:
+        task.cancel()
+        raise
+    if first is None and task.exception() is not None:
+        raise task.exception()
+
+    def encode(frame):
+        data = json.dumps(frame, default=str)
+        if fmt == "sse":
+            return f"event: {frame['type']}\ndata: {data}\n\n"
+        return data + "\n"
+
+    async def body():
+        segment = first
+        try:
+            while segment is not None:
+                yield encode({"type": "segment", **segment})
+                segment = await segments.get()
+            try:
+                result = task.result()
+            except HTTPException as e:
+                yield encode({"type": "error", "status": e.status_code, "detail": e.detail})
+                return
+            except Exception as e:
+                print(f"Streamed transcription failed: {e}")
+                yield encode({"type": "error", "status": 500, "detail": "Error interno"})
+                return
+            yield encode({"type": "done", **result})
+        finally:
+            # The client went away mid-stream
+            task.cancel()
+
+    return StreamingResponse(
+        body(),
+        media_type=STREAM_MEDIA_TYPES[fmt],
+        # Proxies must pass segments on as they come
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+async def check_weekly_limit(user: User):
+    # Verificar limite semanal para usuarios free
+    words_used = await usage_counter.current(user.id)
+    if not user.is_pro and words_used >= FREE_WORD_LIMIT:
+        raise HTTPException(
+            status_code=403,
+            detail=f"Limite semanal alcanzado ({FREE_WORD_LIMIT} palabras). Actualiza a Pro para uso ilimitado.",
+        )
+
+
+def mode_options(model_name: str, mode: str) -> tuple[str, int]:
+    # (model, beam size) that answers a request in this mode
+    if mode == "accurate":
+        return model_name, BEAM_SIZE
+    return FAST_MODEL, 1
+
+
+async def transcribe_contents(
+    response: Response | None, user: User, contents: bytes, content_type: str | None, model_name: str, mode: str,
+    on_segment=None,
+) -> dict:
+    # on_segment(segment) is called with each segment as it is decoded,
+    # possibly from a pool thread (see stream_transcription)
+    used_model, beam_size = mode_options(model_name, mode)
+    options = {
+        "model": used_model,
+        "beam_size": beam_size,
+        "language": LANGUAGE,
+        "vad": VAD_FILTER and VAD_PARAMETERS,
+    }
+    # Identical bytes (a client retry) hit without decoding or queueing;
+    # re-encoded copies of the same audio hit on the decoded samples
+    upload_key = result_cache.key(contents, **options) if result_cache.enabled else None
+    cached = result_cache.get(upload_key, disk=False) if upload_key else None
+    audio = None
+
+    def decode_and_transcribe():
+        nonlocal audio
+        with metrics.span(metrics.DECODE_SECONDS):
+            audio = load_audio(contents, content_type)
+        audio_key = None
+        if result_cache.enabled:
+            audio_key = result_cache.key(audio, **options)
+            hit = result_cache.get(audio_key)
+            if hit is not None:
+                return hit, True
+        if LONG_AUDIO_MIN_S and len(audio) >= LONG_AUDIO_MIN_S * 16000:
+            # Transcribed below, one pool job per piece
+            return {"text": None, "key": audio_key}, False
+        engine = models.get(used_model)
+        if on_segment is None or len(audio) < STREAM_MIN_S * 16000:
+            text = engine.transcribe(audio, beam_size=beam_size)
+        else:
+            segments = []
+            for segment in engine.iter_segments(audio, beam_size=beam_size):
+                on_segment(segment)
+                segments.append(segment)
+            text = text_of(segments)
+        return {"text": text, "key": audio_key}, False
+
+    if cached is not None:
+        timing = {"queue_ms": 0.0, "run_ms": 0.0}
+        entry, hit = cached, True
+    else:
+        (entry, hit), timing = await run_inference(decode_and_transcribe)
+        if entry["text"] is None:
+            segments, timing = await transcribe_long(
+                audio, used_model, beam_size, wait_s=LONG_AUDIO_WAIT_S, on_segment=on_segment
+            )
+            entry["text"] = text_of(segments)
+        if entry["key"]:
+            if not hit:
+                result_cache.set(entry["key"], entry)
+            result_cache.set(upload_key, entry, disk=False)
+    if result_cache.enabled:
+        result_cache.record(hit)
+
+    def get_audio():
+        return audio if audio is not None else load_audio(contents, content_type)
+
+    return await finish_transcription(response, user, entry, hit, timing, model_name, mode, get_audio)
+
+
+async def transcribe_long(
+    audio, model_name: str, beam_size: int, progress=None, wait_s: float | None = None, on_segment=None
+) -> tuple[list, dict]:
+    chunks = plan_chunks(audio, chunk_s=LONG_AUDIO_CHUNK_S, overlap_s=LONG_AUDIO_OVERLAP_S)
+    deadline = time.monotonic() + wait_s if wait_s else None
+    limit = asyncio.Semaphore(max(1, LONG_AUDIO_PARALLEL))
+    decoded = 0
+    # Pieces finish out of order; each is stitched (and its segments sent)
+    # as soon as every piece before it is done
+    finished = {}
+    merged = []
+    stitched = 0
+
+    def decode_piece(start, end):
+        return models.get(model_name).segments(audio[start:end], beam_size=beam_size)
+
+    async def run_piece(i, start, end, own_from, own_to):
+        nonlocal decoded, stitched
+        async with limit:
+            # Pieces already decoded would be lost with a 503
+            result = await run_when_free(decode_piece, start, end, deadline=deadline)
+        decoded += own_to - own_from
+        if progress:
+            progress(decoded / 16000, len(audio) / 16000)
+        finished[i] = result[0]
+        while stitched in finished:
+            for segment in stitch_piece(chunks, stitched, finished.pop(stitched), merged):
+                if on_segment:
+                    on_segment(segment)
+            stitched += 1
+        return result
+
+    tasks = [asyncio.ensure_future(run_piece(i, *chunk)) for i, chunk in enumerate(chunks)]
+    try:
+        outcomes = await asyncio.gather(*tasks)
+    finally:
+        for task in tasks:
+            task.cancel()
+    timing = {
+        "queue_ms": round(sum(t["queue_ms"] for _, t in outcomes), 1),
+        "run_ms": round(sum(t["run_ms"] for _, t in outcomes), 1),
+    }
+    return merged, timing
+
+
+async def run_when_free(fn, *args, deadline: float | None = None):
+    # Like run_inference, but waits out a full pool instead of failing,
+    # until the time.monotonic() deadline if one is given
+    while True:
+        try:
+            result, timing = await inference_pool.run(fn, *args)
+        except PoolSaturated as e:
+            if deadline is not None and time.monotonic() + e.retry_after > deadline:
+                raise busy(e)
+            await asyncio.sleep(e.retry_after)
+            continue
+        metrics.QUEUE_SECONDS.observe(timing["queue_ms"] / 1000)
+        return result, timing
+
+
+async def run_inference(fn, *args):
+    try:
+        result, timing = await inference_pool.run(fn, *args)
+    except PoolSaturated as e:
+        raise busy(e)
+    metrics.QUEUE_SECONDS.observe(timing["queue_ms"] / 1000)
+    return result, timing
+
+
+def busy(e: PoolSaturated) -> HTTPException:
+    return HTTPException(
+        status_code=503,
+        detail="Servidor ocupado, intenta de nuevo en unos segundos",
+        headers={"Retry-After": str(e.retry_after)},
+    )
+
+
+async def finish_transcription(
+    response: Response | None, user: User, entry: dict, hit: bool, timing: dict, model_name: str, mode: str, get_audio
+) -> dict:
+    used_model, _ = mode_options(model_name, mode)
+    metrics.TRANSCRIPTIONS.inc(model=used_model, mode=mode, cached=str(hit).lower())
+    if response is not None:
+        response.headers["X-Queue-Wait-Ms"] = str(timing["queue_ms"])
+        response.headers["X-Inference-Ms"] = str(timing["run_ms"])
+
+    text = entry["text"]
+    word_count = len(text.split()) if text else 0
+    charge = word_count
+    if entry["key"]:
+        charge_key = f"{entry['key']}:{user.id}"
+        if charged_results.get(charge_key):
+            charge = 0
+        charged_results.set(charge_key, True)
+
+    # Actualizar uso semanal
+    with metrics.span(metrics.USAGE_UPDATE_SECONDS):
+        words_used = await usage_counter.add(user.id, charge)
+    remaining = max(0, FREE_WORD_LIMIT - words_used) if not user.is_pro else -1
+
+    result = {
+        "text": text,
+        "words": word_count,
+        "words_used_this_week": words_used,
+        "words_remaining": remaining,
+        "is_pro": user.is_pro,
+        "model": used_model,
+        "mode": mode,
+        "cached": hit,
+        "queue_ms": timing["queue_ms"],
+        "inference_ms": timing["run_ms"],
+    }
+    if mode == "speculative" and text:
+        # Usage is charged on the draft; the correction is free
+        result["correction_id"] = await start_correction(user.id, model_name, get_audio, text)
+    return result
 
-        remaining = max(0, FREE_WORD_LIMIT - usage.words_used) if not user.is_pro else -1
 
-        return {
+async def start_correction(user_id: int, model_name: str, get_audio, draft: str) -> str:
+    correction_id = await create_correction(user_id, draft)
+    started = time.monotonic()
+
+    async def refine():
+        try:
+            text, _ = await inference_pool.run(
+                lambda: models.get(model_name).transcribe(get_audio())
+            )
+            latency_ms = round((time.monotonic() - started) * 1000, 1)
+            await resolve_correction(correction_id, draft, text, latency_ms=latency_ms)
+        except PoolSaturated:
+            # Under load the draft stands
+            await resolve_correction(correction_id, draft, status="skipped")
+        except Exception as e:
+            print(f"Correction {correction_id} failed: {e}")
+            try:
+                await resolve_correction(correction_id, draft, status="failed")
+            except Exception:
+                pass
+
+    task = asyncio.create_task(refine())
+    background_tasks.add(task)
+    task.add_done_callback(background_tasks.discard)
+    return correction_id
+
+
+@app.get("/transcribe/corrections/{correction_id}")
+async def correction_status(correction_id: str, user: User = Depends(get_current_user)):
+    entry = await get_correction(correction_id, user.id)
+    if entry is None:
+        raise HTTPException(status_code=404, detail="Correccion no encontrada")
+    return entry
+
+
+@app.post("/transcribe/uploads")
+async def create_upload(
+    model: str | None = None,
+    mode: str = "accurate",
+    trim: bool = False,
+    max_pause_ms: int | None = None,
+    user: User = Depends(get_current_user),
+):
+    # Protocol: PUT each chunk of 16 kHz s16le PCM to .../chunks/{seq}
+    # (seq from 0) while recording, then POST .../finalize with the last
+    # chunk as body and ?seq=. Finalize answers like /transcribe.
+    # ?trim=1 (&max_pause_ms=) cuts silence at finalize, as clients do
+    # before a one-shot upload; early-decoded uploads aren't trimmed.
+    if not STICKY_ROUTING:
+        raise HTTPException(status_code=404, detail="Subidas por partes no disponibles")
+    await check_weekly_limit(user)
+    model_name = resolve_model(user, model)
+    if mode not in TRANSCRIBE_MODES:
+        raise HTTPException(status_code=400, detail=f"Modo invalido: {mode}")
+    session = None
+    if UPLOAD_EARLY_DECODE:
+        session = StreamingSession(dtype="int16", step_s=STREAM_STEP_S, max_window_s=STREAM_WINDOW_S)
+    try:
+        upload = uploads.create(user.id, model_name, mode, session, trim=trim, max_pause_ms=max_pause_ms)
+    except TooManyUploads:
+        raise HTTPException(status_code=429, detail="Demasiadas subidas abiertas")
+    return {
+        "upload_id": upload.id,
+        "format": "pcm_s16le",
+        "sample_rate": 16000,
+        "max_seconds": UPLOAD_MAX_SECONDS,
+        "expires_in": UPLOAD_TTL_S,
+    }
+
+
+def get_upload(upload_id: str, user: User):
+    upload = uploads.get(upload_id, user.id)
+    if upload is None:
+        raise HTTPException(status_code=404, detail="Subida no encontrada o expirada")
+    return upload
+
+
+def append_chunk(upload, seq: int, data: bytes):
+    if upload.result is not None:
+        raise HTTPException(status_code=409, detail="La subida ya fue finalizada")
+    if len(upload.data) + len(data) > UPLOAD_MAX_SECONDS * 16000 * 2:
+        raise HTTPException(status_code=413, detail=f"Audio demasiado largo (max {UPLOAD_MAX_SECONDS}s)")
+    try:
+        upload.append(seq, data)
+    except ChunkOutOfOrder as e:
+        raise HTTPException(status_code=409, detail=f"Chunk fuera de orden, se esperaba {e.expected}")
+
+
+def decode_upload_window(upload, audio):
+    used_model, beam_size = mode_options(upload.model, upload.mode)
+    return models.get(used_model).segments(audio, beam_size=beam_size)
+
+
+def advance_early_decode(upload, start=True):
+    session = upload.session
+    if upload.decoding and upload.decoding.done():
+        # A failed or saturated window is simply decoded again later
+        if not upload.decoding.cancelled() and upload.decoding.exception() is None:
+            session.update(upload.decoding.result()[0])
+        upload.decoding = None
+    # Only windows long enough to commit something are worth decoding early
+    if start and upload.decoding is None and session.should_decode() and session.uncommitted > STREAM_WINDOW_S:
+        upload.decoding = asyncio.create_task(
+            inference_pool.run(decode_upload_window, upload, session.window())
+        )
+
+
+@app.put("/transcribe/uploads/{upload_id}/chunks/{seq}")
+async def upload_chunk(upload_id: str, seq: int, request: Request, user: User = Depends(get_current_user)):
+    upload = get_upload(upload_id, user)
+    with metrics.span(metrics.UPLOAD_READ_SECONDS):
+        data = await request.body()
+    async with upload.lock:
+        append_chunk(upload, seq, data)
+        if upload.session is not None:
+            advance_early_decode(upload)
+    return {"received": upload.next_seq, "seconds": round(upload.duration, 2)}
+
+
+@app.post("/transcribe/uploads/{upload_id}/finalize")
+async def finalize_upload(
+    upload_id: str,
+    request: Request,
+    response: Response,
+    seq: int | None = None,
+    stream: str | None = None,
+    user: User = Depends(get_current_user),
+):
+    upload = get_upload(upload_id, user)
+    if stream is None:
+        return await finalize(upload, request, response, seq, user)
+    check_stream_format(stream)
+    return await stream_transcription(
+        stream, lambda on_segment: finalize(upload, request, None, seq, user, on_segment)
+    )
+
+
+async def finalize(upload, request: Request, response: Response | None, seq: int | None, user: User, on_segment=None) -> dict:
+    async with upload.lock:
+        if upload.result is not None:
+            return upload.result
+        data = await request.body()
+        if seq is not None and data:
+            append_chunk(upload, seq, data)
+        if not upload.data:
+            raise HTTPException(status_code=400, detail="El archivo esta vacio")
+
+        contents = bytes(upload.data)
+        if upload.session is None:
+            if upload.trim:
+                contents = await asyncio.to_thread(trim_pcm, contents, upload.max_pause_ms)
+            result = await transcribe_contents(
+                response, user, contents, "audio/pcm", upload.model, upload.mode, on_segment
+            )
+        else:
+            result = await finish_early_decode(response, user, upload, contents, on_segment)
+        upload.result = result
+        upload.data = bytearray()
+        upload.session = None
+    return result
+
+
+async def finish_early_decode(response: Response | None, user: User, upload, contents: bytes, on_segment=None) -> dict:
+    session = upload.session
+    if upload.decoding:
+        await asyncio.wait([upload.decoding])
+        advance_early_decode(upload, start=False)
+    # Only the audio after the last commit is left to decode
+    timing = {"queue_ms": 0.0, "run_ms": 0.0}
+    sent = len(session.committed)
+    if on_segment:
+        for segment in session.committed:
+            on_segment(segment)
+    tail = session.window()
+    if len(tail):
+        segments, timing = await run_inference(decode_upload_window, upload, tail)
+        session.update(segments, final=True)
+    if on_segment:
+        for segment in session.committed[sent:]:
+            on_segment(segment)
+
+    entry = {"text": session.text(), "key": None}
+    return await finish_transcription(
+        response, user, entry, False, timing, upload.model, upload.mode,
+        lambda: load_audio(contents, "audio/pcm"),
+    )
+
+
+@app.delete("/transcribe/uploads/{upload_id}")
+async def cancel_upload(upload_id: str, user: User = Depends(get_current_user)):
+    get_upload(upload_id, user)
+    uploads.discard(upload_id)
+    return {"cancelled": True}
+
+
+@app.websocket("/transcribe/stream")
+async def transcribe_stream(websocket: WebSocket):
+    # Protocol: binary frames of 16 kHz mono PCM (?dtype=float32|int16),
+    # then a {"event": "stop"} text frame. The server answers with
+    # {"type": "partial"} / {"type": "final"} frames while audio arrives
+    # and one {"type": "done"} frame with the full text and usage.
+    token = websocket.query_params.get("token", "")
+    auth_header = websocket.headers.get("authorization", "")
+    if auth_header.lower().startswith("bearer "):
+        token = auth_header[7:]
+    try:
+        # Not Depends(get_db): that would hold a pooled connection for as
+        # long as the socket stays open
+        async with SessionLocal() as db:
+            user = await user_from_token(token, db)
+    except HTTPException as e:
+        await websocket.close(code=1008, reason=e.detail)
+        return
+
+    if not user.is_pro and await usage_counter.current(user.id) >= FREE_WORD_LIMIT:
+        await websocket.close(code=1008, reason="Limite semanal alcanzado")
+        return
+    try:
+        model_name = resolve_model(user, websocket.query_params.get("model"))
+    except HTTPException as e:
+        await websocket.close(code=1008, reason=e.detail)
+        return
+
+    def decode_window(audio):
+        return models.get(model_name).segments(audio)
+
+    try:
+        session = StreamingSession(
+            dtype=websocket.query_params.get("dtype", "float32"),
+            step_s=STREAM_STEP_S,
+            max_window_s=STREAM_WINDOW_S,
+        )
+    except ValueError as e:
+        await websocket.close(code=1003, reason=str(e))
+        return
+
+    await websocket.accept()
+    decoding: asyncio.Task | None = None
+
+    async def publish(segments, final=False):
+        done, partial = session.update(segments, final=final)
+        if done:
+            await websocket.send_json({"type": "final", "segments": done})
+        if partial:
+            await websocket.send_json({"type": "partial", "text": partial})
+
+    async def publish_decoded(task):
+        # A busy pool only costs us this partial; other failures end the
+        # stream (below)
+        if not isinstance(task.exception(), PoolSaturated):
+            await publish(task.result()[0])
+
+    try:
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                return
+            if message.get("bytes"):
+                session.feed(message["bytes"])
+            elif message.get("text"):
+                try:
+                    event = json.loads(message["text"]).get("event")
+                except (ValueError, AttributeError):
+                    event = None
+                if event == "stop":
+                    break
+
+            if decoding and decoding.done():
+                await publish_decoded(decoding)
+                decoding = None
+            if decoding is None and session.should_decode():
+                decoding = asyncio.create_task(
+                    inference_pool.run(decode_window, session.window())
+                )
+
+        # Only the audio after the last commit is left to decode
+        if decoding:
+            await asyncio.wait([decoding])
+            await publish_decoded(decoding)
+            decoding = None
+        tail = session.window()
+        if len(tail):
+            try:
+                segments, timing = await inference_pool.run(decode_window, tail)
+                await publish(segments, final=True)
+            except PoolSaturated as e:
+                await websocket.send_json({
+                    "type": "error",
+                    "detail": "Servidor ocupado, intenta de nuevo en unos segundos",
+                    "retry_after": e.retry_after,
+                })
+                await websocket.close(code=1013)
+                return
+
+        text = session.text()
+        word_count = len(text.split()) if text else 0
+        with metrics.span(metrics.USAGE_UPDATE_SECONDS):
+            words_used = await usage_counter.add(user.id, word_count)
+        remaining = max(0, FREE_WORD_LIMIT - words_used) if not user.is_pro else -1
+        metrics.TRANSCRIPTIONS.inc(model=model_name, mode="stream", cached="false")
+
+        await websocket.send_json({
+            "type": "done",
             "text": text,
             "words": word_count,
-            "words_used_this_week": usage.words_used,
+            "words_used_this_week": words_used,
             "words_remaining": remaining,
             "is_pro": user.is_pro,
-        }
+            "model": model_name,
+        })
+        await websocket.close()
+    except WebSocketDisconnect:
+        pass
+    except Exception as e:
+        print(f"Streaming transcription failed: {e}")
+        try:
+            await websocket.send_json({"type": "error", "detail": "Error interno"})
+            await websocket.close(code=1011)
+        except (WebSocketDisconnect, RuntimeError):
+            # Already gone
+            pass
     finally:
-        if os.path.exists(tmp_path):
-            os.remove(tmp_path)
+        if decoding and not decoding.done():
+            decoding.cancel()
+
+
+# ─── Trabajos ─────────────────────────────────────────
+
+async def run_job(job, report) -> dict:
+    async with SessionLocal() as session:
+        user = await session.get(User, job.user_id)
+    if user is None:
+        raise RuntimeError("Usuario no encontrado")
+
+    def decode():
+        with metrics.span(metrics.DECODE_SECONDS):
+            return load_audio(job.audio, job.content_type)
+
+    audio, _ = await run_when_free(decode)
+    duration = len(audio) / 16000
+    report(0.0, duration)
+    if LONG_AUDIO_MIN_S and duration >= LONG_AUDIO_MIN_S:
+        segments, _ = await transcribe_long(audio, job.model, BEAM_SIZE, progress=report)
+    else:
+        segments, _ = await run_when_free(
+            lambda: models.get(job.model).segments(audio, beam_size=BEAM_SIZE, progress=report)
+        )
+
+    text = text_of(segments)
+    metrics.TRANSCRIPTIONS.inc(model=job.model, mode="job", cached="false")
+    return {
+        "text": text,
+        "segments": segments,
+        "words": len(text.split()) if text else 0,
+        "is_pro": user.is_pro,
+        "model": job.model,
+    }
+
+
+async def charge_job(session, job, result: dict) -> dict:
+    # Charged when the job completes, not when it is queued, in the same
+    # transaction that marks it done: a run that lost the job to a
+    # requeue is rolled back and charges nothing
+    with metrics.span(metrics.USAGE_UPDATE_SECONDS):
+        words_used = await increment_usage(session, job.user_id, get_week_start(), result["words"])
+    usage_counter.invalidate(job.user_id)
+    return {
+        **result,
+        "words_used_this_week": words_used,
+        "words_remaining": max(0, FREE_WORD_LIMIT - words_used) if not result["is_pro"] else -1,
+    }
+
+
+job_queue = JobQueue(
+    run_job,
+    workers=JOB_WORKERS,
+    stale_s=JOB_STALE_S,
+    retention_s=JOB_RETENTION_H * 3600,
+    finish=charge_job,
+)
+metrics.StatsGauges("vox_jobs", job_queue.stats)
+
+
+@app.post("/jobs", status_code=202)
+async def submit_job(
+    file: UploadFile = File(...),
+    model: str | None = None,
+    user: User = Depends(get_current_user),
+):
+    # Queue the upload and answer right away; poll GET /jobs/{id}
+    await check_weekly_limit(user)
+    model_name = resolve_model(user, model)
+    contents = await read_audio_upload(file)
+    job = await create_job(user.id, model_name, contents, file.content_type)
+    job_queue.notify()
+    return {"job_id": job.id, "status": QUEUED, "position": await queue_position(job)}
+
+
+@app.get("/jobs/{job_id}")
+async def job_status(job_id: str, user: User = Depends(get_current_user)):
+    job = await get_job(job_id, user.id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Trabajo no encontrado")
+    body = {
+        "job_id": job.id,
+        "status": job.status,
+        "model": job.model,
+        "created_at": job.created_at,
+        "started_at": job.started_at,
+        "finished_at": job.finished_at,
+    }
+    if job.status == QUEUED:
+        body["position"] = await queue_position(job)
+    elif job.status == RUNNING:
+        # Fresher than the last heartbeat when the job runs in this process
+        progress = job_queue.fraction(job.id)
+        if progress is None:
+            progress = job.progress or 0.0
+        body["progress"] = round(100 * progress, 1)
+        body["duration_s"] = job.duration_s
+    elif job.status == DONE:
+        body["progress"] = 100.0
+        body["duration_s"] = job.duration_s
+        body["result"] = job.result
+    elif job.status == FAILED:
+        body["error"] = job.error
+    return body
 
 
 # ─── Uso ───────────────────────────────────────────────
@@ -210,10 +1101,36 @@ async def get_usage(
     user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db),
 ):
-    usage = await get_weekly_usage(user.id, db)
-    remaining = max(0, FREE_WORD_LIMIT - usage.words_used) if not user.is_pro else -1
+    return usage_summary(user, await usage_counter.current(user.id))
+
+
+@app.post("/usage")
+async def report_usage(
+    batch: UsageReportBatch,
+    user: User = Depends(get_current_user),
+):
+    # Words from dictations transcribed on the user's machine, sent in
+    # batches. A batch whose answer was lost can be sent again: every
+    # report id is only charged once, in the transaction recording it.
+    if len(batch.reports) > MAX_USAGE_REPORTS:
+        raise HTTPException(status_code=413, detail="Demasiados reportes")
+    reports = {report.id[:64]: max(0, report.words) for report in batch.reports}
+    async with SessionLocal() as session:
+        charge, accepted = await record_reports(session, user.id, reports, keep_s=USAGE_REPORT_TTL_S)
+        if charge:
+            with metrics.span(metrics.USAGE_UPDATE_SECONDS):
+                await increment_usage(session, user.id, get_week_start(), charge)
+        await session.commit()
+    usage_counter.invalidate(user.id)
+    words_used = await usage_counter.current(user.id)
+    metrics.REPORTED_WORDS.inc(charge)
+    return {**usage_summary(user, words_used), "accepted": accepted}
+
+
+def usage_summary(user: User, words_used: int) -> dict:
+    remaining = max(0, FREE_WORD_LIMIT - words_used) if not user.is_pro else -1
     return {
-        "words_used_this_week": usage.words_used,
+        "words_used_this_week": words_used,
         "words_remaining": remaining,
         "weekly_limit": FREE_WORD_LIMIT,
         "is_pro": user.is_pro,
@@ -231,6 +1148,9 @@ async def activate_license(
     if user.is_pro:
         return {"message": "Ya eres Pro", "is_pro": True}
 
+    # get_current_user may return a cached, detached copy
+    user = await db.get(User, user.id)
+
     existing = await db.execute(
         select(User).where(User.license_key == body.license_key)
     )
@@ -241,6 +1161,7 @@ async def activate_license(
     user.is_pro = True
     await db.commit()
     await db.refresh(user)
+    invalidate_user(user.id)
 
     return {"message": "Licencia activada, ahora eres Pro", "is_pro": True}
 
@@ -250,6 +1171,34 @@ async def license_status(user: User = Depends(get_current_user)):
     return {"is_pro": user.is_pro, "license_key": user.license_key}
 
 
+# ─── Admin ────────────────────────────────────────────
+
+@app.get("/admin/models", dependencies=[Depends(require_admin)])
+async def admin_models():
+    return {
+        **models.stats(),
+        "free_model": FREE_MODEL,
+        "pro_model": PRO_MODEL,
+    }
+
+
+@app.get("/admin/cache", dependencies=[Depends(require_admin)])
+async def admin_cache():
+    return result_cache.stats()
+
+
+@app.get("/admin/usage", dependencies=[Depends(require_admin)])
+async def admin_usage():
+    return usage_counter.stats()
+
+
+@app.get("/metrics")
+async def metrics_endpoint():
+    if not metrics.METRICS_ENABLED:
+        raise HTTPException(status_code=404, detail="Not Found")
+    return Response(metrics.render(), media_type="text/plain; version=0.0.4")
+
+
 # ─── Landing page ─────────────────────────────────────
 
 app.mount("/", StaticFiles(directory="web", html=True), name="web")
@@ -1,28 +1,72 @@
 import os
+import hmac
 from datetime import datetime, timedelta, timezone
 from jose import JWTError, jwt
 from passlib.context import CryptContext
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, Header, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from db import get_db
 from models import User
+from cache import TTLCache
+from workers import WorkerPool, PoolSaturated
 
 SECRET_KEY = os.getenv("JWT_SECRET", "voxeasy-secret-change-in-production")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_HOURS = 72
+# Shared secret for /admin endpoints (sent as X-Admin-Token); unset disables them
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Hashes made with a different cost are re-hashed on the next login
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+BCRYPT_WORKERS = int(os.getenv("BCRYPT_WORKERS", "2"))
+BCRYPT_QUEUE_DEPTH = int(os.getenv("BCRYPT_QUEUE_DEPTH", "32"))
+
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__rounds=BCRYPT_ROUNDS,
+    bcrypt__min_rounds=BCRYPT_ROUNDS,
+    bcrypt__max_rounds=BCRYPT_ROUNDS,
+)
+# bcrypt is ~250 ms of CPU per call; keep it off the event loop and
+# bounded so a login burst can't starve transcription of threads
+password_pool = WorkerPool(
+    "bcrypt", workers=BCRYPT_WORKERS, queue_depth=BCRYPT_QUEUE_DEPTH
+)
 security = HTTPBearer()
 
+# Per-process caches so authenticated requests skip the users lookup.
+# Tokens map to their user id until they expire; user rows are kept for
+# USER_CACHE_TTL seconds and dropped explicitly when they change here.
+# Other workers may serve a stale row for up to the TTL.
+USER_CACHE_TTL = int(os.getenv("USER_CACHE_TTL", "60"))
+USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", "10000"))
+token_cache = TTLCache(maxsize=USER_CACHE_SIZE, ttl=ACCESS_TOKEN_EXPIRE_HOURS * 3600)
+user_cache = TTLCache(maxsize=USER_CACHE_SIZE, ttl=USER_CACHE_TTL)
+
+
+async def _run_hashing(fn, *args):
+    try:
+        result, _ = await password_pool.run(fn, *args)
+    except PoolSaturated as e:
+        raise HTTPException(
+            status_code=503,
+            detail="Servidor ocupado, intenta de nuevo en unos segundos",
+            headers={"Retry-After": str(e.retry_after)},
+        )
+    return result
+
 
-def hash_password(password: str) -> str:
-    return pwd_context.hash(password)
+async def hash_password(password: str) -> str:
+    return await _run_hashing(pwd_context.hash, password)
 
 
-def verify_password(plain: str, hashed: str) -> bool:
-    return pwd_context.verify(plain, hashed)
+async def verify_password(plain: str, hashed: str) -> tuple[bool, str | None]:
+    """Returns (valid, new_hash); new_hash is set when the stored hash
+    should be replaced because its cost no longer matches BCRYPT_ROUNDS."""
+    return await _run_hashing(pwd_context.verify_and_update, plain, hashed)
 
 
 def create_access_token(user_id: int) -> str:
@@ -31,22 +75,62 @@ def create_access_token(user_id: int) -> str:
     return jwt.encode(payload, SECRET_KEY, algorithm=ALGORITHM)
 
 
-async def get_current_user(
-    credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: AsyncSession = Depends(get_db),
-) -> User:
-    token = credentials.credentials
+def decode_token(token: str) -> int:
+    user_id = token_cache.get(token)
+    if user_id is not None:
+        return user_id
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         user_id = int(payload.get("sub"))
-    except (JWTError, ValueError, TypeError):
+        expires_in = float(payload["exp"]) - datetime.now(timezone.utc).timestamp()
+    except (JWTError, ValueError, TypeError, KeyError):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Token invalid or expired",
         )
+    token_cache.set(token, user_id, ttl=expires_in)
+    return user_id
+
+
+def cache_user(user: User):
+    user_cache.set(user.id, {
+        "id": user.id,
+        "email": user.email,
+        "name": user.name,
+        "is_pro": user.is_pro,
+        "license_key": user.license_key,
+    })
+
+
+def invalidate_user(user_id: int):
+    user_cache.pop(user_id)
+
+
+async def user_from_token(token: str, db: AsyncSession) -> User:
+    """Returns the token's user. On a cache hit this is a detached User
+    built from the cached fields; load the row from `db` before changing
+    it, then call invalidate_user()."""
+    user_id = decode_token(token)
+
+    cached = user_cache.get(user_id)
+    if cached is not None:
+        return User(**cached)
 
     result = await db.execute(select(User).where(User.id == user_id))
     user = result.scalar_one_or_none()
     if not user:
         raise HTTPException(status_code=401, detail="User not found")
+    cache_user(user)
     return user
+
+
+async def get_current_user(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: AsyncSession = Depends(get_db),
+) -> User:
+    return await user_from_token(credentials.credentials, db)
+
+
+async def require_admin(x_admin_token: str | None = Header(None)):
+    if not ADMIN_TOKEN or not x_admin_token or not hmac.compare_digest(x_admin_token, ADMIN_TOKEN):
+        raise HTTPException(status_code=403, detail="Admin access required")
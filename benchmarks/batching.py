@@ -0,0 +1,81 @@
+"""Clips/sec of the micro-batcher at different batch windows.
+
+    python -m benchmarks.batching --model tiny --concurrency 8 \
+        --windows 0 5 10 20 50 [--corpus DIR] [--json out.json]
+
+Window 0 is the unbatched baseline: the same Transcriber with num_workers
+equal to the concurrency, as the API runs it without batching.
+"""
+from concurrent.futures import ThreadPoolExecutor
+import argparse
+import tempfile
+import json
+import time
+import os
+
+from benchmarks.corpus import load_corpus, write_wav
+from engine.transcriber import Transcriber
+from engine.batching import MicroBatcher
+
+
+def run(engine, paths, concurrency, rounds):
+    jobs = paths * rounds
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(engine.transcribe, jobs))
+    return len(jobs) / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--model", default="tiny")
+    parser.add_argument("--compute-type", default="int8")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--windows", type=float, nargs="+", default=[0, 5, 10, 20, 50])
+    parser.add_argument("--rounds", type=int, default=2)
+    parser.add_argument("--corpus")
+    parser.add_argument("--json")
+    args = parser.parse_args()
+
+    corpus = load_corpus(args.corpus)
+    tmp = tempfile.mkdtemp(prefix="vox-bench-")
+    paths = []
+    for name, audio in corpus:
+        path = os.path.join(tmp, f"{name}.wav")
+        write_wav(path, audio)
+        paths.append(path)
+
+    results = []
+    for window in args.windows:
+        transcriber = Transcriber(
+            model_size=args.model,
+            compute_type=args.compute_type,
+            num_workers=1 if window else args.concurrency,
+        )
+        engine = transcriber
+        if window:
+            engine = MicroBatcher(transcriber, window_ms=window, max_batch=args.concurrency)
+        run(engine, paths[:2], concurrency=2, rounds=1)  # warm-up
+
+        clips_per_sec = run(engine, paths, args.concurrency, args.rounds)
+        row = {"window_ms": window, "clips_per_sec": round(clips_per_sec, 2)}
+        if window:
+            row.update(engine.stats())
+            engine.close()
+        results.append(row)
+        print(row)
+
+    baseline = results[0]["clips_per_sec"] if results[0]["window_ms"] == 0 else None
+    print(f"\n{'window ms':>10} {'clips/s':>9} {'speedup':>8}")
+    for row in results:
+        speedup = f"{row['clips_per_sec'] / baseline:.2f}x" if baseline else "-"
+        print(f"{row['window_ms']:>10g} {row['clips_per_sec']:>9.2f} {speedup:>8}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"model": args.model, "concurrency": args.concurrency,
+                       "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
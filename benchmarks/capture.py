@@ -0,0 +1,92 @@
+"""Capture-path cost of AudioRecorder: per-block callback time and the
+work done at stop, for the old queue of copied blocks versus SampleBuffer.
+
+    python -m benchmarks.capture [--minutes 1 10] [--block 512] [--json out.json]
+
+Simulates the PortAudio callback feeding `block`-frame float32 blocks
+(and int16 for the buffer) for dictations of the given lengths.
+"""
+import argparse
+import queue
+import json
+import time
+
+import numpy as np
+
+from engine.audio import SampleBuffer
+
+SAMPLE_RATE = 16000
+
+
+def queued(blocks):
+    q = queue.Queue()
+    times = []
+    for block in blocks:
+        start = time.perf_counter()
+        q.put(block.copy())
+        times.append(time.perf_counter() - start)
+    start = time.perf_counter()
+    parts = []
+    while not q.empty():
+        parts.append(q.get())
+    audio = np.concatenate(parts, axis=0)[:, 0]
+    return times, time.perf_counter() - start, audio
+
+
+def buffered(blocks, dtype, max_seconds):
+    buffer = SampleBuffer(SAMPLE_RATE, dtype, max_seconds=max_seconds)
+    times = []
+    for block in blocks:
+        start = time.perf_counter()
+        buffer.write(block[:, 0])
+        times.append(time.perf_counter() - start)
+    start = time.perf_counter()
+    audio = buffer.view()
+    if audio.dtype == np.int16:
+        audio = audio.astype(np.float32) / 32768
+    return times, time.perf_counter() - start, audio
+
+
+def summary(name, minutes, times, stop_s):
+    return {
+        "method": name,
+        "minutes": minutes,
+        "callback_us_p50": round(float(np.percentile(times, 50)) * 1e6, 2),
+        "callback_us_p99": round(float(np.percentile(times, 99)) * 1e6, 2),
+        "callback_us_max": round(max(times) * 1e6, 1),
+        "stop_ms": round(stop_s * 1000, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--minutes", type=float, nargs="+", default=[1, 10])
+    parser.add_argument("--block", type=int, default=512)
+    parser.add_argument("--json")
+    args = parser.parse_args()
+
+    results = []
+    rng = np.random.default_rng(0)
+    for minutes in args.minutes:
+        n_blocks = int(minutes * 60 * SAMPLE_RATE / args.block)
+        source = (rng.standard_normal((args.block, 1)) * 0.1).astype(np.float32)
+        blocks = [source] * n_blocks
+        int_blocks = [(source * 32767).astype(np.int16)] * n_blocks
+        max_seconds = minutes * 60 + 1
+
+        results.append(summary("queue", minutes, *queued(blocks)[:2]))
+        results.append(summary("buffer_f32", minutes, *buffered(blocks, "float32", max_seconds)[:2]))
+        results.append(summary("buffer_i16", minutes, *buffered(int_blocks, "int16", max_seconds)[:2]))
+
+    columns = list(results[0])
+    print("  ".join(f"{c:>16}" for c in columns))
+    for row in results:
+        print("  ".join(f"{row[c]!s:>16}" for c in columns))
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"block": args.block, "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
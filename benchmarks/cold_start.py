@@ -0,0 +1,101 @@
+"""Server cold start: import time, time to serve /health and time until
+the default model is loaded.
+
+    python -m benchmarks.cold_start [--runs 3] [--root DIR] [--json out.json]
+
+Each run starts a fresh uvicorn process on a throwaway SQLite database
+(needs aiosqlite). --root measures another checkout, e.g. a git worktree
+of the previous release, for before/after comparisons; checkouts without
+/health/ready count as model-ready when /health first answers.
+Model settings come from the environment (WHISPER_MODEL, ...).
+"""
+import subprocess
+import statistics
+import argparse
+import tempfile
+import json
+import time
+import sys
+import os
+
+import requests
+
+from benchmarks.suite import free_port, ROOT
+
+
+def import_time(root, env):
+    out = subprocess.run(
+        [sys.executable, "-c",
+         "import time; s = time.perf_counter(); import api; print(time.perf_counter() - s)"],
+        cwd=root, env=env, capture_output=True, text=True, check=True,
+    )
+    return float(out.stdout.strip().splitlines()[-1])
+
+
+def server_start(root, env, timeout):
+    port = free_port()
+    base = f"http://127.0.0.1:{port}"
+    start = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "api:app", "--host", "127.0.0.1",
+         "--port", str(port), "--log-level", "warning"],
+        cwd=root, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    serving = ready = None
+    try:
+        deadline = time.monotonic() + timeout
+        while ready is None and time.monotonic() < deadline:
+            if server.poll() is not None:
+                raise RuntimeError("Server exited during startup")
+            try:
+                if serving is None and requests.get(f"{base}/health", timeout=1).ok:
+                    serving = time.perf_counter() - start
+                if serving is not None:
+                    status = requests.get(f"{base}/health/ready", timeout=1).status_code
+                    if status == 200:
+                        ready = time.perf_counter() - start
+                    elif status == 404:
+                        ready = serving
+            except requests.ConnectionError:
+                pass
+            time.sleep(0.05)
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+    if ready is None:
+        raise RuntimeError(f"Model not ready after {timeout}s")
+    return serving, ready
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--root", default=ROOT)
+    parser.add_argument("--timeout", type=float, default=300)
+    parser.add_argument("--json")
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix="vox-bench-cold-")
+    env = {**os.environ, "DATABASE_URL": f"sqlite+aiosqlite:///{tmp}/bench.db"}
+    imports, serving, ready = [], [], []
+    for _ in range(args.runs):
+        imports.append(import_time(args.root, env))
+        s, r = server_start(args.root, env, args.timeout)
+        serving.append(s)
+        ready.append(r)
+
+    result = {
+        "root": os.path.abspath(args.root),
+        "runs": args.runs,
+        "import_api_s": round(statistics.median(imports), 3),
+        "health_s": round(statistics.median(serving), 3),
+        "model_ready_s": round(statistics.median(ready), 3),
+    }
+    print(result)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(result, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+import numpy as np
+import wave
+import os
+
+SAMPLE_RATE = 16000
+
+
+def synth_clip(seconds, seed=0, sample_rate=SAMPLE_RATE):
+    """Speech-like test signal: voiced harmonics and noise bursts shaped
+    into ~4 Hz syllables, with silence at both ends like a real dictation."""
+    rng = np.random.default_rng(seed)
+    n = int(seconds * sample_rate)
+    t = np.arange(n) / sample_rate
+    pitch = 110 + 40 * rng.random()
+    voiced = sum(np.sin(2 * np.pi * pitch * k * t) / k for k in range(1, 6))
+    noise = rng.standard_normal(n) * 0.3
+    envelope = np.clip(np.sin(2 * np.pi * (3 + 2 * rng.random()) * t), 0, None)
+    audio = (voiced + noise) * envelope
+    edge = min(n // 4, int(0.5 * sample_rate))
+    audio[:edge] = 0
+    audio[n - edge:] = 0
+    audio = audio / (np.abs(audio).max() or 1) * 0.5
+    audio += rng.standard_normal(n) * 0.002
+    return audio.astype(np.float32)
+
+
+def load_wav(path):
+    with wave.open(path, "rb") as w:
+        if w.getsampwidth() != 2 or w.getnchannels() != 1 or w.getframerate() != SAMPLE_RATE:
+            raise ValueError(f"{path}: expected 16 kHz mono 16-bit WAV")
+        data = np.frombuffer(w.readframes(w.getnframes()), dtype=np.int16)
+    return data.astype(np.float32) / 32768
+
+
+def write_wav(path, audio, sample_rate=SAMPLE_RATE):
+    with wave.open(path, "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(sample_rate)
+        w.writeframes((np.clip(audio, -1, 1) * 32767).astype(np.int16).tobytes())
+
+
+def load_corpus(directory=None, count=16, min_seconds=2, max_seconds=10, seed=0):
+    """Returns a list of (name, float32 audio) pairs.
+
+    Uses every 16 kHz mono WAV in `directory` when given (recordings give
+    realistic decoder behaviour), otherwise a fixed synthetic set so runs
+    are comparable across machines.
+    """
+    if directory:
+        names = sorted(f for f in os.listdir(directory) if f.endswith(".wav"))
+        return [(name, load_wav(os.path.join(directory, name))) for name in names]
+
+    rng = np.random.default_rng(seed)
+    durations = rng.uniform(min_seconds, max_seconds, size=count)
+    return [
+        (f"synth_{i:02d}_{d:.1f}s", synth_clip(d, seed=seed + i))
+        for i, d in enumerate(durations)
+    ]
@@ -0,0 +1,89 @@
+"""Text injection: time to put a dictation where the cursor is, per
+KeyboardController strategy, normalized to 1,000 characters.
+
+    python -m benchmarks.injection [--chars 200 1000] [--countdown 5] [--json out.json]
+
+This really types: focus an empty document in the app you want to
+measure (slow apps are the interesting ones) during the countdown and
+leave it focused. "type" sends one keystroke per character, "paste"
+goes through the clipboard, "incremental" feeds sentence-sized segments
+the way a streamed transcription arrives and "auto" lets type_text()
+choose by length. The text is ASCII so every strategy can send it.
+"""
+import argparse
+import json
+import time
+
+from engine.keyboard import KeyboardController, PASTE_MIN_CHARS
+
+SENTENCE = "the quick brown fox jumps over the lazy dog and keeps running."
+
+
+def dictation(chars):
+    text = ""
+    while len(text) < chars:
+        text += SENTENCE + " "
+    return text[:chars].rstrip()
+
+
+def segments(text, size=len(SENTENCE)):
+    words, parts, current = text.split(), [], ""
+    for word in words:
+        current = f"{current} {word}".strip()
+        if len(current) >= size:
+            parts.append(current)
+            current = ""
+    return parts + [current] if current else parts
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--chars", type=int, nargs="+", default=[200, 1000])
+    parser.add_argument("--countdown", type=float, default=5)
+    parser.add_argument("--json")
+    args = parser.parse_args()
+
+    keyboard = KeyboardController(lambda: None)
+    strategies = {
+        "type": lambda text: keyboard.type_text(text, strategy="type"),
+        "paste": lambda text: keyboard.type_text(text, strategy="paste"),
+        "auto": keyboard.type_text,
+    }
+
+    def incremental(text):
+        typer = keyboard.incremental()
+        for part in segments(text):
+            typer.feed(part)
+
+    strategies["incremental"] = incremental
+
+    print(f"Focus an empty document; typing starts in {args.countdown:g}s")
+    time.sleep(args.countdown)
+
+    results = []
+    for chars in args.chars:
+        text = dictation(chars)
+        for name, inject in strategies.items():
+            start = time.perf_counter()
+            inject(text)
+            wall = time.perf_counter() - start
+            keyboard.type_text("\n", strategy="type")
+            results.append({
+                "strategy": name,
+                "chars": len(text),
+                "wall_ms": round(wall * 1000, 1),
+                "ms_per_1000_chars": round(wall * 1000 / len(text) * 1000, 1),
+            })
+
+    columns = list(results[0])
+    print("  ".join(f"{c:>18}" for c in columns))
+    for row in results:
+        print("  ".join(f"{row[c]!s:>18}" for c in columns))
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"paste_min_chars": PASTE_MIN_CHARS, "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""Long recordings: one serial transcribe() call versus pieces cut at
+pauses and decoded in parallel (engine.long_audio).
+
+    python -m benchmarks.long_audio [--minutes 10] [--file meeting.wav] \
+        [--model tiny] [--compute-type int8] [--workers 1 2 4 8] [--json out.json]
+
+The synthetic file strings speech-like clips together with short pauses
+(benchmarks.corpus). Each worker count gets its own model instance with
+num_workers=N and cpu_threads=cores/N, so every run uses the whole machine
+and the speedup shows what splitting buys over one decoder using all
+cores. Model loading is not timed.
+"""
+import argparse
+import json
+import time
+import os
+
+import numpy as np
+
+from benchmarks.corpus import synth_clip, load_wav, SAMPLE_RATE
+from benchmarks.suite import metadata
+from engine.long_audio import plan_chunks, transcribe_parallel, text_of
+from engine.transcriber import Transcriber
+
+
+def synth_long(minutes, seed=0):
+    rng = np.random.default_rng(seed)
+    parts, total, i = [], 0, 0
+    while total < minutes * 60 * SAMPLE_RATE:
+        clip = synth_clip(rng.uniform(3, 12), seed=seed + i)
+        pause = np.zeros(int(rng.uniform(0.3, 1.5) * SAMPLE_RATE), dtype=np.float32)
+        parts += [clip, pause]
+        total += len(clip) + len(pause)
+        i += 1
+    return np.concatenate(parts)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--minutes", type=float, default=10)
+    parser.add_argument("--file", help="16 kHz mono WAV to use instead of synthetic audio")
+    parser.add_argument("--model", default="tiny")
+    parser.add_argument("--compute-type", default="int8")
+    parser.add_argument("--beam-size", type=int, default=5)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--chunk-s", type=float, default=28)
+    parser.add_argument("--overlap-s", type=float, default=1)
+    parser.add_argument("--json")
+    args = parser.parse_args()
+
+    audio = load_wav(args.file) if args.file else synth_long(args.minutes)
+    seconds = len(audio) / SAMPLE_RATE
+    cores = os.cpu_count() or 1
+    pieces = len(plan_chunks(audio, chunk_s=args.chunk_s, overlap_s=args.overlap_s))
+    print(f"{seconds / 60:.1f} min of audio, {pieces} pieces, {cores} cores")
+
+    def run(name, workers, fn):
+        start = time.perf_counter()
+        text = fn()
+        wall = time.perf_counter() - start
+        return {
+            "method": name,
+            "workers": workers,
+            "wall_s": round(wall, 2),
+            "rtf": round(wall / seconds, 4),
+            "words": len(text.split()),
+        }
+
+    transcriber = Transcriber(model_size=args.model, compute_type=args.compute_type, cpu_threads=cores)
+    results = [run("serial", 1, lambda: transcriber.transcribe(audio, beam_size=args.beam_size))]
+    del transcriber
+
+    for workers in args.workers:
+        transcriber = Transcriber(
+            model_size=args.model,
+            compute_type=args.compute_type,
+            cpu_threads=max(1, cores // workers),
+            num_workers=workers,
+        )
+        results.append(run("parallel", workers, lambda: text_of(transcribe_parallel(
+            transcriber, audio, workers, beam_size=args.beam_size,
+            chunk_s=args.chunk_s, overlap_s=args.overlap_s,
+        ))))
+        del transcriber
+
+    serial = results[0]["wall_s"]
+    for row in results:
+        row["speedup"] = round(serial / row["wall_s"], 2) if row["wall_s"] else None
+
+    columns = list(results[0])
+    print("  ".join(f"{c:>10}" for c in columns))
+    for row in results:
+        print("  ".join(f"{row[c]!s:>10}" for c in columns))
+
+    if args.json:
+        corpus = [(args.file or f"synth_{args.minutes}min", audio)]
+        with open(args.json, "w") as f:
+            json.dump({
+                **metadata(corpus, args.file or "synthetic"),
+                "model": args.model,
+                "compute_type": args.compute_type,
+                "beam_size": args.beam_size,
+                "pieces": pieces,
+                "results": results,
+            }, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
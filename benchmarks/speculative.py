@@ -0,0 +1,90 @@
+"""Time-to-first-text for accurate, fast and speculative transcription.
+
+    python -m benchmarks.speculative --fast-model tiny --accurate-model small \
+        [--beam-size 5] [--corpus DIR] [--json out.json]
+
+accurate: the accurate model with beam search, as /transcribe by default.
+fast: greedy decoding on the fast model, as mode=fast.
+speculative: first text is the fast draft; final text arrives after the
+accurate pass, as mode=speculative. Also reports how often the accurate
+pass changed the draft (i.e. a correction would be sent).
+"""
+import argparse
+import json
+import time
+
+import numpy as np
+
+from benchmarks.corpus import load_corpus
+from engine.speculative import differs
+from engine.transcriber import Transcriber
+
+
+def percentiles(values):
+    return {
+        "p50_ms": round(float(np.percentile(values, 50)) * 1000, 1),
+        "p95_ms": round(float(np.percentile(values, 95)) * 1000, 1),
+    }
+
+
+def timed(fn, *args, **kwargs):
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--fast-model", default="tiny")
+    parser.add_argument("--accurate-model", default="small")
+    parser.add_argument("--compute-type", default="int8")
+    parser.add_argument("--beam-size", type=int, default=5)
+    parser.add_argument("--corpus")
+    parser.add_argument("--json")
+    args = parser.parse_args()
+
+    corpus = load_corpus(args.corpus)
+    fast = Transcriber(model_size=args.fast_model, compute_type=args.compute_type)
+    accurate = fast
+    if args.accurate_model != args.fast_model:
+        accurate = Transcriber(model_size=args.accurate_model, compute_type=args.compute_type)
+    fast.transcribe(corpus[0][1], beam_size=1)  # warm-up
+    accurate.transcribe(corpus[0][1], beam_size=args.beam_size)
+
+    first = {"accurate": [], "fast": [], "speculative": []}
+    final = {"accurate": [], "speculative": []}
+    corrected = 0
+    for _, audio in corpus:
+        accurate_text, accurate_s = timed(accurate.transcribe, audio, beam_size=args.beam_size)
+        draft, fast_s = timed(fast.transcribe, audio, beam_size=1)
+        first["accurate"].append(accurate_s)
+        final["accurate"].append(accurate_s)
+        first["fast"].append(fast_s)
+        first["speculative"].append(fast_s)
+        final["speculative"].append(fast_s + accurate_s)
+        corrected += differs(draft, accurate_text)
+
+    results = {
+        mode: {"first_text": percentiles(first[mode]),
+               **({"final_text": percentiles(final[mode])} if mode in final else {})}
+        for mode in first
+    }
+    results["speculative"]["correction_rate"] = round(corrected / len(corpus), 2)
+
+    print(f"{len(corpus)} clips; fast={args.fast_model} (greedy), "
+          f"accurate={args.accurate_model} (beam {args.beam_size})\n")
+    print(f"{'mode':>12} {'first p50':>10} {'first p95':>10} {'final p50':>10} {'final p95':>10}")
+    for mode, row in results.items():
+        fin = row.get("final_text", {})
+        print(f"{mode:>12} {row['first_text']['p50_ms']:>10} {row['first_text']['p95_ms']:>10} "
+              f"{fin.get('p50_ms', '-'):>10} {fin.get('p95_ms', '-'):>10}")
+    print(f"\ncorrection rate: {results['speculative']['correction_rate']:.0%}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"fast_model": args.fast_model, "accurate_model": args.accurate_model,
+                       "beam_size": args.beam_size, "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,274 @@
+"""Transcription benchmark suite: engine matrix plus an API load test.
+
+    python -m benchmarks.suite --models tiny base --compute-types int8 \
+        --beam-sizes 1 5 --threads 0 4 --concurrency 1 4 8 \
+        [--corpus DIR] [--api] [--database-url URL] [--json out.json]
+
+For every model / compute type / beam size / thread count combination it
+reports cold start (model load from disk, after a download pre-pass),
+real-time factor, p50/p95/p99 latency and clips/sec at each concurrency.
+
+--api also starts the server under uvicorn against a throwaway SQLite
+database (or --database-url, e.g. a local Postgres) and load-tests
+POST /transcribe over HTTP. The result cache is off so every request
+reaches the model. SQLite needs aiosqlite installed.
+
+The JSON output records the git commit, host and corpus, so runs can be
+compared over time.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from collections import Counter
+import subprocess
+import itertools
+import threading
+import argparse
+import platform
+import tempfile
+import socket
+import uuid
+import json
+import time
+import sys
+import io
+import os
+
+import numpy as np
+import requests
+
+from benchmarks.corpus import load_corpus, write_wav, SAMPLE_RATE
+from engine.transcriber import Transcriber
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def percentiles(values):
+    return {
+        "p50_ms": round(float(np.percentile(values, 50)) * 1000, 1),
+        "p95_ms": round(float(np.percentile(values, 95)) * 1000, 1),
+        "p99_ms": round(float(np.percentile(values, 99)) * 1000, 1),
+    }
+
+
+def load_test(fn, jobs, concurrency):
+    """Runs fn(job) for every job on `concurrency` threads. Returns the
+    per-job latencies and results, and the wall time."""
+    def timed(job):
+        start = time.perf_counter()
+        result = fn(job)
+        return time.perf_counter() - start, result
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        outcomes = list(pool.map(timed, jobs))
+    wall = time.perf_counter() - start
+    return [o[0] for o in outcomes], [o[1] for o in outcomes], wall
+
+
+def metadata(corpus, source):
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "commit": commit,
+        "host": platform.node(),
+        "platform": platform.platform(),
+        "python": platform.python_version(),
+        "cpu_count": os.cpu_count(),
+        "corpus": {
+            "source": source,
+            "clips": len(corpus),
+            "audio_seconds": round(sum(len(a) for _, a in corpus) / SAMPLE_RATE, 1),
+        },
+    }
+
+
+# ─── Engine matrix ────────────────────────────────────
+
+def bench_engine(args, corpus):
+    from faster_whisper.utils import download_model
+
+    audio_seconds = sum(len(a) for _, a in corpus) / SAMPLE_RATE
+    results = []
+    for model, compute_type, threads in itertools.product(
+        args.models, args.compute_types, args.threads
+    ):
+        # Fetch weights first so cold start measures loading, not downloading
+        download_model(model, cache_dir=os.path.join(os.getcwd(), "models"))
+        start = time.perf_counter()
+        transcriber = Transcriber(
+            model_size=model,
+            compute_type=compute_type,
+            cpu_threads=threads,
+            num_workers=max(args.concurrency),
+        )
+        cold_start = time.perf_counter() - start
+        _, first = corpus[0]
+        start = time.perf_counter()
+        transcriber.transcribe(first)
+        first_s = time.perf_counter() - start
+
+        for beam_size in args.beam_sizes:
+            for concurrency in args.concurrency:
+                jobs = [audio for _, audio in corpus] * args.rounds
+                latencies, _, wall = load_test(
+                    lambda audio: transcriber.transcribe(audio, beam_size=beam_size),
+                    jobs, concurrency,
+                )
+                row = {
+                    "model": model,
+                    "compute_type": compute_type,
+                    "cpu_threads": threads,
+                    "beam_size": beam_size,
+                    "concurrency": concurrency,
+                    "cold_start_s": round(cold_start, 2),
+                    "first_transcription_s": round(first_s, 2),
+                    "rtf": round(sum(latencies) / (audio_seconds * args.rounds), 4),
+                    **percentiles(latencies),
+                    "clips_per_sec": round(len(jobs) / wall, 2),
+                }
+                results.append(row)
+                print(row)
+        del transcriber
+    return results
+
+
+# ─── API load test ────────────────────────────────────
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(args, tmp):
+    port = free_port()
+    env = {
+        **os.environ,
+        "DATABASE_URL": args.database_url or f"sqlite+aiosqlite:///{tmp}/bench.db",
+        "WHISPER_MODEL": args.api_model or args.models[0],
+        "WHISPER_COMPUTE_TYPE": args.compute_types[0],
+        "RESULT_CACHE_SIZE": "0",
+        "RESULT_CACHE_DIR": "",
+    }
+    if args.api_workers:
+        env["WHISPER_WORKERS"] = str(args.api_workers)
+    log = open(os.path.join(tmp, "server.log"), "w")
+    start = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "api:app", "--host", "127.0.0.1",
+         "--port", str(port), "--log-level", "warning"],
+        cwd=ROOT, env=env, stdout=log, stderr=subprocess.STDOUT,
+    )
+    base = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + args.server_timeout
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f"Server exited, see {log.name}")
+        try:
+            if requests.get(f"{base}/health/ready", timeout=1).status_code == 200:
+                return server, base, time.perf_counter() - start
+        except requests.ConnectionError:
+            pass
+        time.sleep(0.2)
+    server.terminate()
+    raise RuntimeError(f"Server not ready after {args.server_timeout}s, see {log.name}")
+
+
+def bench_api(args, corpus):
+    tmp = tempfile.mkdtemp(prefix="vox-bench-api-")
+    uploads = []
+    for name, audio in corpus:
+        buf = io.BytesIO()
+        write_wav(buf, audio)
+        uploads.append((f"{name}.wav", buf.getvalue()))
+
+    server, base, ready_s = start_server(args, tmp)
+    try:
+        # Throwaway Pro user so the weekly limit never kicks in
+        tag = uuid.uuid4().hex[:12]
+        r = requests.post(f"{base}/auth/register", json={
+            "email": f"bench-{tag}@example.com", "password": tag,
+        })
+        r.raise_for_status()
+        headers = {"Authorization": f"Bearer {r.json()['token']}"}
+        requests.post(f"{base}/license/activate", json={"license_key": f"bench-{tag}"},
+                      headers=headers).raise_for_status()
+
+        local = threading.local()
+
+        def post(upload):
+            if not hasattr(local, "session"):
+                local.session = requests.Session()
+                local.session.headers.update(headers)
+            r = local.session.post(f"{base}/transcribe", files={"file": (*upload, "audio/wav")})
+            return (r.status_code, float(r.headers.get("X-Queue-Wait-Ms", 0)),
+                    float(r.headers.get("X-Inference-Ms", 0)))
+
+        post(uploads[0])  # warm-up
+        results = []
+        for concurrency in args.concurrency:
+            latencies, outcomes, wall = load_test(post, uploads * args.rounds, concurrency)
+            ok = [o for o in outcomes if o[0] == 200]
+            row = {
+                "concurrency": concurrency,
+                **percentiles(latencies),
+                "clips_per_sec": round(len(ok) / wall, 2),
+                "status": dict(Counter(o[0] for o in outcomes)),
+                "queue_ms_mean": round(float(np.mean([o[1] for o in ok])), 1) if ok else None,
+                "inference_ms_mean": round(float(np.mean([o[2] for o in ok])), 1) if ok else None,
+            }
+            results.append(row)
+            print(row)
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+    return {
+        "model": args.api_model or args.models[0],
+        "database": "custom" if args.database_url else "sqlite",
+        "server_ready_s": round(ready_s, 2),
+        "results": results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--models", nargs="+", default=["tiny"])
+    parser.add_argument("--compute-types", nargs="+", default=["int8"])
+    parser.add_argument("--beam-sizes", type=int, nargs="+", default=[1, 5])
+    parser.add_argument("--threads", type=int, nargs="+", default=[0])
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4])
+    parser.add_argument("--rounds", type=int, default=1)
+    parser.add_argument("--corpus")
+    parser.add_argument("--clips", type=int, default=12)
+    parser.add_argument("--min-seconds", type=float, default=1)
+    parser.add_argument("--max-seconds", type=float, default=30)
+    parser.add_argument("--skip-engine", action="store_true")
+    parser.add_argument("--api", action="store_true")
+    parser.add_argument("--api-model")
+    parser.add_argument("--api-workers", type=int)
+    parser.add_argument("--database-url")
+    parser.add_argument("--server-timeout", type=float, default=300)
+    parser.add_argument("--json")
+    args = parser.parse_args()
+
+    corpus = load_corpus(args.corpus, count=args.clips,
+                         min_seconds=args.min_seconds, max_seconds=args.max_seconds)
+    report = metadata(corpus, args.corpus or "synthetic")
+    report["args"] = vars(args)
+    if not args.skip_engine:
+        report["engine"] = bench_engine(args, corpus)
+    if args.api:
+        report["api"] = bench_api(args, corpus)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""Upload size and time-to-text cost of each client upload format.
+
+    python -m benchmarks.upload_formats [--corpus DIR] [--links 0.5 2 10]
+        [--rtt-ms 150] [--json out.json]
+
+For every clip and format it measures client encode time, payload size
+and server-side in-memory decode time, then estimates upload time on
+links of the given speeds (Mbit/s) with one round trip of overhead.
+"""
+import argparse
+import json
+import time
+
+from benchmarks.corpus import load_corpus
+from engine.audio import encode_audio, encodable_formats
+from engine.decoding import load_audio
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, (time.perf_counter() - start) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--corpus")
+    parser.add_argument("--links", type=float, nargs="+", default=[0.5, 2, 10])
+    parser.add_argument("--rtt-ms", type=float, default=150)
+    parser.add_argument("--json")
+    args = parser.parse_args()
+
+    corpus = load_corpus(args.corpus)
+    audio_seconds = sum(len(audio) for _, audio in corpus) / 16000
+    results = []
+    for fmt in encodable_formats():
+        total_bytes = encode_ms = decode_ms = 0
+        for _, audio in corpus:
+            (_, data, mime), ms = timed(encode_audio, audio, fmt)
+            total_bytes += len(data)
+            encode_ms += ms
+            _, ms = timed(load_audio, data, mime)
+            decode_ms += ms
+
+        n = len(corpus)
+        row = {
+            "format": fmt,
+            "kb_per_clip": round(total_bytes / n / 1024, 1),
+            "kbit_per_s": round(total_bytes * 8 / audio_seconds / 1000, 1),
+            "encode_ms": round(encode_ms / n, 2),
+            "decode_ms": round(decode_ms / n, 2),
+        }
+        for mbit in args.links:
+            upload_ms = total_bytes / n * 8 / (mbit * 1e6) * 1000 + args.rtt_ms
+            row[f"upload_ms@{mbit:g}M"] = round(row["encode_ms"] + upload_ms + row["decode_ms"], 1)
+        results.append(row)
+
+    wav_kb = next(r["kb_per_clip"] for r in results if r["format"] == "wav")
+    for row in results:
+        row["ratio_vs_wav"] = round(wav_kb / row["kb_per_clip"], 1)
+
+    print(f"{len(corpus)} clips, {audio_seconds:.1f}s of audio\n")
+    columns = list(results[0])
+    print("  ".join(f"{c:>14}" for c in columns))
+    for row in results:
+        print("  ".join(f"{row[c]!s:>14}" for c in columns))
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"clips": len(corpus), "audio_seconds": audio_seconds,
+                       "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
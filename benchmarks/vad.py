@@ -0,0 +1,112 @@
+"""Audio and inference time saved by silence trimming.
+
+    python -m benchmarks.vad [--corpus DIR] [--model tiny] [--json out.json]
+
+Each clip gets 1-4 s of leading silence, 0.5-2 s of trailing silence and a
+2-5 s pause in the middle, like a user who hits the hotkey and then
+thinks. Reports audio seconds left after client-side trimming
+(engine.silence.trim_silence), with pause collapsing, and after server-side
+Silero VAD. With --model it also times inference on each variant.
+"""
+import argparse
+import json
+import time
+
+import numpy as np
+
+from benchmarks.corpus import load_corpus
+from engine.silence import trim_silence
+
+SAMPLE_RATE = 16000
+VAD_PARAMETERS = {"onset": 0.5, "min_silence_duration_ms": 500, "speech_pad_ms": 300}
+
+
+def with_silences(corpus, seed=0):
+    rng = np.random.default_rng(seed)
+
+    def silence(seconds):
+        return (rng.standard_normal(int(seconds * SAMPLE_RATE)) * 0.002).astype(np.float32)
+
+    padded = []
+    for name, audio in corpus:
+        middle = len(audio) // 2
+        padded.append((name, np.concatenate([
+            silence(rng.uniform(1, 4)),
+            audio[:middle],
+            silence(rng.uniform(2, 5)),
+            audio[middle:],
+            silence(rng.uniform(0.5, 2)),
+        ])))
+    return padded
+
+
+def silero_speech(audio):
+    from faster_whisper.vad import VadOptions, get_speech_timestamps, collect_chunks
+
+    chunks, _ = collect_chunks(audio, get_speech_timestamps(audio, VadOptions(**VAD_PARAMETERS)))
+    return np.concatenate(chunks)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--corpus")
+    parser.add_argument("--model")
+    parser.add_argument("--compute-type", default="int8")
+    parser.add_argument("--json")
+    args = parser.parse_args()
+
+    corpus = with_silences(load_corpus(args.corpus))
+    variants = {
+        "raw": lambda a: a,
+        "client_trim": lambda a: trim_silence(a),
+        "client_trim_pauses": lambda a: trim_silence(a, max_pause_ms=1000),
+        "server_vad": silero_speech,
+    }
+
+    transcriber = None
+    if args.model:
+        from engine.transcriber import Transcriber
+
+        transcriber = Transcriber(model_size=args.model, compute_type=args.compute_type)
+        transcriber.transcribe(corpus[0][1])  # warm-up
+
+    raw_seconds = sum(len(a) for _, a in corpus) / SAMPLE_RATE
+    results = []
+    for name, fn in variants.items():
+        start = time.perf_counter()
+        clips = [fn(audio) for _, audio in corpus]
+        trim_ms = (time.perf_counter() - start) * 1000 / len(corpus)
+        seconds = sum(len(a) for a in clips) / SAMPLE_RATE
+        row = {
+            "variant": name,
+            "audio_s": round(seconds, 1),
+            "saved_pct": round(100 * (1 - seconds / raw_seconds), 1),
+            "trim_ms_per_clip": round(trim_ms, 2),
+        }
+        if transcriber:
+            start = time.perf_counter()
+            for clip in clips:
+                if len(clip):
+                    transcriber.transcribe(clip)
+            row["inference_s"] = round(time.perf_counter() - start, 2)
+        results.append(row)
+
+    if transcriber:
+        base = results[0]["inference_s"]
+        for row in results:
+            row["inference_saved_pct"] = round(100 * (1 - row["inference_s"] / base), 1)
+
+    print(f"{len(corpus)} clips, {raw_seconds:.1f}s of audio\n")
+    columns = list(results[0])
+    print("  ".join(f"{c:>20}" for c in columns))
+    for row in results:
+        print("  ".join(f"{row[c]!s:>20}" for c in columns))
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"clips": len(corpus), "audio_seconds": raw_seconds,
+                       "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+from collections import OrderedDict
+import threading
+import hashlib
+import json
+import time
+import os
+
+
+class TTLCache:
+    """Thread-safe LRU map whose entries also expire after `ttl` seconds."""
+
+    def __init__(self, maxsize=1024, ttl=3600):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None or item[0] < time.monotonic():
+                if item is not None:
+                    del self._data[key]
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return item[1]
+
+    def set(self, key, value, ttl=None):
+        if self.maxsize <= 0:
+            return
+        expires = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (expires, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key):
+        with self._lock:
+            item = self._data.pop(key, None)
+        return item[1] if item else None
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+        }
+
+
+class ResultCache:
+    """Transcription results keyed by content hash plus decode options.
+
+    An in-memory TTLCache in front of an optional directory of JSON files
+    (one per key) that survives restarts and can be shared between
+    workers on the same host.
+    """
+
+    def __init__(self, maxsize=1024, ttl=3600, directory=None):
+        self.memory = TTLCache(maxsize=maxsize, ttl=ttl)
+        self.ttl = ttl
+        self.directory = directory
+        self.disk_hits = 0
+        # Per-request outcome, as opposed to per-lookup counts in memory
+        self.requests = 0
+        self.request_hits = 0
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    @property
+    def enabled(self):
+        return self.memory.maxsize > 0 or bool(self.directory)
+
+    @staticmethod
+    def key(data, **options):
+        # data: upload bytes or a decoded NumPy array
+        digest = hashlib.sha256(memoryview(data).cast("B"))
+        digest.update(json.dumps(options, sort_keys=True, default=str).encode())
+        return digest.hexdigest()
+
+    def get(self, key, disk=True):
+        value = self.memory.get(key)
+        if value is not None or not disk or not self.directory:
+            return value
+
+        path = self._path(key)
+        try:
+            if time.time() - os.path.getmtime(path) > self.ttl:
+                os.remove(path)
+                return None
+            with open(path) as f:
+                value = json.load(f)
+        except (OSError, ValueError):
+            return None
+        self.disk_hits += 1
+        self.memory.set(key, value)
+        return value
+
+    def set(self, key, value, disk=True):
+        self.memory.set(key, value)
+        if not disk or not self.directory:
+            return
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp, "w") as f:
+                json.dump(value, f)
+            os.replace(tmp, path)
+        except OSError:
+            pass
+
+    def record(self, hit):
+        self.requests += 1
+        self.request_hits += bool(hit)
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], f"{key}.json")
+
+    def stats(self):
+        return {
+            "requests": self.requests,
+            "hits": self.request_hits,
+            "hit_rate": round(self.request_hits / self.requests, 3) if self.requests else 0.0,
+            "memory": self.memory.stats(),
+            "disk_dir": self.directory,
+            "disk_hits": self.disk_hits,
+        }
@@ -0,0 +1,93 @@
+"""Model and inference pool settings, shared by the API (api.py) and the
+inference sidecar (python -m inference)."""
+from engine.transcriber import Transcriber
+from engine.batching import MicroBatcher
+from engine.registry import parse_model_specs
+import metrics
+import os
+from functools import partial
+
+# Whisper config
+MODEL_SIZE = os.getenv("WHISPER_MODEL", "tiny")
+DEVICE = os.getenv("WHISPER_DEVICE", "cpu")
+COMPUTE_TYPE = os.getenv("WHISPER_COMPUTE_TYPE", "int8")
+CPU_THREADS = int(os.getenv("WHISPER_CPU_THREADS", "0"))
+LANGUAGE = os.getenv("WHISPER_LANGUAGE") or None
+BEAM_SIZE = int(os.getenv("WHISPER_BEAM_SIZE", "5"))
+
+# Server-side VAD (Silero) skips silence before decoding
+VAD_FILTER = os.getenv("WHISPER_VAD", "1") == "1"
+VAD_PARAMETERS = {
+    "onset": float(os.getenv("WHISPER_VAD_ONSET", "0.5")),
+    "min_silence_duration_ms": int(os.getenv("WHISPER_VAD_MIN_SILENCE_MS", "500")),
+    "speech_pad_ms": int(os.getenv("WHISPER_VAD_SPEECH_PAD_MS", "300")),
+}
+
+# Micro-batching: requests arriving within WHISPER_BATCH_WINDOW_MS of each
+# other (up to WHISPER_BATCH_MAX) share one model run. 0 disables it.
+BATCH_WINDOW_MS = float(os.getenv("WHISPER_BATCH_WINDOW_MS", "0"))
+BATCH_MAX = int(os.getenv("WHISPER_BATCH_MAX", "8"))
+
+# Inference pool: WHISPER_WORKERS transcriptions run in parallel (sharing
+# one model), up to WHISPER_QUEUE_DEPTH more wait, the rest get a 503
+INFERENCE_WORKERS = int(os.getenv("WHISPER_WORKERS", "2"))
+INFERENCE_QUEUE_DEPTH = int(os.getenv("WHISPER_QUEUE_DEPTH", "8"))
+
+# Models that may be served, as "name=size:compute_type,...". Each loads
+# on first use; past WHISPER_MEMORY_BUDGET_MB (0 = no limit) the least
+# recently used are evicted. Free and Pro users get their tier's model
+# unless they pick another one with ?model= (Pro only).
+MODEL_SPECS = parse_model_specs(
+    os.getenv("WHISPER_MODELS") or f"{MODEL_SIZE}={MODEL_SIZE}:{COMPUTE_TYPE}"
+)
+FREE_MODEL = os.getenv("WHISPER_FREE_MODEL") or next(iter(MODEL_SPECS))
+PRO_MODEL = os.getenv("WHISPER_PRO_MODEL") or FREE_MODEL
+MEMORY_BUDGET_MB = int(os.getenv("WHISPER_MEMORY_BUDGET_MB", "0"))
+
+# mode=fast|speculative on /transcribe: greedy decoding on WHISPER_FAST_MODEL
+# first; speculative then re-runs the tier model with full beam search in
+# the background and publishes a correction if the text changed
+FAST_MODEL = os.getenv("WHISPER_FAST_MODEL") or FREE_MODEL
+
+# Cold start: WHISPER_MODEL_DIR holds converted models as <dir>/<size>/
+# (the Docker image bakes them in); sizes found there load straight from
+# disk. WHISPER_LOCAL_ONLY=1 never contacts the Hugging Face hub.
+MODEL_DIR = os.getenv("WHISPER_MODEL_DIR") or None
+LOCAL_FILES_ONLY = os.getenv("WHISPER_LOCAL_ONLY", "0") == "1"
+
+# Multi-process serving: with INFERENCE_SOCKETS set the models live in
+# inference sidecars (python -m inference) shared by all API workers
+INFERENCE_SOCKETS = [
+    s.strip() for s in os.getenv("INFERENCE_SOCKETS", "").split(",") if s.strip()
+]
+
+if BATCH_WINDOW_MS > 0:
+    # Every waiting caller holds a pool thread, so the pool bounds the batch
+    INFERENCE_WORKERS = max(INFERENCE_WORKERS, BATCH_MAX)
+
+
+def model_location(size: str) -> str:
+    if MODEL_DIR:
+        path = os.path.join(MODEL_DIR, size)
+        if os.path.isfile(os.path.join(path, "model.bin")):
+            return path
+    return size
+
+
+def build_engine(spec: dict) -> Transcriber | MicroBatcher:
+    engine = Transcriber(
+        model_size=model_location(spec["model_size"]),
+        device=DEVICE,
+        compute_type=spec["compute_type"],
+        cpu_threads=CPU_THREADS,
+        num_workers=1 if BATCH_WINDOW_MS > 0 else INFERENCE_WORKERS,
+        language=LANGUAGE,
+        beam_size=BEAM_SIZE,
+        vad_filter=VAD_FILTER,
+        vad_parameters=VAD_PARAMETERS,
+        on_span=partial(metrics.record_span, model=spec["name"]) if metrics.METRICS_ENABLED else None,
+        local_files_only=LOCAL_FILES_ONLY,
+    )
+    if BATCH_WINDOW_MS > 0:
+        engine = MicroBatcher(engine, window_ms=BATCH_WINDOW_MS, max_batch=BATCH_MAX)
+    return engine
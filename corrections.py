@@ -0,0 +1,64 @@
+import time
+import uuid
+from datetime import timedelta
+from sqlalchemy import delete, select, update
+from db import SessionLocal
+from engine.speculative import differs
+from models import TranscriptionCorrection, utcnow
+
+# Corrections are polled right after the draft; older ones are deleted
+CORRECTION_TTL_S = 300
+_pruned_at = 0.0
+
+
+async def create_correction(user_id: int, draft: str) -> str:
+    correction_id = uuid.uuid4().hex
+    async with SessionLocal() as session:
+        session.add(TranscriptionCorrection(id=correction_id, user_id=user_id, draft=draft))
+        await _prune(session)
+        await session.commit()
+    return correction_id
+
+
+async def resolve_correction(correction_id: str, draft: str, text: str | None = None,
+                             status: str = "done", latency_ms: float | None = None):
+    values = {"status": status}
+    if text is not None:
+        values.update(text=text, changed=differs(draft, text), latency_ms=latency_ms)
+    async with SessionLocal() as session:
+        await session.execute(
+            update(TranscriptionCorrection)
+            .where(TranscriptionCorrection.id == correction_id)
+            .values(**values)
+        )
+        await session.commit()
+
+
+async def get_correction(correction_id: str, user_id: int) -> dict | None:
+    async with SessionLocal() as session:
+        entry = (await session.execute(
+            select(TranscriptionCorrection).where(
+                TranscriptionCorrection.id == correction_id,
+                TranscriptionCorrection.user_id == user_id,
+                TranscriptionCorrection.created_at >= utcnow() - timedelta(seconds=CORRECTION_TTL_S),
+            )
+        )).scalar_one_or_none()
+    if entry is None:
+        return None
+    result = {"status": entry.status, "draft": entry.draft}
+    if entry.text is not None:
+        result.update(text=entry.text, changed=entry.changed, latency_ms=entry.latency_ms)
+    return result
+
+
+async def _prune(session):
+    # At most once a minute per process
+    global _pruned_at
+    if time.monotonic() - _pruned_at < 60:
+        return
+    _pruned_at = time.monotonic()
+    await session.execute(
+        delete(TranscriptionCorrection).where(
+            TranscriptionCorrection.created_at < utcnow() - timedelta(seconds=CORRECTION_TTL_S)
+        )
+    )
@@ -1,6 +1,10 @@
 import os
+import time
+from sqlalchemy import text
+from sqlalchemy.exc import TimeoutError as PoolTimeout
 from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from sqlalchemy.orm import DeclarativeBase
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 
 DATABASE_URL = os.getenv(
     "DATABASE_URL",
@@ -16,7 +20,60 @@ elif DATABASE_URL.startswith("postgresql://"):
 # Remove sslmode param (asyncpg handles SSL differently)
 DATABASE_URL = DATABASE_URL.split("?")[0]
 
-engine = create_async_engine(DATABASE_URL, echo=False)
+# Connection pool; the defaults match SQLAlchemy's except recycle/pre-ping
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "1") == "1"
+# asyncpg prepared statement caches; set 0 behind pgbouncer in transaction mode
+DB_STATEMENT_CACHE_SIZE = int(os.getenv("DB_STATEMENT_CACHE_SIZE", "100"))
+
+
+class TimedQueuePool(AsyncAdaptedQueuePool):
+    """Queue pool that records how long checkouts wait for a connection."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_s_total = 0.0
+        self.wait_s_max = 0.0
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeout:
+            self.timeouts += 1
+            raise
+        finally:
+            waited = time.perf_counter() - start
+            self.checkouts += 1
+            self.wait_s_total += waited
+            self.wait_s_max = max(self.wait_s_max, waited)
+
+
+def _engine_options():
+    if DATABASE_URL.startswith("sqlite") and ":memory:" in DATABASE_URL:
+        return {}
+    options = {
+        "poolclass": TimedQueuePool,
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": DB_POOL_PRE_PING,
+    }
+    if DATABASE_URL.startswith("postgresql+asyncpg"):
+        options["connect_args"] = {
+            "statement_cache_size": DB_STATEMENT_CACHE_SIZE,
+            "prepared_statement_cache_size": DB_STATEMENT_CACHE_SIZE,
+        }
+    return options
+
+
+engine = create_async_engine(DATABASE_URL, echo=False, **_engine_options())
 SessionLocal = async_sessionmaker(engine, expire_on_commit=False)
 
 
@@ -32,3 +89,29 @@ async def get_db():
 async def init_db():
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
+
+
+async def close_db():
+    await engine.dispose()
+
+
+async def ping_db():
+    async with engine.connect() as conn:
+        await conn.execute(text("SELECT 1"))
+
+
+def pool_stats():
+    pool = engine.pool
+    if not isinstance(pool, TimedQueuePool):
+        return {"pool": type(pool).__name__}
+    return {
+        "pool_size": pool.size(),
+        "max_overflow": DB_MAX_OVERFLOW,
+        "checked_out": pool.checkedout(),
+        "checked_in": pool.checkedin(),
+        "overflow": max(0, pool.overflow()),
+        "checkouts": pool.checkouts,
+        "timeouts": pool.timeouts,
+        "wait_ms_avg": round(pool.wait_s_total / pool.checkouts * 1000, 2) if pool.checkouts else 0.0,
+        "wait_ms_max": round(pool.wait_s_max * 1000, 2),
+    }
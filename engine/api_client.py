@@ -0,0 +1,133 @@
+import json
+import threading
+import time
+import uuid
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# Answers worth retrying: proxy errors and a busy inference pool
+RETRY_STATUSES = (502, 503, 504)
+MAX_RETRY_WAIT_S = 5
+
+
+class ApiClient:
+    """Long-lived transport for the desktop client's calls to the API.
+
+    One requests.Session keeps connections alive between dictations, so
+    only the first request pays for the TCP and TLS handshakes; warm()
+    opens one in the background ahead of time. Every call carries an
+    X-Request-Id that stays the same across its retries, which the server
+    uses to answer a retried /transcribe without running or charging it
+    twice.
+    """
+
+    def __init__(self, base_url, token=None, retries=2, backoff_s=0.5, timeout=30):
+        self.base_url = base_url.rstrip("/")
+        self.retries = retries
+        self.backoff_s = backoff_s
+        self.timeout = timeout
+        self.session = requests.Session()
+        # Retries are ours (below), not urllib3's, so they keep the request id
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=4, max_retries=0)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.token = token
+        # Outcome of the last warm() ping: seconds it took, or None if the
+        # server couldn't be reached, and when it was taken
+        self.ping_s = None
+        self.pinged_at = None
+
+    @property
+    def token(self):
+        return self._token
+
+    @token.setter
+    def token(self, token):
+        self._token = token
+        if token:
+            self.session.headers["Authorization"] = f"Bearer {token}"
+        else:
+            self.session.headers.pop("Authorization", None)
+
+    def request(self, method, path, retries=None, **kwargs):
+        headers = {"X-Request-Id": uuid.uuid4().hex, **kwargs.pop("headers", {})}
+        kwargs.setdefault("timeout", self.timeout)
+        retries = self.retries if retries is None else retries
+        for attempt in range(retries + 1):
+            try:
+                resp = self.session.request(method, f"{self.base_url}{path}", headers=headers, **kwargs)
+            except (requests.ConnectionError, requests.Timeout):
+                if attempt == retries:
+                    raise
+                delay = self.backoff_s * 2 ** attempt
+            else:
+                if resp.status_code not in RETRY_STATUSES or attempt == retries:
+                    return resp
+                try:
+                    delay = float(resp.headers["Retry-After"])
+                except (KeyError, ValueError):
+                    delay = self.backoff_s * 2 ** attempt
+            time.sleep(min(delay, MAX_RETRY_WAIT_S))
+
+    def get(self, path, **kwargs):
+        return self.request("GET", path, **kwargs)
+
+    def post(self, path, **kwargs):
+        return self.request("POST", path, **kwargs)
+
+    def put(self, path, **kwargs):
+        return self.request("PUT", path, **kwargs)
+
+    def delete(self, path, **kwargs):
+        return self.request("DELETE", path, **kwargs)
+
+    def warm(self):
+        """Opens (or refreshes) a pooled connection without blocking, and
+        records how long the server took to answer in ping_s."""
+        def ping():
+            start = time.monotonic()
+            try:
+                self.get("/health", retries=0, timeout=5)
+                self.ping_s = time.monotonic() - start
+            except requests.RequestException:
+                self.ping_s = None
+            self.pinged_at = time.monotonic()
+
+        threading.Thread(target=ping, daemon=True).start()
+
+    def close(self):
+        self.session.close()
+
+
+class StreamError(Exception):
+    """An error frame that ended a streamed transcription."""
+
+    def __init__(self, status, detail):
+        super().__init__(detail)
+        self.status = status
+
+
+def read_transcription(resp, on_segment=None):
+    """Returns the JSON body of a /transcribe answer.
+
+    A ?stream=ndjson answer is read frame by frame: on_segment(segment) is
+    called for each decoded segment as it arrives and the final "done"
+    frame is returned. A plain JSON answer (an older server, a cache hit
+    replayed as JSON) is returned as is, without calling on_segment.
+    """
+    if not resp.headers.get("Content-Type", "").startswith("application/x-ndjson"):
+        return resp.json()
+    for line in resp.iter_lines():
+        if not line:
+            continue
+        frame = json.loads(line)
+        kind = frame.pop("type", None)
+        if kind == "segment":
+            if on_segment:
+                on_segment(frame)
+        elif kind == "done":
+            return frame
+        elif kind == "error":
+            raise StreamError(frame.get("status"), frame.get("detail"))
+    raise StreamError(None, "Respuesta incompleta")
@@ -1,40 +1,163 @@
-import sounddevice as sd
 import numpy as np
 import scipy.io.wavfile as wav
 import threading
-import queue
 import time
 import os
+import io
+
+try:
+    import soundfile as sf
+except ImportError:  # optional: without libsndfile we upload plain WAV
+    sf = None
+
+# Upload formats in order of preference: name -> (filename, mime type)
+UPLOAD_FORMATS = {
+    "opus": ("audio.ogg", "audio/ogg"),
+    "flac": ("audio.flac", "audio/flac"),
+    "wav": ("audio.wav", "audio/wav"),
+}
+
+# Samples moved into a growing SampleBuffer per written sample; above 2
+# the move finishes before the old array fills up
+MIGRATE_BLOCKS = 4
+
+
+class SampleBuffer:
+    """Growable ring buffer of mono samples, one writer and one reader.
+
+    The writer (the PortAudio callback) only appends. Capacity starts at
+    `initial_seconds` and doubles up to `max_seconds`; the copy into the
+    bigger array is spread over the writes after the buffer is half full.
+    Past `max_seconds` the oldest samples are overwritten. Readers get NumPy views of
+    what has been written so far, without copying or locking: the writer
+    fills samples in before publishing the new total, and growing swaps in
+    a new array, so a view taken earlier stays valid. Only once the buffer
+    has wrapped can a view's oldest samples be overwritten, and a read
+    spanning the wrap point is copied.
+    """
+
+    def __init__(self, sample_rate=16000, dtype="float32", initial_seconds=30, max_seconds=600):
+        self.sample_rate = sample_rate
+        self.dtype = np.dtype(dtype)
+        self.max_capacity = int(max_seconds * sample_rate)
+        self._buf = np.empty(min(int(initial_seconds * sample_rate), self.max_capacity), self.dtype)
+        self._total = 0
+        # Bigger buffer being filled in the background of writes, if any
+        self._next = None
+        self._copied = 0
+
+    @property
+    def total(self):
+        # Samples written since the start, including overwritten ones
+        return self._total
+
+    @property
+    def duration(self):
+        return self._total / self.sample_rate
+
+    def write(self, samples):
+        total = self._total
+        n = len(samples)
+        if n >= self.max_capacity:
+            # Overwrites everything buffered so far
+            samples = samples[-self.max_capacity:]
+            total += n - self.max_capacity
+            n = self.max_capacity
+            if len(self._buf) < self.max_capacity:
+                self._buf = np.empty(self.max_capacity, self.dtype)
+                self._next = None
+
+        buf = self._buf
+        if self._next is None and total + n > len(buf) // 2 and len(buf) < self.max_capacity:
+            # Past half full: start moving into a buffer twice the size, a
+            # few blocks' worth per call, so no callback pays for the copy
+            self._next = np.empty(min(2 * len(buf), self.max_capacity), self.dtype)
+            self._copied = 0
+        if self._next is not None:
+            end = min(total, self._copied + MIGRATE_BLOCKS * max(n, 1))
+            self._next[self._copied:end] = buf[self._copied:end]
+            self._copied = end
+            if end == total:
+                self._buf = buf = self._next
+                self._next = None
+        if total + n > len(buf) and len(buf) < self.max_capacity:
+            # A write too big for the gradual path
+            grown = np.empty(min(max(2 * len(buf), total + n), self.max_capacity), self.dtype)
+            grown[:total] = buf[:total]
+            self._buf = buf = grown
+            self._next = None
+
+        capacity = len(buf)
+        pos = total % capacity
+        first = min(n, capacity - pos)
+        buf[pos:pos + first] = samples[:first]
+        buf[:n - first] = samples[first:]
+        self._total = total + n
+
+    def view(self, start=0):
+        """Samples from absolute index `start` (see total) up to now. Older
+        samples that were already overwritten are skipped."""
+        total = self._total
+        buf = self._buf
+        capacity = len(buf)
+        start = max(start, total - capacity, 0)
+        if start >= total:
+            return buf[:0]
+        begin = start % capacity
+        end = begin + total - start
+        if end <= capacity:
+            return buf[begin:end]
+        return np.concatenate((buf[begin:], buf[:end - capacity]))
+
 
 class AudioRecorder:
-    def __init__(self, sample_rate=16000):
+    def __init__(self, sample_rate=16000, dtype="float32", max_seconds=600):
         self.sample_rate = sample_rate
+        # Capture format; int16 halves the buffer, recordings are still
+        # returned as float32
+        self.dtype = dtype
+        self.max_seconds = max_seconds
         self.recording = False
-        self.audio_queue = queue.Queue()
+        self.buffer = None
         self.stream = None
         self._thread = None
+        # Optional callable receiving each captured block (a 1-D view into
+        # the buffer, in self.dtype) as it arrives, e.g. to forward it to
+        # /transcribe/stream. Copy it if it must outlive the callback.
+        self.on_frames = None
 
     def _audio_callback(self, indata, frames, time, status):
         if status:
             print(f"Audio status: {status}")
-        self.audio_queue.put(indata.copy())
+        start = self.buffer.total
+        self.buffer.write(indata[:, 0])
+        if self.on_frames:
+            self.on_frames(self.buffer.view(start))
 
-    def start_recording(self):
+    def start_recording(self, on_frames=None):
         if self.recording:
             return
         
+        # Imported here so the encoding helpers below work on machines
+        # without PortAudio (servers, benchmarks)
+        import sounddevice as sd
+
+        self.on_frames = on_frames
         self.recording = True
-        self.audio_queue = queue.Queue()
+        # A fresh buffer each time: the previous recording may still be in use
+        self.buffer = SampleBuffer(self.sample_rate, self.dtype, max_seconds=self.max_seconds)
         self.stream = sd.InputStream(
             samplerate=self.sample_rate,
             channels=1,
-            dtype='float32',
+            dtype=self.dtype,
             callback=self._audio_callback
         )
         self.stream.start()
         print("Recording started...")
 
-    def stop_recording(self, output_path="temp_audio.wav"):
+    def stop_recording(self, output_path=None):
+        """Stops capture and returns the recording as a float32 array, or
+        writes it to output_path as WAV and returns the path if given."""
         if not self.recording:
             return None
         
@@ -43,22 +166,60 @@ class AudioRecorder:
         self.stream.close()
         print("Recording stopped.")
 
-        audio_data = []
-        while not self.audio_queue.empty():
-            audio_data.append(self.audio_queue.get())
-        
-        if not audio_data:
+        full_audio = self.buffer.view()
+        if not len(full_audio):
             return None
+        if full_audio.dtype == np.int16:
+            full_audio = full_audio.astype(np.float32) / 32768
 
-        full_audio = np.concatenate(audio_data, axis=0)
-        
-        # Save to wav file
-        wav.write(output_path, self.sample_rate, (full_audio * 32767).astype(np.int16))
-        return output_path
+        if output_path:
+            wav.write(output_path, self.sample_rate, (full_audio * 32767).astype(np.int16))
+            return output_path
+        return full_audio
+
+
+def to_wav_bytes(audio, sample_rate=16000):
+    # 16-bit mono WAV in memory, ready to upload
+    buffer = io.BytesIO()
+    wav.write(buffer, sample_rate, (np.clip(audio, -1, 1) * 32767).astype(np.int16))
+    return buffer.getvalue()
+
+
+def encodable_formats():
+    if sf is None:
+        return ["wav"]
+    # libsndfile before 1.0.29 has no Opus encoder
+    return [f for f in UPLOAD_FORMATS if f != "opus" or "OPUS" in sf.available_subtypes("OGG")]
+
+
+def encode_audio(audio, fmt="wav", sample_rate=16000):
+    """Encodes a float32 recording for upload.
+
+    Returns (filename, data, mime type). Opus at speech bitrates is roughly
+    10x smaller than 16-bit WAV; FLAC is lossless but only ~2x smaller.
+    """
+    if fmt not in encodable_formats():
+        fmt = "wav"
+    filename, mime = UPLOAD_FORMATS[fmt]
+    if fmt == "wav":
+        return filename, to_wav_bytes(audio, sample_rate), mime
+
+    buffer = io.BytesIO()
+    try:
+        if fmt == "opus":
+            sf.write(buffer, audio, sample_rate, format="OGG", subtype="OPUS")
+        else:
+            sf.write(buffer, audio, sample_rate, format="FLAC", subtype="PCM_16")
+    except (RuntimeError, ValueError) as e:
+        # A libsndfile that can't write this format mustn't lose the dictation
+        print(f"Could not encode {fmt}, sending WAV: {e}")
+        filename, mime = UPLOAD_FORMATS["wav"]
+        return filename, to_wav_bytes(audio, sample_rate), mime
+    return filename, buffer.getvalue(), mime
 
 if __name__ == "__main__":
     recorder = AudioRecorder()
     recorder.start_recording()
     time.sleep(3)
-    path = recorder.stop_recording()
+    path = recorder.stop_recording("temp_audio.wav")
     print(f"Saved to {path}")
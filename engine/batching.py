@@ -0,0 +1,185 @@
+from concurrent.futures import Future
+from bisect import bisect_right
+from engine.decoding import load_audio
+import threading
+import queue
+import time
+import os
+
+SAMPLE_RATE = 16000
+# Whisper's receptive field; longer clips can't share a batch slot
+MAX_CLIP_SECONDS = 30
+
+
+class MicroBatcher:
+    """Coalesces concurrent transcribe() calls into batched model runs.
+
+    Callers block in transcribe() like they would on a Transcriber. A single
+    batching thread waits up to `window_ms` after the first request for more
+    to arrive (at most `max_batch`), lays the clips end to end and runs them
+    through faster-whisper's BatchedInferencePipeline with one clip per
+    batch slot, then hands each caller its own text.
+    """
+
+    def __init__(self, transcriber, window_ms=20, max_batch=8):
+        from faster_whisper import BatchedInferencePipeline
+
+        self.transcriber = transcriber
+        self.pipeline = BatchedInferencePipeline(transcriber.model)
+        self.window = window_ms / 1000
+        self.max_batch = max_batch
+        self.batches = 0
+        self.clips = 0
+        self._queue = queue.Queue()
+        # Set by close(); under _lock so no clip is queued behind the
+        # sentinel that stops the batching thread
+        self._closed = False
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(
+            target=self._loop, name="whisper-batcher", daemon=True
+        )
+        self._thread.start()
+
+    @property
+    def model(self):
+        return self.transcriber.model
+
+    def transcribe(self, audio, beam_size=None):
+        # Decode on the caller's thread so clips decode in parallel
+        if isinstance(audio, str):
+            if not os.path.exists(audio):
+                return ""
+            from faster_whisper import decode_audio
+
+            audio = decode_audio(audio, sampling_rate=SAMPLE_RATE)
+        elif isinstance(audio, (bytes, bytearray)):
+            audio = load_audio(bytes(audio))
+
+        if self.transcriber.vad_filter:
+            audio = self._speech_only(audio)
+        if not len(audio):
+            return ""
+        if len(audio) > MAX_CLIP_SECONDS * SAMPLE_RATE:
+            return self.transcriber.transcribe(audio, beam_size=beam_size)
+
+        future = Future()
+        with self._lock:
+            queued = not self._closed
+            if queued:
+                self._queue.put((audio, beam_size or self.transcriber.beam_size, future))
+        if not queued:
+            # Evicted after this caller got hold of it; the model still
+            # works, just unbatched
+            return self.transcriber.transcribe(audio, beam_size=beam_size)
+        return future.result()
+
+    def _speech_only(self, audio):
+        # Batched decoding takes explicit clip bounds instead of running
+        # VAD itself, so apply the Transcriber's VAD settings up front
+        from faster_whisper.vad import VadOptions, get_speech_timestamps, collect_chunks
+        import numpy as np
+
+        options = VadOptions(**(self.transcriber.vad_parameters or {}))
+        chunks, _ = collect_chunks(audio, get_speech_timestamps(audio, options))
+        return np.concatenate(chunks)
+
+    def segments(self, audio, beam_size=None, progress=None):
+        # Timestamped decoding isn't batched
+        return self.transcriber.segments(audio, beam_size=beam_size, progress=progress)
+
+    def iter_segments(self, audio, beam_size=None, progress=None):
+        return self.transcriber.iter_segments(audio, beam_size=beam_size, progress=progress)
+
+    def close(self):
+        # Clips queued before this are still decoded, then the thread ends
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._queue.put(None)
+
+    def _loop(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            batch = [item]
+            deadline = time.monotonic() + self.window
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is None:
+                    self._queue.put(None)
+                    break
+                batch.append(item)
+
+            try:
+                texts = self._run_batch([(audio, beam) for audio, beam, _ in batch])
+            except Exception as e:
+                for _, _, future in batch:
+                    future.set_exception(e)
+                continue
+            for (_, _, future), text in zip(batch, texts):
+                future.set_result(text)
+
+    def _run_batch(self, clips):
+        import numpy as np
+
+        self.batches += 1
+        self.clips += len(clips)
+
+        # The pipeline decodes a whole batch with one tokenizer and one set
+        # of options, so clips are grouped by language and beam size;
+        # language is detected per clip when none is pinned.
+        groups = {}
+        for i, (clip, beam_size) in enumerate(clips):
+            language = self.transcriber.language
+            if language is None:
+                language, _, _ = self.model.detect_language(clip)
+            groups.setdefault((language, beam_size), []).append(i)
+        clips = [clip for clip, _ in clips]
+
+        texts = [""] * len(clips)
+        for (language, beam_size), indices in groups.items():
+            starts = []
+            clip_timestamps = []
+            offset = 0
+            for i in indices:
+                starts.append(offset / SAMPLE_RATE)
+                clip_timestamps.append({"start": offset, "end": offset + len(clips[i])})
+                offset += len(clips[i])
+
+            start = time.perf_counter()
+            segments, _ = self.pipeline.transcribe(
+                np.concatenate([clips[i] for i in indices]),
+                language=language,
+                beam_size=beam_size,
+                vad_filter=False,
+                clip_timestamps=clip_timestamps,
+                batch_size=len(indices),
+            )
+            # Segment times are offsets into the concatenated audio, which
+            # tells us which clip each one came from
+            parts = [[] for _ in indices]
+            for segment in segments:
+                slot = max(0, bisect_right(starts, segment.start + 1e-3) - 1)
+                parts[slot].append(segment.text.strip())
+            for slot, i in enumerate(indices):
+                texts[i] = " ".join(p for p in parts[slot] if p)
+            if self.transcriber.on_span:
+                self.transcriber.on_span(
+                    "inference", time.perf_counter() - start, audio_s=offset / SAMPLE_RATE
+                )
+        return texts
+
+    def stats(self):
+        return {
+            "batches": self.batches,
+            "clips": self.clips,
+            "avg_batch": round(self.clips / self.batches, 2) if self.batches else 0,
+        }
@@ -0,0 +1,55 @@
+import wave
+import io
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import numpy as np
+
+SAMPLE_RATE = 16000
+
+# Raw little-endian 16-bit mono PCM at 16 kHz, no container
+PCM_CONTENT_TYPES = ("audio/pcm", "audio/x-pcm")
+
+
+def load_audio(data: bytes, content_type: str | None = None) -> "np.ndarray":
+    """Decode an upload held in memory into a 16 kHz mono float32 array.
+
+    Raw PCM and 16 kHz PCM WAV (what the desktop client sends) are read
+    directly with NumPy; anything else goes through faster-whisper's PyAV
+    decoder from a BytesIO, so nothing touches the disk.
+    """
+    import numpy as np
+
+    mime = (content_type or "").split(";")[0].strip().lower()
+    if mime in PCM_CONTENT_TYPES:
+        usable = len(data) - len(data) % 2
+        return np.frombuffer(data[:usable], dtype="<i2").astype(np.float32) / 32768
+
+    if data[:4] == b"RIFF" and data[8:12] == b"WAVE":
+        audio = _read_wav(data)
+        if audio is not None:
+            return audio
+
+    from faster_whisper import decode_audio
+
+    return decode_audio(io.BytesIO(data), sampling_rate=SAMPLE_RATE)
+
+
+def _read_wav(data: bytes) -> "np.ndarray | None":
+    import numpy as np
+
+    # Returns None when the WAV needs resampling or isn't integer PCM
+    try:
+        with wave.open(io.BytesIO(data), "rb") as w:
+            if w.getframerate() != SAMPLE_RATE or w.getsampwidth() != 2:
+                return None
+            channels = w.getnchannels()
+            frames = w.readframes(w.getnframes())
+    except (wave.Error, EOFError):
+        return None
+
+    audio = np.frombuffer(frames, dtype="<i2").astype(np.float32) / 32768
+    if channels > 1:
+        audio = audio[: len(audio) - len(audio) % channels]
+        audio = audio.reshape(-1, channels).mean(axis=1)
+    return audio
@@ -1,7 +1,19 @@
 from pynput import keyboard
 import pyautogui
 import threading
+import string
 import time
+import sys
+
+# Text at least this long is pasted instead of typed key by key
+PASTE_MIN_CHARS = 40
+# The target app reads the clipboard asynchronously after Cmd/Ctrl+V
+PASTE_SETTLE_S = 0.15
+PASTE_KEYS = ("command", "v") if sys.platform == "darwin" else ("ctrl", "v")
+# Characters pyautogui.write() can send; the rest (á, ñ, ¿, ...) are
+# silently skipped, so text containing them is always pasted. KEYBOARD_KEYS
+# lists letters in lowercase only; write() sends capitals with Shift.
+TYPEABLE = frozenset(k for k in pyautogui.KEYBOARD_KEYS if len(k) == 1) | frozenset(string.ascii_uppercase)
 
 class KeyboardController:
     def __init__(self, on_activate_callback):
@@ -31,16 +43,82 @@ class KeyboardController:
     def _on_release(self, key):
         self.hotkey.release(self.listener.canonical(key))
 
-    def type_text(self, text):
+    def type_text(self, text, strategy=None):
+        """Injects text where the cursor is. strategy is "type" (one
+        keystroke per character), "paste" (through the clipboard) or None
+        to pick by length."""
         if not text:
             return
-        
-        # Give the user a tiny bit of time to refocus if needed, 
+
+        # Give the user a tiny bit of time to refocus if needed,
         # though usually it happens in the background.
         time.sleep(0.1)
-        pyautogui.write(text)
+        self._inject(text, strategy or self.choose_strategy(text))
         print(f"Typed: {text}")
 
+    def choose_strategy(self, text):
+        if len(text) >= PASTE_MIN_CHARS or not TYPEABLE.issuperset(text):
+            return "paste"
+        return "type"
+
+    def _inject(self, text, strategy):
+        if strategy == "paste" and self.paste_text(text):
+            return
+        pyautogui.write(text)
+
+    def paste_text(self, text):
+        """Pastes text, then puts back what the clipboard held. Returns
+        False if the clipboard can't be used (e.g. no xclip on Linux)."""
+        import pyperclip
+
+        try:
+            saved = pyperclip.paste()
+            pyperclip.copy(text)
+        except pyperclip.PyperclipException as e:
+            print(f"Clipboard unavailable, typing instead: {e}")
+            return False
+        pyautogui.hotkey(*PASTE_KEYS)
+        time.sleep(PASTE_SETTLE_S)
+        try:
+            # Only text survives; an image on the clipboard is lost
+            pyperclip.copy(saved)
+        except pyperclip.PyperclipException:
+            pass
+        return True
+
+    def incremental(self):
+        """Returns an IncrementalTyper for text that arrives in pieces."""
+        return IncrementalTyper(self)
+
+
+class IncrementalTyper:
+    """Types a dictation segment by segment as the server streams it.
+
+    Each segment is injected as soon as it arrives, separated from the
+    previous one by a space, with the strategy chosen by its own length.
+    The refocus pause is only paid before the first one.
+    """
+
+    def __init__(self, controller):
+        self.controller = controller
+        self.segments = []
+
+    def feed(self, text):
+        text = text.strip()
+        if not text:
+            return
+        if self.segments:
+            text = " " + text
+        else:
+            time.sleep(0.1)
+        self.controller._inject(text, self.controller.choose_strategy(text))
+        self.segments.append(text)
+
+    @property
+    def text(self):
+        return "".join(self.segments)
+
+
 if __name__ == "__main__":
     def test_callback():
         print("Action triggered!")
@@ -0,0 +1,114 @@
+import threading
+import time
+
+# Clips up to this long are transcribed on-device in hybrid mode
+LOCAL_MAX_S = 20.0
+# A /health ping slower than this counts as a slow network
+SLOW_PING_S = 0.5
+# How long a failed ping or request keeps hybrid mode on-device
+OFFLINE_HOLD_S = 30.0
+
+
+class LocalEngine:
+    """A Transcriber kept resident in the desktop client.
+
+    The model is loaded on a background thread by start(), so launching
+    the app isn't delayed; `ready` is set once it can transcribe. If
+    faster-whisper isn't installed (the packaged app leaves it out) or the
+    model can't be loaded, `error` is set and the engine stays unavailable.
+    """
+
+    def __init__(self, model_size="tiny", compute_type="int8", cpu_threads=0, language=None):
+        self.model_size = model_size
+        self.compute_type = compute_type
+        self.cpu_threads = cpu_threads
+        self.language = language
+        self.transcriber = None
+        self.error = None
+        self.ready = threading.Event()
+        self._lock = threading.Lock()
+
+    def start(self):
+        threading.Thread(target=self._load, daemon=True).start()
+
+    def _load(self):
+        try:
+            from engine.transcriber import Transcriber
+
+            self.transcriber = Transcriber(
+                model_size=self.model_size,
+                compute_type=self.compute_type,
+                cpu_threads=self.cpu_threads,
+                language=self.language,
+            )
+            # The first call pays for allocating buffers; do it now
+            import numpy as np
+            self.transcriber.transcribe(np.zeros(16000, dtype=np.float32))
+            self.ready.set()
+        except Exception as e:
+            print(f"Local transcription unavailable: {e}")
+            self.error = e
+
+    @property
+    def available(self):
+        return self.ready.is_set()
+
+    def transcribe(self, audio, beam_size=None):
+        # audio: 16 kHz float32 samples. One dictation at a time; the
+        # model is sized for that.
+        with self._lock:
+            return self.transcriber.transcribe(audio, beam_size=beam_size)
+
+
+class HybridPolicy:
+    """Decides where a dictation is transcribed.
+
+    mode is "server", "local" or "hybrid". Hybrid uses the local engine,
+    once loaded, for clips up to `local_max_s` and for any clip while the
+    network is slow (last /health ping over `slow_ping_s`) or the server
+    recently couldn't be reached; everything else goes to the server.
+    Free users whose weekly words ran out always go to the server, which
+    enforces the limit.
+    """
+
+    def __init__(self, engine, api, mode="hybrid", local_max_s=LOCAL_MAX_S,
+                 slow_ping_s=SLOW_PING_S, offline_hold_s=OFFLINE_HOLD_S):
+        self.engine = engine
+        self.api = api
+        self.mode = mode
+        self.local_max_s = local_max_s
+        self.slow_ping_s = slow_ping_s
+        self.offline_hold_s = offline_hold_s
+        self.offline_since = None
+        # Last words_remaining the server reported (-1 for Pro)
+        self.words_remaining = None
+
+    def network_ok(self):
+        if self.offline_since and time.monotonic() - self.offline_since < self.offline_hold_s:
+            return False
+        if self.api.pinged_at is None:
+            return True
+        return self.api.ping_s is not None and self.api.ping_s <= self.slow_ping_s
+
+    def mark_offline(self):
+        self.offline_since = time.monotonic()
+
+    def mark_online(self):
+        self.offline_since = None
+
+    def may_run_locally(self):
+        if self.mode == "server" or not self.engine.available:
+            return False
+        return self.words_remaining is None or self.words_remaining != 0
+
+    def use_local(self, duration_s):
+        if not self.may_run_locally():
+            return False
+        if self.mode == "local":
+            return True
+        return duration_s <= self.local_max_s or not self.network_ok()
+
+    def use_server_upload(self):
+        # Whether to stream the recording to the server while it is made;
+        # in hybrid mode the clip's length is only known at the end
+        return self.mode != "local" or not self.engine.available
@@ -0,0 +1,110 @@
+from engine.speculative import normalize
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import numpy as np
+
+SAMPLE_RATE = 16000
+# Longest word sequence repeated across a seam that stitch() removes
+MAX_REPEAT_WORDS = 6
+
+
+def plan_chunks(audio: "np.ndarray", chunk_s=28.0, overlap_s=1.0, search_s=5.0, frame_ms=20):
+    """Splits a long recording into pieces that can be decoded independently.
+
+    Each cut is placed at the quietest frame in the `search_s` seconds
+    before the next `chunk_s` boundary, so it usually falls in a pause.
+    Every piece also takes `overlap_s` of audio past its cuts, so a word
+    that straddles a cut is heard whole by at least one side. The default
+    keeps a piece, overlap included, within Whisper's 30 s window.
+
+    Returns (start, end, own_from, own_to) sample indices: the audio to
+    decode, and the span whose segments belong to this piece.
+    """
+    import numpy as np
+
+    n = len(audio)
+    chunk = int(chunk_s * SAMPLE_RATE)
+    overlap = int(overlap_s * SAMPLE_RATE)
+    search = int(min(search_s, chunk_s / 2) * SAMPLE_RATE)
+    frame = max(1, int(frame_ms * SAMPLE_RATE / 1000))
+
+    cuts = [0]
+    while n - cuts[-1] > chunk:
+        target = cuts[-1] + chunk
+        low = target - search
+        window = audio[low:target]
+        frames = window[: len(window) // frame * frame].reshape(-1, frame)
+        energy = (frames.astype(np.float32) ** 2).mean(axis=1)
+        # Latest of the quietest frames, so pieces stay close to chunk_s
+        quietest = len(energy) - 1 - int(np.argmin(energy[::-1]))
+        cuts.append(low + quietest * frame + frame // 2)
+    cuts.append(n)
+    return [
+        (max(0, a - overlap), min(n, b + overlap), a, b)
+        for a, b in zip(cuts[:-1], cuts[1:])
+    ]
+
+
+def stitch(chunks, results):
+    """Joins the segments decoded from each planned piece (times relative
+    to the piece) into one timeline. A segment is kept by the piece that
+    owns its midpoint; words repeated right across a seam are dropped."""
+    merged = []
+    for i, segments in enumerate(results):
+        stitch_piece(chunks, i, segments, merged)
+    return merged
+
+
+def stitch_piece(chunks, i, segments, merged):
+    """stitch() one piece at a time: appends what piece i keeps to `merged`
+    and returns those segments. Pieces must be added in order."""
+    start, _, own_from, own_to = chunks[i]
+    last = len(chunks) - 1
+    offset = start / SAMPLE_RATE
+    seam = bool(merged)
+    kept = []
+    for segment in segments:
+        segment = {
+            **segment,
+            "start": round(segment["start"] + offset, 3),
+            "end": round(segment["end"] + offset, 3),
+        }
+        middle = (segment["start"] + segment["end"]) / 2 * SAMPLE_RATE
+        if (i and middle < own_from) or (i < last and middle >= own_to):
+            continue
+        if seam:
+            segment["text"] = _drop_repeat(merged[-1]["text"], segment["text"])
+            seam = False
+        if segment["text"]:
+            merged.append(segment)
+            kept.append(segment)
+    return kept
+
+
+def _drop_repeat(before: str, text: str) -> str:
+    # Both sides of a seam may transcribe the same few words
+    tail = before.split()
+    words = text.split()
+    for k in range(min(MAX_REPEAT_WORDS, len(tail), len(words)), 0, -1):
+        if normalize(" ".join(tail[-k:])) == normalize(" ".join(words[:k])):
+            return " ".join(words[k:])
+    return text
+
+
+def transcribe_parallel(engine, audio: "np.ndarray", workers: int, beam_size=None, **plan):
+    """Decodes the planned pieces of `audio` on `workers` threads sharing
+    `engine` (a Transcriber created with num_workers >= workers) and
+    returns the stitched segments."""
+    from concurrent.futures import ThreadPoolExecutor
+
+    chunks = plan_chunks(audio, **plan)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(
+            lambda c: engine.segments(audio[c[0]:c[1]], beam_size=beam_size), chunks
+        ))
+    return stitch(chunks, results)
+
+
+def text_of(segments) -> str:
+    return " ".join(s["text"] for s in segments)
@@ -0,0 +1,137 @@
+from collections import OrderedDict
+import threading
+import resource
+import time
+import os
+
+
+def parse_model_specs(value):
+    """Parses "name=size:compute_type,..." (e.g. "tiny=tiny:int8,
+    small=small:int8") into {name: {"name", "model_size", "compute_type"}}."""
+    specs = {}
+    for item in value.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        name, _, model = item.partition("=")
+        size, _, compute_type = (model or name).partition(":")
+        specs[name.strip()] = {
+            "name": name.strip(),
+            "model_size": size.strip(),
+            "compute_type": compute_type.strip() or "int8",
+        }
+    return specs
+
+
+def resident_memory_mb():
+    # Current RSS on Linux; peak RSS elsewhere
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except (OSError, ValueError, IndexError):
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 2**20 if peak > 2**24 else peak / 1024
+
+
+class ModelRegistry:
+    """Holds several named model configurations, loading each on first use.
+
+    `factory(spec)` builds the engine for a spec (a Transcriber, possibly
+    wrapped in a MicroBatcher). When the summed footprint of loaded models
+    exceeds `memory_budget_mb` (0 = unlimited) the least recently used ones
+    are dropped; requests already holding an evicted engine finish on
+    their own reference (a closed MicroBatcher decodes them unbatched).
+    """
+
+    def __init__(self, specs, factory, memory_budget_mb=0):
+        self.specs = specs
+        self.factory = factory
+        self.memory_budget_mb = memory_budget_mb
+        self._loaded = OrderedDict()
+        self._lock = threading.Lock()
+        # One load at a time keeps the RSS deltas attributable
+        self._load_lock = threading.Lock()
+        self._evictions = 0
+
+    def __contains__(self, name):
+        return name in self.specs
+
+    def is_loaded(self, name):
+        return name in self._loaded
+
+    def get(self, name):
+        if name not in self.specs:
+            raise KeyError(f"Unknown model: {name}")
+
+        with self._lock:
+            entry = self._loaded.get(name)
+            if entry:
+                self._loaded.move_to_end(name)
+                entry["uses"] += 1
+                return entry["engine"]
+
+        with self._load_lock:
+            with self._lock:
+                entry = self._loaded.get(name)
+            if entry is None:
+                entry = self._load(name)
+            with self._lock:
+                self._loaded[name] = entry
+                self._loaded.move_to_end(name)
+                entry["uses"] += 1
+                evicted = self._evict(keep=name)
+        for old in evicted:
+            if hasattr(old["engine"], "close"):
+                old["engine"].close()
+        return entry["engine"]
+
+    def _load(self, name):
+        before = resident_memory_mb()
+        start = time.perf_counter()
+        engine = self.factory(self.specs[name])
+        return {
+            "engine": engine,
+            "load_s": round(time.perf_counter() - start, 2),
+            "memory_mb": round(max(0.0, resident_memory_mb() - before), 1),
+            "loaded_at": time.time(),
+            "uses": 0,
+        }
+
+    def _evict(self, keep):
+        evicted = []
+        if not self.memory_budget_mb:
+            return evicted
+        while len(self._loaded) > 1:
+            total = sum(e["memory_mb"] for e in self._loaded.values())
+            if total <= self.memory_budget_mb:
+                break
+            oldest = next(n for n in self._loaded if n != keep)
+            evicted.append(self._loaded.pop(oldest))
+            self._evictions += 1
+        return evicted
+
+    def close(self):
+        with self._lock:
+            entries = list(self._loaded.values())
+            self._loaded.clear()
+        for entry in entries:
+            if hasattr(entry["engine"], "close"):
+                entry["engine"].close()
+
+    def stats(self):
+        with self._lock:
+            loaded = {
+                name: {k: v for k, v in entry.items() if k != "engine"}
+                for name, entry in self._loaded.items()
+            }
+        return {
+            "models": {
+                name: {**spec, "loaded": name in loaded, **loaded.get(name, {})}
+                for name, spec in self.specs.items()
+            },
+            "resident_mb": round(sum(e["memory_mb"] for e in loaded.values()), 1),
+            "process_rss_mb": round(resident_memory_mb(), 1),
+            "memory_budget_mb": self.memory_budget_mb,
+            "evictions": self._evictions,
+        }
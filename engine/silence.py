@@ -0,0 +1,43 @@
+import numpy as np
+
+
+def trim_silence(audio, sample_rate=16000, frame_ms=30, pad_ms=250,
+                 max_pause_ms=None, margin_db=12, floor_db=-50):
+    """Energy-based voice activity trimming.
+
+    Frames louder than the estimated noise floor plus `margin_db` (and
+    above `floor_db` in absolute terms) count as speech. Leading and
+    trailing silence is cut down to `pad_ms`, and if `max_pause_ms` is set,
+    internal pauses longer than that are shortened to it. Returns an empty
+    array when nothing sounds like speech.
+    """
+    frame = int(sample_rate * frame_ms / 1000)
+    n_frames = len(audio) // frame
+    if n_frames == 0:
+        return audio
+
+    frames = audio[: n_frames * frame].reshape(n_frames, frame)
+    rms_db = 10 * np.log10(np.mean(frames ** 2, axis=1) + 1e-10)
+    noise_floor = np.percentile(rms_db, 10)
+    voiced = np.flatnonzero(rms_db > max(noise_floor + margin_db, floor_db))
+    if not len(voiced):
+        return audio[:0]
+
+    pad = int(pad_ms / frame_ms)
+    first = max(0, voiced[0] - pad)
+    last = min(n_frames, voiced[-1] + 1 + pad)
+    # Padding up to the last whole frame keeps the partial frame after it
+    end = last * frame if last < n_frames else len(audio)
+    if not max_pause_ms:
+        return audio[first * frame: end]
+
+    # Keep every voiced run plus at most max_pause_ms of the gap after it
+    keep_gap = int(max_pause_ms / frame_ms)
+    pieces = []
+    start = first
+    for prev, cur in zip(voiced[:-1], voiced[1:]):
+        if cur - prev - 1 > keep_gap:
+            pieces.append(audio[start * frame: (prev + 1 + keep_gap // 2) * frame])
+            start = cur - (keep_gap - keep_gap // 2)
+    pieces.append(audio[start * frame: end])
+    return np.concatenate(pieces)
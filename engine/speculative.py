@@ -0,0 +1,13 @@
+import string
+
+_PUNCTUATION = str.maketrans("", "", string.punctuation + "¿¡")
+
+
+def normalize(text):
+    return " ".join(text.lower().translate(_PUNCTUATION).split())
+
+
+def differs(draft, final):
+    # Casing and punctuation changes aren't worth retyping
+    return normalize(draft) != normalize(final)
+
@@ -0,0 +1,109 @@
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import numpy as np
+
+SAMPLE_RATE = 16000
+
+
+class StreamingSession:
+    """Rolling-window state for one live transcription stream.
+
+    PCM frames are appended with feed(). Every `step_s` seconds of new audio
+    the caller decodes window() (all audio not yet committed) and passes
+    the segments to update(). Once the window grows past `max_window_s`,
+    every segment but the last is committed as final and its audio dropped,
+    so each decode stays short and the decode after the user stops only
+    covers the tail of the utterance.
+    """
+
+    def __init__(self, dtype="float32", step_s=1.0, max_window_s=10.0):
+        if dtype not in ("float32", "int16"):
+            raise ValueError("dtype must be float32 or int16")
+        self.dtype = dtype
+        self.step = int(step_s * SAMPLE_RATE)
+        self.max_window = int(max_window_s * SAMPLE_RATE)
+        self.offset = 0.0  # stream time of the first uncommitted sample
+        self.committed = []
+        self._chunks = []
+        self._samples = 0
+        self._pending = 0
+        self._decoded_until = 0.0
+        self._remainder = b""
+
+    @property
+    def duration(self) -> float:
+        return self.offset + self._samples / SAMPLE_RATE
+
+    @property
+    def uncommitted(self) -> float:
+        # Seconds the next window() covers
+        return self._samples / SAMPLE_RATE
+
+    def feed(self, data: bytes):
+        import numpy as np
+
+        width = 2 if self.dtype == "int16" else 4
+        data = self._remainder + data
+        usable = len(data) - len(data) % width
+        self._remainder = data[usable:]
+        if not usable:
+            return
+        samples = np.frombuffer(data[:usable], dtype=self.dtype)
+        if self.dtype == "int16":
+            samples = samples.astype(np.float32) / 32768
+        self._chunks.append(samples)
+        self._samples += len(samples)
+        self._pending += len(samples)
+
+    def should_decode(self) -> bool:
+        return self._pending >= self.step
+
+    def window(self) -> "np.ndarray":
+        self._pending = 0
+        self._decoded_until = self.duration
+        return self._audio()
+
+    def _audio(self) -> "np.ndarray":
+        import numpy as np
+
+        if len(self._chunks) > 1:
+            self._chunks = [np.concatenate(self._chunks)]
+        return self._chunks[0] if self._chunks else np.zeros(0, dtype=np.float32)
+
+    def update(self, segments, final=False):
+        """Apply the segments decoded from the last window().
+
+        Returns (newly committed segments, partial text of the tail)."""
+        segments = [
+            {**s, "start": s["start"] + self.offset, "end": s["end"] + self.offset}
+            for s in segments
+            if s["text"]
+        ]
+        if final:
+            done, tail = segments, []
+        elif self._samples > self.max_window and len(segments) > 1:
+            # The last segment may still be growing; everything before it
+            # has enough right context to be stable
+            done, tail = segments[:-1], segments[-1:]
+        elif self._samples > 2 * self.max_window:
+            # No segment boundary (or only silence) for a long time
+            done, tail = segments, []
+        else:
+            return [], " ".join(s["text"] for s in segments)
+
+        if not final:
+            cut = tail[0]["start"] if tail else self._decoded_until
+            self._drop(cut - self.offset)
+        self.committed.extend(done)
+        return done, " ".join(s["text"] for s in tail)
+
+    def text(self) -> str:
+        return " ".join(s["text"] for s in self.committed)
+
+    def _drop(self, seconds):
+        samples = min(self._samples, max(0, int(seconds * SAMPLE_RATE)))
+        audio = self._audio()[samples:]
+        self._chunks = [audio] if len(audio) else []
+        self._samples = len(audio)
+        self.offset += samples / SAMPLE_RATE
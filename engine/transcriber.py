@@ -1,8 +1,16 @@
-from faster_whisper import WhisperModel
+from engine.decoding import load_audio
+import time
 import os
 
 class Transcriber:
-    def __init__(self, model_size="tiny", device="cpu", compute_type="int8"):
+    def __init__(self, model_size="tiny", device="cpu", compute_type="int8",
+                 cpu_threads=0, num_workers=1, language=None, beam_size=5,
+                 vad_filter=False, vad_parameters=None, on_span=None,
+                 local_files_only=False):
+        # faster-whisper pulls in CTranslate2, PyAV and tokenizers; importing
+        # it here keeps them off the import path of code that never loads a model
+        from faster_whisper import WhisperModel
+
         # We use 'tiny' by default for speed and lower resource usage on laptops
         # Local model storage within the project
         model_path = os.path.join(os.getcwd(), "models")
@@ -11,26 +19,92 @@ class Transcriber:
             
         print(f"Loading Whisper model: {model_size}...")
         self.model = WhisperModel(
+            # A size name, or a directory holding a converted model
             model_size, 
             device=device, 
             compute_type=compute_type,
-            download_root=model_path
+            cpu_threads=cpu_threads,
+            # Number of transcribe() calls that may run in parallel from
+            # different threads while sharing the same weights
+            num_workers=num_workers,
+            download_root=model_path,
+            # Only use what is already in download_root, never ask the hub
+            local_files_only=local_files_only,
         )
+        self.language = language
+        self.beam_size = beam_size
+        # Silero VAD drops non-speech before decoding; vad_parameters are
+        # faster_whisper.vad.VadOptions fields (onset,
+        # min_silence_duration_ms, speech_pad_ms, ...)
+        self.vad_filter = vad_filter
+        self.vad_parameters = vad_parameters
+        # on_span(name, seconds, **info) is told how long "decode" and
+        # "inference" took (inference with audio_s, the audio duration)
+        self.on_span = on_span
         print("Model loaded successfully.")
 
-    def transcribe(self, audio_path):
-        if not os.path.exists(audio_path):
-            return ""
-        
-        print(f"Transcribing {audio_path}...")
-        segments, info = self.model.transcribe(audio_path, beam_size=5)
+    def _decode(self, data):
+        start = time.perf_counter()
+        audio = load_audio(bytes(data))
+        if self.on_span:
+            self.on_span("decode", time.perf_counter() - start)
+        return audio
+
+    def _report_inference(self, start, info):
+        if self.on_span:
+            self.on_span("inference", time.perf_counter() - start, audio_s=info.duration)
+
+    def transcribe(self, audio, beam_size=None):
+        # audio: file path, encoded bytes, or a 16 kHz float32 array.
+        # beam_size=1 is greedy decoding, the fast first pass.
+        if isinstance(audio, str):
+            if not os.path.exists(audio):
+                return ""
+            print(f"Transcribing {audio}...")
+        elif isinstance(audio, (bytes, bytearray)):
+            audio = self._decode(audio)
+
+        start = time.perf_counter()
+        segments, info = self.model.transcribe(
+            audio,
+            language=self.language,
+            beam_size=beam_size or self.beam_size,
+            vad_filter=self.vad_filter,
+            vad_parameters=self.vad_parameters,
+        )
         
         text = ""
         for segment in segments:
             text += segment.text + " "
-        
+        # Segments are decoded lazily, so inference ends here
+        self._report_inference(start, info)
+
         return text.strip()
 
+    def segments(self, audio, beam_size=None, progress=None):
+        # Same inputs as transcribe(). Returns timestamped segments as
+        # plain dicts so callers can shift and serialize them.
+        # progress(seconds decoded, total seconds) follows each segment.
+        return list(self.iter_segments(audio, beam_size=beam_size, progress=progress))
+
+    def iter_segments(self, audio, beam_size=None, progress=None):
+        # segments(), yielding each one as soon as the model has decoded it
+        if isinstance(audio, (bytes, bytearray)):
+            audio = self._decode(audio)
+        start = time.perf_counter()
+        segments, info = self.model.transcribe(
+            audio,
+            language=self.language,
+            beam_size=beam_size or self.beam_size,
+            vad_filter=self.vad_filter,
+            vad_parameters=self.vad_parameters,
+        )
+        for s in segments:
+            yield {"start": s.start, "end": s.end, "text": s.text.strip()}
+            if progress:
+                progress(s.end, info.duration)
+        self._report_inference(start, info)
+
 if __name__ == "__main__":
     # Test script
     import time
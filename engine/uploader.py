@@ -0,0 +1,108 @@
+import threading
+
+import numpy as np
+import requests
+
+
+class ChunkedUploader:
+    """Sends a recording to /transcribe/uploads while it is being captured.
+
+    A background thread reads new samples from the recorder's SampleBuffer
+    every `chunk_s` seconds and PUTs them as 16-bit PCM chunks, so after
+    the user stops only the last chunk and the finalize call are left.
+    finish() returns the finalize response, or None whenever the chunked
+    path failed and the caller should fall back to a single /transcribe
+    upload (older server, network error, lost upload). Requests go through
+    the app's ApiClient, so they share its pooled connection and retries.
+    `params` go to the create call (e.g. trim=1 to have the server trim
+    silence, since chunks leave before the recording can be trimmed).
+    """
+
+    def __init__(self, api, buffer, chunk_s=2.0, timeout=10, params=None):
+        self.api = api
+        self.buffer = buffer
+        self.params = params
+        self.chunk = int(chunk_s * buffer.sample_rate)
+        self.timeout = timeout
+        self.upload_id = None
+        self.seq = 0
+        self.sent = 0
+        # Set when the server has no chunked uploads (404 on create)
+        self.unsupported = False
+        self.error = None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def _run(self):
+        try:
+            resp = self.api.post("/transcribe/uploads", params=self.params, timeout=self.timeout)
+            if resp.status_code in (404, 405):
+                self.unsupported = True
+                return
+            resp.raise_for_status()
+            self.upload_id = resp.json()["upload_id"]
+            while not self._stop.wait(self.chunk / self.buffer.sample_rate / 4):
+                if self.buffer.total - self.sent >= self.chunk:
+                    self._put(self._take())
+        except Exception as e:
+            self.error = e
+
+    def _take(self):
+        total = self.buffer.total
+        if total - self.sent > self.buffer.max_capacity:
+            # The unsent samples were already overwritten
+            raise RuntimeError("Recording outgrew the capture buffer")
+        samples = self.buffer.view(self.sent)[: total - self.sent]
+        self.sent = total
+        if samples.dtype != np.int16:
+            samples = (np.clip(samples, -1, 1) * 32767).astype(np.int16)
+        return samples.astype("<i2", copy=False).tobytes()
+
+    def _put(self, data):
+        # The server ignores a chunk number it already has, so retries are safe
+        resp = self.api.put(
+            f"/transcribe/uploads/{self.upload_id}/chunks/{self.seq}",
+            data=data,
+            timeout=self.timeout,
+        )
+        resp.raise_for_status()
+        self.seq += 1
+
+    def finish(self, timeout=30, stream=None):
+        """Call after recording stopped. stream="ndjson" asks for the
+        segments as they are decoded (read them with read_transcription)."""
+        self._stop.set()
+        self._thread.join()
+        if self.upload_id is None or self.error is not None:
+            return None
+        try:
+            data = self._take()
+            params = {"seq": self.seq} if data else {}
+            if stream:
+                params["stream"] = stream
+            resp = self.api.post(
+                f"/transcribe/uploads/{self.upload_id}/finalize",
+                params=params,
+                data=data,
+                timeout=timeout,
+                stream=bool(stream),
+            )
+        except (requests.RequestException, RuntimeError) as e:
+            self.error = e
+            return None
+        if resp.status_code in (404, 409, 413):
+            resp.close()
+            return None
+        return resp
+
+    def cancel(self):
+        self._stop.set()
+        self._thread.join()
+        try:
+            if self.upload_id and self.error is None:
+                self.api.delete(f"/transcribe/uploads/{self.upload_id}", retries=0, timeout=5)
+        except requests.RequestException:
+            pass
@@ -0,0 +1,120 @@
+import asyncio
+import time
+import uuid
+
+# Chunks are raw little-endian 16-bit mono PCM at this rate
+SAMPLE_RATE = 16000
+
+
+class ChunkOutOfOrder(Exception):
+    def __init__(self, expected):
+        super().__init__(f"expected chunk {expected}")
+        self.expected = expected
+
+
+class TooManyUploads(Exception):
+    pass
+
+
+def trim_pcm(data: bytes, max_pause_ms=None) -> bytes:
+    """trim_silence() for s16le PCM, as the desktop client applies it to
+    one-shot uploads. Audio with no detectable speech is returned as is;
+    the model's own VAD decides about it."""
+    import numpy as np
+    from engine.silence import trim_silence
+
+    audio = np.frombuffer(data, dtype="<i2").astype(np.float32) / 32768
+    trimmed = trim_silence(audio, SAMPLE_RATE, max_pause_ms=max_pause_ms)
+    if not len(trimmed):
+        return data
+    return (np.clip(trimmed, -1, 1) * 32767).astype("<i2").tobytes()
+
+
+class ChunkedUpload:
+    """Audio of one dictation arriving as numbered PCM chunks while the
+    user is still speaking. A chunk sent twice (a client retry) is ignored;
+    a gap is refused. Only touched from the event loop thread."""
+
+    def __init__(self, user_id, model, mode, session=None, trim=False, max_pause_ms=None):
+        self.id = uuid.uuid4().hex
+        self.user_id = user_id
+        self.model = model
+        self.mode = mode
+        # Chunks leave the client untrimmed; finalize trims them instead
+        self.trim = trim
+        self.max_pause_ms = max_pause_ms
+        self.data = bytearray()
+        self.next_seq = 0
+        self.touched = time.monotonic()
+        # Optional StreamingSession decoding ahead while chunks arrive, and
+        # the decode in flight
+        self.session = session
+        self.decoding: asyncio.Task | None = None
+        # Finalize runs once; a retried finalize gets the same result
+        self.lock = asyncio.Lock()
+        self.result = None
+
+    @property
+    def duration(self) -> float:
+        return len(self.data) / 2 / SAMPLE_RATE
+
+    def append(self, seq: int, data: bytes) -> bool:
+        """Returns False for a chunk already received."""
+        self.touched = time.monotonic()
+        if seq < self.next_seq:
+            return False
+        if seq > self.next_seq:
+            raise ChunkOutOfOrder(self.next_seq)
+        self.data += data
+        self.next_seq += 1
+        if self.session is not None:
+            self.session.feed(data)
+        return True
+
+
+class UploadStore:
+    """Open chunked uploads. Entries expire `ttl` seconds after their last
+    chunk, finalized or not. A user may have `max_per_user` uploads not
+    yet finalized (0 = no limit); create() raises TooManyUploads past it,
+    so nobody can pin memory with uploads left open."""
+
+    def __init__(self, ttl=120, max_per_user=0):
+        self.ttl = ttl
+        self.max_per_user = max_per_user
+        self._entries = {}
+
+    def create(self, user_id, model, mode, session=None, **options) -> ChunkedUpload:
+        self._expire()
+        if self.max_per_user and self.open_for(user_id) >= self.max_per_user:
+            raise TooManyUploads()
+        upload = ChunkedUpload(user_id, model, mode, session, **options)
+        self._entries[upload.id] = upload
+        return upload
+
+    def get(self, upload_id, user_id) -> ChunkedUpload | None:
+        self._expire()
+        upload = self._entries.get(upload_id)
+        if upload is None or upload.user_id != user_id:
+            return None
+        return upload
+
+    def open_for(self, user_id) -> int:
+        return sum(
+            1 for u in self._entries.values() if u.user_id == user_id and u.result is None
+        )
+
+    def discard(self, upload_id):
+        upload = self._entries.pop(upload_id, None)
+        if upload and upload.decoding and not upload.decoding.done():
+            upload.decoding.cancel()
+
+    def stats(self):
+        return {
+            "open": len(self._entries),
+            "buffered_bytes": sum(len(u.data) for u in self._entries.values()),
+        }
+
+    def _expire(self):
+        cutoff = time.monotonic() - self.ttl
+        for key in [k for k, u in self._entries.items() if u.touched < cutoff]:
+            self.discard(key)
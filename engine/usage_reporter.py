@@ -0,0 +1,92 @@
+import json
+import os
+import threading
+import time
+import uuid
+
+import requests
+
+# Largest batch sent in one POST /usage (the server accepts up to 500)
+MAX_BATCH = 100
+
+
+class UsageReporter:
+    """Reports words of dictations transcribed on-device to POST /usage.
+
+    Reports are kept in a JSON file under ~/.voxeasy until the server has
+    accepted them, so usage made offline (or before a crash) is sent
+    later. A background thread flushes every `flush_s`; each report has
+    its own id, so resending a batch whose answer was lost isn't charged
+    twice. on_usage(body) gets the server's updated usage totals.
+    """
+
+    def __init__(self, api, path, flush_s=60.0, on_usage=None):
+        self.api = api
+        self.path = path
+        self.flush_s = flush_s
+        self.on_usage = on_usage
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._pending = self._load()
+
+    def _load(self):
+        try:
+            with open(self.path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return []
+
+    def _save(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp = self.path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(self._pending, f)
+        os.replace(tmp, self.path)
+
+    @property
+    def pending_words(self):
+        with self._lock:
+            return sum(r["words"] for r in self._pending)
+
+    def add(self, words):
+        if not words:
+            return
+        with self._lock:
+            self._pending.append({"id": uuid.uuid4().hex, "words": words, "at": time.time()})
+            self._save()
+
+    def start(self):
+        threading.Thread(target=self._run, daemon=True).start()
+
+    def flush_soon(self):
+        self._wakeup.set()
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(timeout=self.flush_s)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except requests.RequestException:
+                pass
+
+    def flush(self):
+        """Sends pending reports in batches; returns False if some remain."""
+        while True:
+            with self._lock:
+                batch = self._pending[:MAX_BATCH]
+            if not batch or not self.api.token:
+                return not batch
+            resp = self.api.post(
+                "/usage",
+                json={"reports": [{"id": r["id"], "words": r["words"]} for r in batch]},
+                timeout=10,
+            )
+            if resp.status_code != 200:
+                return False
+            sent = {r["id"] for r in batch}
+            with self._lock:
+                self._pending = [r for r in self._pending if r["id"] not in sent]
+                self._save()
+            if self.on_usage:
+                self.on_usage(resp.json())
@@ -0,0 +1,331 @@
+"""Inference sidecar: one process holds the models, API workers call it.
+
+Each `uvicorn --workers N` process would otherwise load its own copy of
+every model. Instead run
+
+    python -m inference --socket /tmp/vox-inference.sock
+    INFERENCE_SOCKETS=/tmp/vox-inference.sock uvicorn api:app --workers 4
+
+The sidecar reads the same WHISPER_* settings as the API and serves
+transcribe/segments calls over a Unix socket. Several sidecars (e.g. one
+per GPU) can be listed in INFERENCE_SOCKETS; each call goes to the one
+with the least work in flight.
+
+Per-user state that isn't in the database (chunked uploads, X-Request-Id
+replay) stays in each API worker: with several workers either route each
+user to one worker and set STICKY_ROUTING=1, or leave those features off
+(the default when INFERENCE_SOCKETS is set; see api.py).
+
+Frames are a 4-byte big-endian header length, a JSON header and
+`size` bytes of payload (float32 samples, or an encoded upload).
+"""
+import threading
+import argparse
+import asyncio
+import socket
+import signal
+import struct
+import json
+import time
+import os
+
+from workers import WorkerPool, PoolSaturated
+
+DEFAULT_SOCKET = "/tmp/vox-inference.sock"
+# How long a call may wait for the sidecar (queue plus inference)
+CALL_TIMEOUT_S = float(os.getenv("INFERENCE_TIMEOUT_S", "300"))
+STATS_TIMEOUT_S = 2
+# How often the client polls each sidecar's stats in the background
+STATS_REFRESH_S = 1
+# A sidecar that refused a connection is tried last for this long
+RETRY_DOWN_S = 5
+
+
+def _header(header: dict, payload: bytes) -> bytes:
+    head = json.dumps({**header, "size": len(payload)}).encode()
+    return struct.pack(">I", len(head)) + head
+
+
+def _recv_exact(sock, n: int) -> bytes:
+    buf = bytearray(n)
+    view = memoryview(buf)
+    while view:
+        read = sock.recv_into(view)
+        if not read:
+            raise ConnectionError("Inference sidecar closed the connection")
+        view = view[read:]
+    return bytes(buf)
+
+
+async def _read_frame(reader):
+    (length,) = struct.unpack(">I", await reader.readexactly(4))
+    header = json.loads(await reader.readexactly(length))
+    payload = await reader.readexactly(header.get("size", 0))
+    return header, payload
+
+
+# ─── Client (API workers) ─────────────────────────────
+
+class RemoteEngine:
+    def __init__(self, client, model):
+        self.client = client
+        self.model = model
+
+    def transcribe(self, audio, beam_size=None):
+        return self.client.call("transcribe", self.model, audio, beam_size)
+
+    def segments(self, audio, beam_size=None, progress=None):
+        # The sidecar answers in one frame, so progress only comes at the end
+        return self.client.call("segments", self.model, audio, beam_size)
+
+    def iter_segments(self, audio, beam_size=None, progress=None):
+        yield from self.segments(audio, beam_size)
+
+
+class InferenceClient:
+    """Stands in for ModelRegistry when models live in sidecar processes.
+
+    get(name) returns a handle with the engine's transcribe()/segments();
+    calls block the calling thread like a local engine would. Each thread
+    keeps one connection per sidecar. Unreachable sidecars are skipped; a
+    full sidecar, or none reachable, raises PoolSaturated as the local
+    inference pool does. stats() and is_loaded() answer from a snapshot a
+    background thread refreshes every STATS_REFRESH_S, so they never wait
+    on a socket (they are called from the event loop).
+    """
+
+    def __init__(self, sockets, specs):
+        self.sockets = list(sockets)
+        self.specs = specs
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        # Calls this process has open, and the load each sidecar last
+        # reported (which includes other API workers' calls)
+        self._in_flight = {path: 0 for path in self.sockets}
+        self._reported = {path: 0 for path in self.sockets}
+        self._down_until = {}
+        self._snapshot = {"sidecars": {
+            f"sidecar{i}": {"socket": path, "error": "not polled yet"}
+            for i, path in enumerate(self.sockets)
+        }}
+        self._poller = None
+        self._closed = threading.Event()
+
+    def __contains__(self, name):
+        return name in self.specs
+
+    def get(self, name):
+        if name not in self.specs:
+            raise KeyError(f"Unknown model: {name}")
+        return RemoteEngine(self, name)
+
+    def is_loaded(self, name):
+        return any(
+            sidecar.get("models", {}).get("models", {}).get(name, {}).get("loaded")
+            for sidecar in self.stats()["sidecars"].values()
+        )
+
+    def call(self, op, model, audio, beam_size=None):
+        header = {"op": op, "model": model, "beam_size": beam_size}
+        if isinstance(audio, str):
+            with open(audio, "rb") as f:
+                payload = f.read()
+        elif isinstance(audio, (bytes, bytearray)):
+            payload = bytes(audio)
+        else:
+            import numpy as np
+
+            payload = np.ascontiguousarray(audio, dtype=np.float32).tobytes()
+            header["dtype"] = "float32"
+
+        response = None
+        for path in self._by_load():
+            with self._lock:
+                self._in_flight[path] += 1
+            try:
+                response = self._request(path, header, payload, CALL_TIMEOUT_S)
+                break
+            except OSError as e:
+                print(f"Inference sidecar {path} unavailable: {e}")
+                self._down_until[path] = time.monotonic() + RETRY_DOWN_S
+            finally:
+                with self._lock:
+                    self._in_flight[path] -= 1
+        if response is None:
+            # No sidecar reachable (e.g. restarting): answer like a full pool
+            raise PoolSaturated(RETRY_DOWN_S)
+        self._reported[path] = response.get("load", 0)
+        self._down_until.pop(path, None)
+
+        if response.get("ok"):
+            return response["result"]
+        if response.get("error") == "saturated":
+            raise PoolSaturated(response.get("retry_after", 1))
+        raise RuntimeError(f"Inference sidecar error: {response.get('error')}")
+
+    def _by_load(self):
+        # Least loaded first; sidecars that recently failed go last
+        now = time.monotonic()
+        with self._lock:
+            return sorted(self.sockets, key=lambda p: (
+                self._down_until.get(p, 0) > now,
+                self._in_flight[p] + self._reported[p],
+            ))
+
+    def _connection(self, path, timeout):
+        conns = self._local.__dict__.setdefault("conns", {})
+        sock = conns.get(path)
+        if sock is None:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(STATS_TIMEOUT_S)
+            sock.connect(path)
+            conns[path] = sock
+        sock.settimeout(timeout)
+        return sock
+
+    def _drop(self, path):
+        sock = self._local.__dict__.get("conns", {}).pop(path, None)
+        if sock:
+            sock.close()
+
+    def _request(self, path, header, payload=b"", timeout=CALL_TIMEOUT_S):
+        # One retry covers a connection the sidecar closed (e.g. restarted)
+        # while this thread was idle
+        for attempt in (0, 1):
+            sock = self._connection(path, timeout)
+            try:
+                sock.sendall(_header(header, payload))
+                if payload:
+                    sock.sendall(payload)
+                (length,) = struct.unpack(">I", _recv_exact(sock, 4))
+                return json.loads(_recv_exact(sock, length))
+            except socket.timeout:
+                self._drop(path)
+                raise
+            except ConnectionError:
+                self._drop(path)
+                if attempt:
+                    raise
+
+    def stats(self):
+        with self._lock:
+            if self._poller is None and not self._closed.is_set():
+                self._poller = threading.Thread(target=self._poll_stats, daemon=True)
+                self._poller.start()
+        return self._snapshot
+
+    def _poll_stats(self):
+        # Runs on its own thread, so it has its own connections
+        while not self._closed.is_set():
+            sidecars = {}
+            for i, path in enumerate(self.sockets):
+                try:
+                    response = self._request(path, {"op": "stats"}, timeout=STATS_TIMEOUT_S)
+                    sidecars[f"sidecar{i}"] = {"socket": path, **response["result"]}
+                    self._reported[path] = response.get("load", 0)
+                except OSError as e:
+                    sidecars[f"sidecar{i}"] = {"socket": path, "error": str(e)}
+            self._snapshot = {"sidecars": sidecars}
+            self._closed.wait(STATS_REFRESH_S)
+        for path in self.sockets:
+            self._drop(path)
+
+    def close(self):
+        self._closed.set()
+        for path in self.sockets:
+            self._drop(path)
+
+
+# ─── Sidecar ──────────────────────────────────────────
+
+class InferenceServer:
+    def __init__(self, models, pool):
+        self.models = models
+        self.pool = pool
+
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                header, payload = await _read_frame(reader)
+                response = await self.dispatch(header, payload)
+                response["load"] = self.pool.in_flight
+                writer.write(_header(response, b""))
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        except asyncio.CancelledError:
+            # Shutting down. Returning normally keeps 3.11's stream callback
+            # from logging every open connection as an error.
+            pass
+        finally:
+            writer.close()
+
+    async def dispatch(self, header, payload):
+        op = header.get("op")
+        if op == "stats":
+            return {"ok": True, "result": {"models": self.models.stats(), "pool": self.pool.stats()}}
+        if op not in ("transcribe", "segments"):
+            return {"ok": False, "error": f"unknown op {op}"}
+        if header.get("model") not in self.models:
+            return {"ok": False, "error": f"unknown model {header.get('model')}"}
+
+        def run():
+            from engine.decoding import load_audio
+            import numpy as np
+
+            if header.get("dtype") == "float32":
+                audio = np.frombuffer(payload, dtype=np.float32)
+            else:
+                audio = load_audio(payload)
+            engine = self.models.get(header["model"])
+            return getattr(engine, op)(audio, beam_size=header.get("beam_size"))
+
+        try:
+            result, timing = await self.pool.run(run)
+        except PoolSaturated as e:
+            return {"ok": False, "error": "saturated", "retry_after": e.retry_after}
+        except Exception as e:
+            return {"ok": False, "error": str(e)}
+        return {"ok": True, "result": result, **timing}
+
+
+async def serve(path):
+    # Same model settings as the API
+    import config
+    from engine.registry import ModelRegistry
+
+    models = ModelRegistry(config.MODEL_SPECS, config.build_engine, memory_budget_mb=config.MEMORY_BUDGET_MB)
+    pool = WorkerPool("sidecar", workers=config.INFERENCE_WORKERS, queue_depth=config.INFERENCE_QUEUE_DEPTH)
+    server = InferenceServer(models, pool)
+
+    if os.path.exists(path):
+        os.unlink(path)
+    listener = await asyncio.start_unix_server(server.handle, path)
+    print(f"Inference sidecar listening on {path}")
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+    preload = asyncio.create_task(asyncio.to_thread(models.get, config.FREE_MODEL))
+    try:
+        await stop.wait()
+    finally:
+        listener.close()
+        preload.cancel()
+        pool.shutdown()
+        models.close()
+        if os.path.exists(path):
+            os.unlink(path)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    sockets = [s.strip() for s in os.getenv("INFERENCE_SOCKETS", "").split(",") if s.strip()]
+    parser.add_argument("--socket", default=sockets[0] if sockets else DEFAULT_SOCKET)
+    args = parser.parse_args()
+    asyncio.run(serve(args.socket))
+
+
+if __name__ == "__main__":
+    main()
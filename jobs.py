@@ -0,0 +1,267 @@
+import asyncio
+import uuid
+from datetime import timedelta
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.orm import defer
+from db import SessionLocal
+from models import TranscriptionJob, utcnow
+
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+
+
+async def create_job(user_id: int, model: str, audio: bytes, content_type: str | None) -> TranscriptionJob:
+    job = TranscriptionJob(
+        id=uuid.uuid4().hex,
+        user_id=user_id,
+        status=QUEUED,
+        model=model,
+        content_type=content_type,
+        audio=audio,
+    )
+    async with SessionLocal() as session:
+        session.add(job)
+        await session.commit()
+    return job
+
+
+async def get_job(job_id: str, user_id: int) -> TranscriptionJob | None:
+    async with SessionLocal() as session:
+        # Polling doesn't need the upload
+        job = await session.get(TranscriptionJob, job_id, options=[defer(TranscriptionJob.audio)])
+    if job is None or job.user_id != user_id:
+        return None
+    return job
+
+
+async def queue_position(job: TranscriptionJob) -> int:
+    # Queued jobs ahead of this one, across all users and workers
+    async with SessionLocal() as session:
+        result = await session.execute(
+            select(func.count()).select_from(TranscriptionJob).where(
+                TranscriptionJob.status == QUEUED,
+                TranscriptionJob.created_at < job.created_at,
+            )
+        )
+    return result.scalar_one()
+
+
+class JobQueue:
+    """Runs persisted transcription jobs in the background.
+
+    Every API process runs `workers` loops that claim the oldest queued
+    job with a conditional UPDATE, so several processes can share one
+    table. `process(job, report)` does the work and returns the result;
+    it calls report(seconds_done, total_seconds) as audio is decoded.
+    Progress is written back every `heartbeat_s`, which doubles as the
+    heartbeat: running jobs not updated for `stale_s` (their process
+    died) go back to the queue, up to `max_attempts` runs. Finished jobs
+    are deleted after `retention_s`.
+
+    A requeued job may still be finishing in its first process, so a run
+    only records its outcome while the job is still running under the
+    attempt it claimed. `finish(session, job, result)`, if given, runs in
+    that same transaction and returns the result to store; its writes
+    (e.g. charging the user) are rolled back if the run was superseded.
+    """
+
+    def __init__(self, process, workers=1, poll_s=1.0, heartbeat_s=2.0,
+                 stale_s=60.0, max_attempts=3, retention_s=86400, finish=None):
+        self.process = process
+        self.finish = finish
+        self.workers = workers
+        self.poll_s = poll_s
+        self.heartbeat_s = heartbeat_s
+        self.stale_s = stale_s
+        self.max_attempts = max_attempts
+        self.retention_s = retention_s
+        # job id -> (seconds decoded, total seconds), for jobs running in
+        # this process
+        self.progress: dict[str, tuple[float, float | None]] = {}
+        self.completed = 0
+        self.failed = 0
+        self._wakeup = asyncio.Event()
+        self._tasks: list[asyncio.Task] = []
+
+    def start(self):
+        if self._tasks or self.workers <= 0:
+            return
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        self._tasks.append(asyncio.create_task(self._maintain()))
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        if self.progress:
+            # Interrupted work goes straight back to the queue
+            async with SessionLocal() as session:
+                await session.execute(
+                    update(TranscriptionJob)
+                    .where(TranscriptionJob.id.in_(list(self.progress)), TranscriptionJob.status == RUNNING)
+                    .values(status=QUEUED, progress=0.0, attempts=TranscriptionJob.attempts - 1)
+                )
+                await session.commit()
+            self.progress.clear()
+
+    def notify(self):
+        # A job was enqueued by this process
+        self._wakeup.set()
+
+    async def _worker(self):
+        while True:
+            try:
+                job = await self._claim()
+            except Exception as e:
+                print(f"Job claim failed: {e}")
+                job = None
+            if job is None:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_s)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            try:
+                await self._run(job)
+            except Exception as e:
+                # Left running; recover() requeues it once stale
+                print(f"Job {job.id} could not be completed: {e}")
+
+    async def _claim(self) -> TranscriptionJob | None:
+        async with SessionLocal() as session:
+            candidates = (await session.execute(
+                select(TranscriptionJob.id)
+                .where(TranscriptionJob.status == QUEUED)
+                .order_by(TranscriptionJob.created_at)
+                .limit(self.workers + 1)
+            )).scalars().all()
+            for job_id in candidates:
+                now = utcnow()
+                claimed = await session.execute(
+                    update(TranscriptionJob)
+                    .where(TranscriptionJob.id == job_id, TranscriptionJob.status == QUEUED)
+                    .values(status=RUNNING, started_at=now, updated_at=now,
+                            attempts=TranscriptionJob.attempts + 1)
+                )
+                await session.commit()
+                if claimed.rowcount == 1:
+                    return await session.get(TranscriptionJob, job_id)
+        return None
+
+    async def _run(self, job: TranscriptionJob):
+        self.progress[job.id] = (0.0, None)
+
+        def report(done_s, total_s):
+            self.progress[job.id] = (done_s, total_s)
+
+        heartbeat = asyncio.create_task(self._heartbeat(job))
+        try:
+            result = await self.process(job, report)
+            values = {"status": DONE, "result": result, "progress": 1.0,
+                      "duration_s": self.progress[job.id][1]}
+        except asyncio.CancelledError:
+            heartbeat.cancel()
+            raise
+        except Exception as e:
+            print(f"Job {job.id} failed: {e}")
+            values = {"status": FAILED, "error": str(e)[:255]}
+        heartbeat.cancel()
+        try:
+            recorded = await self._record(job, values)
+        finally:
+            self.progress.pop(job.id, None)
+        if not recorded:
+            print(f"Job {job.id} was requeued meanwhile; dropping this run's outcome")
+        elif values["status"] == DONE:
+            self.completed += 1
+        else:
+            self.failed += 1
+
+    async def _record(self, job: TranscriptionJob, values: dict) -> bool:
+        now = utcnow()
+        async with SessionLocal() as session:
+            if values["status"] == DONE and self.finish:
+                values["result"] = await self.finish(session, job, values["result"])
+            recorded = await session.execute(
+                update(TranscriptionJob)
+                .where(
+                    TranscriptionJob.id == job.id,
+                    TranscriptionJob.status == RUNNING,
+                    TranscriptionJob.attempts == job.attempts,
+                )
+                .values(audio=None, finished_at=now, updated_at=now, **values)
+            )
+            if recorded.rowcount != 1:
+                await session.rollback()
+                return False
+            await session.commit()
+        return True
+
+    async def _heartbeat(self, job: TranscriptionJob):
+        job_id = job.id
+        while True:
+            await asyncio.sleep(self.heartbeat_s)
+            try:
+                async with SessionLocal() as session:
+                    await session.execute(
+                        update(TranscriptionJob)
+                        .where(TranscriptionJob.id == job_id, TranscriptionJob.status == RUNNING,
+                               TranscriptionJob.attempts == job.attempts)
+                        .values(progress=self.fraction(job_id) or 0.0,
+                                duration_s=self.progress.get(job_id, (0, None))[1],
+                                updated_at=utcnow())
+                    )
+                    await session.commit()
+            except Exception as e:
+                print(f"Job heartbeat failed: {e}")
+
+    async def _maintain(self):
+        while True:
+            try:
+                await self.recover()
+            except Exception as e:
+                print(f"Job maintenance failed: {e}")
+            await asyncio.sleep(self.stale_s / 2)
+
+    async def recover(self):
+        now = utcnow()
+        stale = (
+            (TranscriptionJob.status == RUNNING)
+            & (TranscriptionJob.updated_at < now - timedelta(seconds=self.stale_s))
+        )
+        async with SessionLocal() as session:
+            # A job that keeps taking its worker down is given up on
+            await session.execute(
+                update(TranscriptionJob)
+                .where(stale, TranscriptionJob.attempts >= self.max_attempts)
+                .values(status=FAILED, error="Interrumpido demasiadas veces", audio=None, finished_at=now)
+            )
+            requeued = await session.execute(
+                update(TranscriptionJob).where(stale).values(status=QUEUED, progress=0.0)
+            )
+            await session.execute(
+                delete(TranscriptionJob).where(
+                    TranscriptionJob.status.in_((DONE, FAILED)),
+                    TranscriptionJob.finished_at < now - timedelta(seconds=self.retention_s),
+                )
+            )
+            await session.commit()
+        if requeued.rowcount:
+            print(f"Requeued {requeued.rowcount} interrupted jobs")
+            self.notify()
+
+    def fraction(self, job_id: str) -> float | None:
+        # Live progress of a job running in this process, if it is
+        done, total = self.progress.get(job_id, (0.0, None))
+        if not total:
+            return None
+        return min(1.0, done / total)
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "running": len(self.progress),
+            "completed": self.completed,
+            "failed": self.failed,
+        }
@@ -4,11 +4,29 @@ import time
 import os
 import json
 import requests
-from engine.audio import AudioRecorder
+from engine.audio import AudioRecorder, encode_audio, encodable_formats
+from engine.silence import trim_silence
 from engine.keyboard import KeyboardController
+from engine.api_client import ApiClient, StreamError, read_transcription
+from engine.uploader import ChunkedUploader
+from engine.local import LocalEngine, HybridPolicy
+from engine.usage_reporter import UsageReporter
 
 API_URL = os.getenv("VOX_API_URL", "https://unicords-voxeasy-app.ujamzy.easypanel.host")
 CONFIG_PATH = os.path.join(os.path.expanduser("~"), ".voxeasy", "config.json")
+# Pauses longer than this are shortened before upload
+MAX_PAUSE_MS = 1000
+# Recordings this long are streamed back segment by segment, so typing
+# starts before the whole clip is decoded; shorter ones come back at once
+STREAM_MIN_S = 5
+# Where dictations are transcribed: "server", "local" (on this machine)
+# or "hybrid" (local for short clips and when the network is slow or down).
+# local and hybrid need faster-whisper, which the packaged app (vox.spec)
+# leaves out: they only work when running from source.
+INFERENCE_MODE = os.getenv("VOX_INFERENCE", "server")
+LOCAL_MODEL = os.getenv("VOX_LOCAL_MODEL", "tiny")
+LOCAL_LANGUAGE = os.getenv("VOX_LANGUAGE") or None
+USAGE_PATH = os.path.join(os.path.expanduser("~"), ".voxeasy", "pending_usage.json")
 
 
 def load_token():
@@ -34,6 +52,7 @@ class LoginWindow(ctk.CTkToplevel):
     def __init__(self, parent, on_success):
         super().__init__(parent)
         self.on_success = on_success
+        self.api = parent.api
 
         self.title("Vox - Login")
         self.geometry("350x300")
@@ -82,8 +101,8 @@ class LoginWindow(ctk.CTkToplevel):
 
     def _send_auth(self, endpoint, email, password):
         try:
-            resp = requests.post(
-                f"{API_URL}{endpoint}",
+            resp = self.api.post(
+                endpoint,
                 json={"email": email, "password": password},
                 timeout=10,
             )
@@ -153,9 +172,27 @@ class VoxApp(ctk.CTk):
         self.recorder = AudioRecorder()
         self.keyboard = KeyboardController(self.toggle_dictation)
         self.token = load_token()
+        # Shared by every request so connections stay open between dictations
+        self.api = ApiClient(API_URL, token=self.token)
 
         self.is_recording = False
         self.is_loading = False
+        self.upload_format = None
+        # Upload while recording unless the server turned out not to support it
+        self.chunked_uploads = True
+        self.uploader = None
+        # Pending start of the uploader in hybrid mode, and the lock that
+        # keeps it from starting after the recording stopped
+        self.upload_timer = None
+        self.upload_lock = threading.Lock()
+
+        # On-device transcription; the model loads in the background
+        self.local = LocalEngine(model_size=LOCAL_MODEL, language=LOCAL_LANGUAGE)
+        self.policy = HybridPolicy(self.local, self.api, mode=INFERENCE_MODE)
+        if INFERENCE_MODE != "server":
+            self.local.start()
+        self.usage_reporter = UsageReporter(self.api, USAGE_PATH, on_usage=self.on_usage_reported)
+        self.usage_reporter.start()
 
         # Start keyboard listener
         self.keyboard.start_listening()
@@ -165,6 +202,7 @@ class VoxApp(ctk.CTk):
             self.after(500, self.show_login)
         else:
             self.withdraw()
+            self.refresh_usage()
 
     def show_login(self):
         self.withdraw()
@@ -172,8 +210,24 @@ class VoxApp(ctk.CTk):
 
     def on_login_success(self, token):
         self.token = token
+        self.api.token = token
+        self.usage_reporter.flush_soon()
+        self.refresh_usage()
         self.withdraw()
 
+    def refresh_usage(self):
+        # The hybrid policy sends free users whose words ran out to the
+        # server; know that before the first dictation
+        def fetch():
+            try:
+                resp = self.api.get("/usage", retries=0, timeout=10)
+            except requests.RequestException:
+                return
+            if resp.status_code == 200:
+                self.on_usage_reported(resp.json())
+
+        threading.Thread(target=fetch, daemon=True).start()
+
     def toggle_dictation(self):
         if self.is_loading:
             return
@@ -196,9 +250,38 @@ class VoxApp(ctk.CTk):
         self.status_label.configure(text="Press hotkey again to stop")
         self.progress.start()
         self.recorder.start_recording()
+        self.uploader = None
+        self.upload_timer = None
+        if self.chunked_uploads and self.policy.use_server_upload():
+            if self.policy.mode == "hybrid" and self.policy.may_run_locally():
+                # Clips up to local_max_s stay on this machine; start
+                # sending only once the recording is longer than that (the
+                # uploader catches up from the start of the buffer)
+                self.upload_timer = threading.Timer(self.policy.local_max_s, self.start_upload)
+                self.upload_timer.daemon = True
+                self.upload_timer.start()
+            else:
+                self.start_upload()
+        if self.uploader is None or self.policy.mode == "hybrid":
+            # Have a connection ready by the time the recording is sent,
+            # and a fresh measure of the network for the hybrid policy
+            self.api.warm()
+
+    def start_upload(self):
+        with self.upload_lock:
+            if not self.is_recording:
+                return
+            # Opening the upload also opens the connection
+            self.uploader = ChunkedUploader(
+                self.api, self.recorder.buffer, params={"trim": 1, "max_pause_ms": MAX_PAUSE_MS}
+            )
+            self.uploader.start()
 
     def stop_dictation(self):
-        self.is_recording = False
+        with self.upload_lock:
+            self.is_recording = False
+            if self.upload_timer:
+                self.upload_timer.cancel()
         self.label.configure(text="Processing...", text_color="#A29BFE")
         self.status_label.configure(text="Enviando audio al servidor...")
         self.progress.stop()
@@ -206,62 +289,162 @@ class VoxApp(ctk.CTk):
 
         threading.Thread(target=self.process_audio, daemon=True).start()
 
+    def negotiate_format(self):
+        # Most compact format both sides support; older servers without
+        # /transcribe/formats get WAV
+        if self.upload_format:
+            return self.upload_format
+        try:
+            resp = self.api.get("/transcribe/formats", retries=0, timeout=5)
+        except requests.RequestException:
+            return "wav"
+        offered = resp.json().get("formats", []) if resp.status_code == 200 else []
+        supported = encodable_formats()
+        self.upload_format = next((f for f in offered if f in supported), "wav")
+        return self.upload_format
+
+    def upload_audio(self, audio):
+        # Most of the audio is already on the server if the chunked upload
+        # kept up; otherwise send the whole trimmed recording at once
+        stream = "ndjson" if len(audio) >= STREAM_MIN_S * self.recorder.sample_rate else None
+        if self.uploader:
+            resp = self.uploader.finish(timeout=30, stream=stream)
+            if self.uploader.unsupported:
+                self.chunked_uploads = False
+            if resp is not None:
+                return resp
+            if self.uploader.error:
+                print(f"Chunked upload failed, sending in one piece: {self.uploader.error}")
+        upload = encode_audio(audio, self.negotiate_format(), self.recorder.sample_rate)
+        return self.api.post(
+            "/transcribe", params={"stream": stream} if stream else None, files={"file": upload},
+            timeout=30, stream=bool(stream),
+        )
+
     def process_audio(self):
-        audio_path = self.recorder.stop_recording("temp_output.wav")
-        if audio_path:
+        audio = self.recorder.stop_recording()
+        if audio is not None:
+            audio = trim_silence(audio, self.recorder.sample_rate, max_pause_ms=MAX_PAUSE_MS)
+            if not len(audio):
+                self.label.configure(text="No se detecto voz", text_color="gray")
+                audio = None
+        if audio is None and self.uploader:
+            self.cancel_upload()
+        if audio is not None:
             self.label.configure(text="Transcribiendo...")
-            try:
-                with open(audio_path, "rb") as f:
-                    resp = requests.post(
-                        f"{API_URL}/transcribe",
-                        files={"file": ("audio.wav", f, "audio/wav")},
-                        headers={"Authorization": f"Bearer {self.token}"},
-                        timeout=30,
-                    )
-
-                if resp.status_code == 200:
-                    data = resp.json()
-                    text = data.get("text", "")
-                    remaining = data.get("words_remaining", 0)
-
-                    if text:
+            if self.policy.use_local(len(audio) / self.recorder.sample_rate):
+                if self.uploader:
+                    self.cancel_upload()
+                self.transcribe_locally(audio)
+            else:
+                self.transcribe_on_server(audio)
+
+        # Hide after a brief moment
+        time.sleep(2)
+        self.label.configure(text="Vox is ready", text_color="white")
+        self.status_label.configure(text="Press Cmd+Shift+V to start")
+        self.progress.set(0)
+        self.withdraw()
+
+    def transcribe_on_server(self, audio):
+        typer = self.keyboard.incremental()
+        try:
+            resp = self.upload_audio(audio)
+
+            if resp.status_code == 200:
+                # Segments are typed as the server decodes them; the
+                # last frame has the full text and the usage totals
+                def type_segment(segment):
+                    if not typer.segments:
                         self.label.configure(text="Typing...", text_color="#55E6C1")
-                        if remaining >= 0:
-                            self.status_label.configure(text=f"{remaining} palabras restantes esta semana")
-                        else:
-                            self.status_label.configure(text="Pro - uso ilimitado")
-                        self.keyboard.type_text(text)
+                    typer.feed(segment["text"])
+
+                data = read_transcription(resp, on_segment=type_segment)
+                text = data.get("text", "")
+                remaining = data.get("words_remaining", 0)
+                self.policy.mark_online()
+                self.policy.words_remaining = remaining
+
+                if text or typer.segments:
+                    self.label.configure(text="Typing...", text_color="#55E6C1")
+                    if remaining >= 0:
+                        self.status_label.configure(text=f"{remaining} palabras restantes esta semana")
                     else:
-                        self.label.configure(text="No se detecto voz", text_color="gray")
+                        self.status_label.configure(text="Pro - uso ilimitado")
+                    if not typer.segments:
+                        self.keyboard.type_text(text)
+                else:
+                    self.label.configure(text="No se detecto voz", text_color="gray")
 
-                elif resp.status_code == 403:
-                    self.label.configure(text="Limite alcanzado", text_color="#FF6B6B")
-                    self.status_label.configure(text="Actualiza a Pro en voxeasy.com")
+            elif resp.status_code == 403:
+                self.label.configure(text="Limite alcanzado", text_color="#FF6B6B")
+                self.status_label.configure(text="Actualiza a Pro en voxeasy.com")
 
-                elif resp.status_code == 401:
-                    self.label.configure(text="Sesion expirada", text_color="#FF6B6B")
-                    clear_token()
-                    self.token = None
-                    self.after(1500, self.show_login)
+            elif resp.status_code == 401:
+                self.label.configure(text="Sesion expirada", text_color="#FF6B6B")
+                clear_token()
+                self.token = None
+                self.api.token = None
+                self.after(1500, self.show_login)
 
-                else:
-                    self.label.configure(text="Error del servidor", text_color="#FF6B6B")
+            elif resp.status_code >= 500 and self.policy.may_run_locally():
+                # Server down or too busy even after retrying
+                self.transcribe_locally(audio)
+
+            else:
+                self.label.configure(text="Error del servidor", text_color="#FF6B6B")
 
-            except requests.ConnectionError:
+        except (requests.ConnectionError, requests.Timeout):
+            self.policy.mark_offline()
+            if not typer.segments and self.policy.may_run_locally():
+                self.transcribe_locally(audio)
+            else:
                 self.label.configure(text="Sin conexion", text_color="#FF6B6B")
                 self.status_label.configure(text="Verifica tu internet")
-            except Exception as e:
-                self.label.configure(text="Error", text_color="#FF6B6B")
-                self.status_label.configure(text=str(e)[:40])
-            finally:
-                os.remove(audio_path)
+        except StreamError as e:
+            if e.status == 403:
+                self.label.configure(text="Limite alcanzado", text_color="#FF6B6B")
+                self.status_label.configure(text="Actualiza a Pro en voxeasy.com")
+            else:
+                self.label.configure(text="Error del servidor", text_color="#FF6B6B")
+        except Exception as e:
+            self.label.configure(text="Error", text_color="#FF6B6B")
+            self.status_label.configure(text=str(e)[:40])
 
-        # Hide after a brief moment
-        time.sleep(2)
-        self.label.configure(text="Vox is ready", text_color="white")
-        self.status_label.configure(text="Press Cmd+Shift+V to start")
-        self.progress.set(0)
-        self.withdraw()
+    def transcribe_locally(self, audio):
+        self.status_label.configure(text="Transcribiendo en este equipo...")
+        try:
+            text = self.local.transcribe(audio)
+        except Exception as e:
+            self.label.configure(text="Error", text_color="#FF6B6B")
+            self.status_label.configure(text=str(e)[:40])
+            return
+        if not text:
+            self.label.configure(text="No se detecto voz", text_color="gray")
+            return
+
+        # Charged on the server with the next batch of usage reports
+        words = len(text.split())
+        self.usage_reporter.add(words)
+        remaining = self.policy.words_remaining
+        if remaining is not None and remaining > 0:
+            remaining = self.policy.words_remaining = max(0, remaining - words)
+
+        self.label.configure(text="Typing...", text_color="#55E6C1")
+        if remaining is None:
+            self.status_label.configure(text="Transcrito en este equipo")
+        elif remaining >= 0:
+            self.status_label.configure(text=f"{remaining} palabras restantes esta semana")
+        else:
+            self.status_label.configure(text="Pro - uso ilimitado")
+        self.keyboard.type_text(text)
+
+    def cancel_upload(self):
+        # Deleting the upload is a round trip; typing needn't wait for it
+        threading.Thread(target=self.uploader.cancel, daemon=True).start()
+
+    def on_usage_reported(self, usage):
+        self.policy.words_remaining = usage.get("words_remaining")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,254 @@
+import os
+import re
+import time
+import threading
+from contextlib import contextmanager
+
+# METRICS=0 turns every observation into a no-op and disables /metrics
+METRICS_ENABLED = os.getenv("METRICS", "1") == "1"
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+AUDIO_BUCKETS = (1, 2, 5, 10, 20, 30, 60, 120, 300, 600)
+RTF_BUCKETS = (0.01, 0.02, 0.05, 0.1, 0.2, 0.5, 1, 2, 5)
+
+_registry = []
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _metric_name(key):
+    return re.sub(r"[^a-zA-Z0-9_]", "_", str(key))
+
+
+def _format_labels(names, values, extra=""):
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self._values = {}
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def inc(self, amount=1, **labels):
+        if not METRICS_ENABLED:
+            return
+        key = tuple(str(labels.get(n, "")) for n in self.labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self):
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} counter"
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            yield f"{self.name}{_format_labels(self.labels, key)} {value}"
+
+
+class Histogram:
+    def __init__(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.buckets = tuple(buckets)
+        # key -> [per-bucket counts..., +Inf count], sum
+        self._values = {}
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def observe(self, value, **labels):
+        if not METRICS_ENABLED:
+            return
+        key = tuple(str(labels.get(n, "")) for n in self.labels)
+        slot = len(self.buckets)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                slot = i
+                break
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            entry[0][slot] += 1
+            entry[1] += value
+
+    def render(self):
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} histogram"
+        with self._lock:
+            items = sorted((k, (list(v[0]), v[1])) for k, v in self._values.items())
+        for key, (counts, total) in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + ("+Inf",), counts):
+                cumulative += count
+                le = _format_labels(self.labels, key, f'le="{bound}"')
+                yield f"{self.name}_bucket{le} {cumulative}"
+            labels = _format_labels(self.labels, key)
+            yield f"{self.name}_sum{labels} {round(total, 6)}"
+            yield f"{self.name}_count{labels} {cumulative}"
+
+
+class StatsGauges:
+    """Exposes the numeric fields of a stats() dict as gauges, read at
+    scrape time. Nested dicts become name_sub_field. `labels` maps keys
+    whose value is a dict of per-item dicts (e.g. "models" -> model name
+    -> fields) to a label name: the item names become that label's values
+    instead of parts of the metric name."""
+
+    def __init__(self, prefix, fn, labels=None):
+        self.prefix = prefix
+        self.fn = fn
+        self.labels = labels or {}
+        _registry.append(self)
+
+    def _flatten(self, stats, prefix, labels=()):
+        for key, value in stats.items():
+            if isinstance(value, dict):
+                label = self.labels.get(key)
+                if label and all(isinstance(v, dict) for v in value.values()):
+                    for item, fields in value.items():
+                        yield from self._flatten(fields, prefix, labels + ((label, item),))
+                else:
+                    yield from self._flatten(value, f"{prefix}_{_metric_name(key)}", labels)
+            elif isinstance(value, (bool, int, float)):
+                yield f"{prefix}_{_metric_name(key)}", labels, float(value)
+
+    def render(self):
+        try:
+            stats = self.fn()
+        except Exception:
+            return
+        series = {}
+        for name, labels, value in self._flatten(stats, self.prefix):
+            series.setdefault(name, []).append((labels, value))
+        for name, samples in series.items():
+            yield f"# TYPE {name} gauge"
+            for labels, value in samples:
+                yield f"{name}{_format_labels([n for n, _ in labels], [v for _, v in labels])} {value}"
+
+
+# ─── Pipeline metrics ─────────────────────────────────
+
+REQUESTS = Counter(
+    "vox_http_requests_total", "HTTP requests by route and status",
+    labels=("method", "route", "status"),
+)
+REQUEST_SECONDS = Histogram(
+    "vox_http_request_seconds", "Total HTTP request time",
+    labels=("method", "route"),
+)
+REQUEST_BODY_SECONDS = Histogram(
+    "vox_http_request_body_seconds", "Time until the request body was fully received",
+    labels=("route",),
+)
+UPLOAD_READ_SECONDS = Histogram(
+    "vox_upload_read_seconds", "Reading the uploaded file from the spooled form data",
+)
+DECODE_SECONDS = Histogram(
+    "vox_decode_seconds", "Decoding uploaded audio to 16 kHz samples",
+)
+QUEUE_SECONDS = Histogram(
+    "vox_inference_queue_seconds", "Wait for a free inference thread",
+)
+INFERENCE_SECONDS = Histogram(
+    "vox_inference_seconds", "Model time per transcription",
+    labels=("model",),
+)
+AUDIO_SECONDS = Histogram(
+    "vox_audio_seconds", "Duration of transcribed audio",
+    labels=("model",), buckets=AUDIO_BUCKETS,
+)
+REALTIME_FACTOR = Histogram(
+    "vox_realtime_factor", "Model time divided by audio duration",
+    labels=("model",), buckets=RTF_BUCKETS,
+)
+USAGE_UPDATE_SECONDS = Histogram(
+    "vox_usage_update_seconds", "Recording words against the weekly quota",
+)
+TRANSCRIPTIONS = Counter(
+    "vox_transcriptions_total", "Completed transcriptions",
+    labels=("model", "mode", "cached"),
+)
+RETRIED_REQUESTS = Counter(
+    "vox_retried_requests_total", "Retries answered from the first attempt (same X-Request-Id)",
+)
+REPORTED_WORDS = Counter(
+    "vox_reported_words_total", "Words transcribed on-device and charged through POST /usage",
+)
+
+
+@contextmanager
+def span(histogram, **labels):
+    if not METRICS_ENABLED:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        histogram.observe(time.perf_counter() - start, **labels)
+
+
+def record_span(name, seconds, model="", audio_s=None):
+    # Target for Transcriber(on_span=...), which knows nothing about metrics
+    if name == "decode":
+        DECODE_SECONDS.observe(seconds)
+    elif name == "inference":
+        INFERENCE_SECONDS.observe(seconds, model=model)
+        if audio_s:
+            AUDIO_SECONDS.observe(audio_s, model=model)
+            REALTIME_FACTOR.observe(seconds / audio_s, model=model)
+
+
+def render():
+    lines = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+class MetricsMiddleware:
+    """ASGI middleware timing every HTTP request, labelled by route
+    template so path parameters don't explode the label space."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status = {"code": 500}
+        body = {}
+
+        async def timed_receive():
+            message = await receive()
+            if message["type"] == "http.request" and not message.get("more_body"):
+                body["last"] = time.perf_counter()
+            return message
+
+        async def timed_send(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, timed_receive, timed_send)
+        finally:
+            route = getattr(scope.get("route"), "path", "other")
+            method = scope.get("method", "")
+            REQUESTS.inc(method=method, route=route, status=status["code"])
+            REQUEST_SECONDS.observe(time.perf_counter() - start, method=method, route=route)
+            if "last" in body:
+                REQUEST_BODY_SECONDS.observe(body["last"] - start, route=route)
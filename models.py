@@ -1,6 +1,7 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Date
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Date, Index, Float, LargeBinary, JSON, Text
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
+from datetime import datetime, timezone
 from db import Base
 
 
@@ -20,6 +21,10 @@ class User(Base):
 
 class WeeklyUsage(Base):
     __tablename__ = "weekly_usage"
+    # One row per user and week; usage.increment_usage upserts against it
+    __table_args__ = (
+        Index("uq_weekly_usage_user_week", "user_id", "week_start", unique=True),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
@@ -27,3 +32,65 @@ class WeeklyUsage(Base):
     words_used = Column(Integer, default=0)
 
     user = relationship("User", back_populates="usage")
+
+
+def utcnow():
+    return datetime.now(timezone.utc)
+
+
+class TranscriptionJob(Base):
+    __tablename__ = "transcription_jobs"
+    # jobs.JobQueue claims the oldest queued job
+    __table_args__ = (
+        Index("ix_transcription_jobs_status_created", "status", "created_at"),
+    )
+
+    id = Column(String(32), primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    status = Column(String(16), nullable=False, default="queued")  # queued, running, done, failed
+    model = Column(String(64), nullable=False)
+    content_type = Column(String(128), nullable=True)
+    # The upload until the job finishes, so queued work survives restarts
+    audio = Column(LargeBinary, nullable=True)
+    duration_s = Column(Float, nullable=True)
+    progress = Column(Float, default=0.0)  # fraction of the audio decoded
+    result = Column(JSON, nullable=True)
+    error = Column(String(255), nullable=True)
+    attempts = Column(Integer, default=0)
+    # Client-side timestamps: the queue is ordered by created_at and
+    # server_default has only second resolution on SQLite
+    created_at = Column(DateTime(timezone=True), default=utcnow, nullable=False)
+    started_at = Column(DateTime(timezone=True), nullable=True)
+    # Heartbeat of the worker running the job
+    updated_at = Column(DateTime(timezone=True), default=utcnow)
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+
+
+class ReportedUsage(Base):
+    __tablename__ = "reported_usage"
+    # Words the desktop client transcribed on-device, one row per report
+    # id (see usage.record_reports): a resent batch charges nothing
+    __table_args__ = (
+        Index("uq_reported_usage_user_report", "user_id", "report_id", unique=True),
+    )
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    report_id = Column(String(64), nullable=False)
+    words = Column(Integer, nullable=False)
+    created_at = Column(DateTime(timezone=True), default=utcnow, nullable=False)
+
+
+class TranscriptionCorrection(Base):
+    __tablename__ = "transcription_corrections"
+
+    # Second pass of a speculative transcription, polled by the client;
+    # kept in the DB so any API process can answer the poll
+    id = Column(String(32), primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    status = Column(String(16), nullable=False, default="pending")  # pending, done, skipped, failed
+    draft = Column(Text, nullable=False)
+    text = Column(Text, nullable=True)
+    changed = Column(Boolean, nullable=True)
+    latency_ms = Column(Float, nullable=True)
+    created_at = Column(DateTime(timezone=True), default=utcnow, nullable=False, index=True)
@@ -0,0 +1,38 @@
+import asyncio
+import os
+import sys
+import tempfile
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# db.py reads DATABASE_URL at import. Always a throwaway SQLite file:
+# run_db drops every table when it is done.
+os.environ["DATABASE_URL"] = (
+    f"sqlite+aiosqlite:///{os.path.join(tempfile.mkdtemp(prefix='vox-tests-'), 'test.db')}"
+)
+
+
+@pytest.fixture
+def run_db():
+    """run_db(fn) runs the coroutine function fn against a fresh schema.
+    The pooled SQLite connections are disposed of afterwards, or their
+    aiosqlite threads would keep the test process alive."""
+    import models  # noqa: F401  (registers the tables)
+    from db import Base, close_db, engine, init_db
+
+    def run(fn):
+        async def wrapper():
+            await init_db()
+            try:
+                await fn()
+            finally:
+                async with engine.begin() as conn:
+                    await conn.run_sync(Base.metadata.drop_all)
+                await close_db()
+
+        asyncio.run(wrapper())
+
+    return run
@@ -0,0 +1,96 @@
+import numpy as np
+
+from engine import audio as audio_module
+from engine.audio import SampleBuffer, encodable_formats, encode_audio
+
+SR = 16000
+
+
+def tone(seconds):
+    t = np.arange(int(seconds * SR)) / SR
+    return (0.3 * np.sin(2 * np.pi * 220 * t)).astype(np.float32)
+
+
+# ─── SampleBuffer ─────────────────────────────────────
+
+def ramp(start, n):
+    return np.arange(start, start + n, dtype=np.float32)
+
+
+def test_sample_buffer_writes_straddling_a_migration():
+    # 10 samples a second: capacity 10, doubling up to 80
+    buffer = SampleBuffer(sample_rate=10, initial_seconds=1, max_seconds=8)
+    migrated = False
+    for start in range(0, 72, 3):
+        buffer.write(ramp(start, 3))
+        migrated = migrated or buffer._next is not None
+        np.testing.assert_array_equal(buffer.view(), ramp(0, start + 3))
+    assert migrated
+    assert len(buffer._buf) == 80
+
+
+def test_sample_buffer_grows_for_a_big_write():
+    buffer = SampleBuffer(sample_rate=10, initial_seconds=1, max_seconds=8)
+    buffer.write(ramp(0, 4))
+    buffer.write(ramp(4, 30))
+    np.testing.assert_array_equal(buffer.view(), ramp(0, 34))
+    np.testing.assert_array_equal(buffer.view(30), ramp(30, 4))
+
+
+def test_sample_buffer_keeps_the_last_max_seconds():
+    buffer = SampleBuffer(sample_rate=10, initial_seconds=1, max_seconds=4)
+    for start in range(0, 57, 3):
+        buffer.write(ramp(start, 3))
+    assert buffer.total == 57
+    # Overwritten samples are skipped, and the read across the wrap point
+    # comes back in order
+    np.testing.assert_array_equal(buffer.view(), ramp(17, 40))
+    np.testing.assert_array_equal(buffer.view(50), ramp(50, 7))
+    assert len(buffer.view(57)) == 0
+
+
+def test_sample_buffer_write_longer_than_max_seconds():
+    buffer = SampleBuffer(sample_rate=10, initial_seconds=1, max_seconds=4)
+    buffer.write(ramp(0, 5))
+    buffer.write(ramp(5, 50))
+    assert buffer.total == 55
+    np.testing.assert_array_equal(buffer.view(), ramp(15, 40))
+
+
+def test_sample_buffer_view_survives_growth():
+    buffer = SampleBuffer(sample_rate=10, initial_seconds=1, max_seconds=8)
+    buffer.write(ramp(0, 4))
+    early = buffer.view()
+    for start in range(4, 40, 4):
+        buffer.write(ramp(start, 4))
+    assert len(buffer._buf) > 10
+    # The earlier view still holds what was written when it was taken
+    np.testing.assert_array_equal(early, ramp(0, 4))
+    np.testing.assert_array_equal(buffer.view(2), ramp(2, 38))
+
+
+# ─── Upload encoding ──────────────────────────────────
+
+class OldSoundFile:
+    # libsndfile without an Opus encoder
+    @staticmethod
+    def available_subtypes(fmt):
+        return {"VORBIS": "Vorbis"}
+
+    @staticmethod
+    def write(*args, **kwargs):
+        raise RuntimeError("Error opening <_io.BytesIO>: Format not recognised.")
+
+
+def test_opus_only_offered_when_libsndfile_can_write_it(monkeypatch):
+    monkeypatch.setattr(audio_module, "sf", OldSoundFile)
+    assert encodable_formats() == ["flac", "wav"]
+    monkeypatch.setattr(audio_module, "sf", None)
+    assert encodable_formats() == ["wav"]
+
+
+def test_failed_encode_falls_back_to_wav(monkeypatch):
+    monkeypatch.setattr(audio_module, "sf", OldSoundFile)
+    filename, data, mime = encode_audio(tone(0.5), "flac", SR)
+    assert (filename, mime) == ("audio.wav", "audio/wav")
+    assert data[:4] == b"RIFF"
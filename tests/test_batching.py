@@ -0,0 +1,79 @@
+import threading
+
+import numpy as np
+
+from engine.batching import MicroBatcher
+
+
+class StubTranscriber:
+    model = object()
+    language = "es"
+    beam_size = 5
+    vad_filter = False
+    vad_parameters = None
+    on_span = None
+
+    def transcribe(self, audio, beam_size=None):
+        return "unbatched"
+
+
+class StubBatcher(MicroBatcher):
+    def _run_batch(self, clips):
+        return ["batched"] * len(clips)
+
+
+class RecordingBatcher(MicroBatcher):
+    # Answers each clip with its own text, built from the clip's value
+    def __init__(self, *args, **kwargs):
+        self.calls = []
+        super().__init__(*args, **kwargs)
+
+    def _run_batch(self, clips):
+        self.calls.append(len(clips))
+        return [f"clip {int(audio[0])}" for audio, _ in clips]
+
+
+def transcribe_in_thread(batcher, audio):
+    result = {}
+    thread = threading.Thread(target=lambda: result.update(text=batcher.transcribe(audio)), daemon=True)
+    thread.start()
+    thread.join(timeout=5)
+    assert not thread.is_alive(), "transcribe() never returned"
+    return result["text"]
+
+
+def test_single_clip_goes_through_the_batcher():
+    batcher = StubBatcher(StubTranscriber(), window_ms=1)
+    assert transcribe_in_thread(batcher, np.ones(16000, dtype=np.float32)) == "batched"
+    batcher.close()
+
+
+def test_batches_concurrent_clips():
+    batcher = RecordingBatcher(StubTranscriber(), window_ms=500, max_batch=8)
+    start = threading.Barrier(4)
+    results = {}
+
+    def submit(i):
+        start.wait()
+        results[i] = batcher.transcribe(np.full(16000, i, dtype=np.float32))
+
+    threads = [threading.Thread(target=submit, args=(i,), daemon=True) for i in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=5)
+    assert not any(thread.is_alive() for thread in threads), "transcribe() never returned"
+    # One model run for all four, each caller with its own text
+    assert batcher.calls == [4]
+    assert results == {i: f"clip {i}" for i in range(4)}
+    batcher.close()
+
+
+def test_transcribe_after_close_does_not_hang():
+    # The registry closes an evicted batcher while callers may still
+    # hold a reference to it
+    batcher = StubBatcher(StubTranscriber(), window_ms=1)
+    batcher.close()
+    batcher._thread.join(timeout=5)
+    assert transcribe_in_thread(batcher, np.ones(16000, dtype=np.float32)) == "unbatched"
+    batcher.close()
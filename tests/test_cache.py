@@ -0,0 +1,58 @@
+import numpy as np
+
+import cache
+from cache import ResultCache, TTLCache
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+def test_ttl_cache_expires_entries(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(cache.time, "monotonic", clock.monotonic)
+    entries = TTLCache(maxsize=10, ttl=5)
+    entries.set("a", 1)
+    entries.set("b", 2, ttl=60)
+    clock.now += 6
+    assert entries.get("a") is None
+    assert entries.get("b") == 2
+    assert entries.stats()["hits"] == 1
+    assert entries.stats()["misses"] == 1
+
+
+def test_ttl_cache_evicts_least_recently_used():
+    entries = TTLCache(maxsize=2, ttl=60)
+    entries.set("a", 1)
+    entries.set("b", 2)
+    entries.get("a")
+    entries.set("c", 3)
+    assert entries.get("b") is None
+    assert entries.get("a") == 1
+    assert entries.get("c") == 3
+
+
+def test_ttl_cache_of_size_zero_stores_nothing():
+    entries = TTLCache(maxsize=0)
+    entries.set("a", 1)
+    assert entries.get("a") is None
+
+
+def test_result_cache_key_depends_on_content_and_options():
+    audio = np.ones(100, dtype=np.float32)
+    key = ResultCache.key(audio, model="tiny", beam_size=5)
+    assert key == ResultCache.key(audio.copy(), beam_size=5, model="tiny")
+    assert key != ResultCache.key(audio, model="tiny", beam_size=1)
+    assert key != ResultCache.key(audio * 2, model="tiny", beam_size=5)
+
+
+def test_result_cache_disk_tier_survives_a_new_instance(tmp_path):
+    ResultCache(directory=str(tmp_path)).set("ab12", {"text": "hola"})
+    fresh = ResultCache(directory=str(tmp_path))
+    assert fresh.get("ab12") == {"text": "hola"}
+    assert fresh.disk_hits == 1
+    assert fresh.get("ab12", disk=False) == {"text": "hola"}
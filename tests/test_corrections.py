@@ -0,0 +1,21 @@
+from corrections import create_correction, resolve_correction, get_correction
+
+
+def test_correction_round_trip(run_db):
+    async def run():
+        correction_id = await create_correction(1, "hola mundo")
+        assert await get_correction(correction_id, 1) == {"status": "pending", "draft": "hola mundo"}
+        # Other users can't see it
+        assert await get_correction(correction_id, 2) is None
+
+        await resolve_correction(correction_id, "hola mundo", "Hola, mundo.", latency_ms=12.5)
+        entry = await get_correction(correction_id, 1)
+        assert entry["status"] == "done"
+        assert entry["text"] == "Hola, mundo."
+        # Casing and punctuation alone don't count as a change
+        assert entry["changed"] is False
+
+        await resolve_correction(correction_id, "hola mundo", status="skipped")
+        assert (await get_correction(correction_id, 1))["status"] == "skipped"
+
+    run_db(run)
@@ -0,0 +1,23 @@
+import pytest
+from sqlalchemy.exc import TimeoutError as PoolTimeout
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from db import TimedQueuePool
+
+
+def checkout(pool, monkeypatch, error):
+    def fail(self):
+        raise error
+
+    monkeypatch.setattr(AsyncAdaptedQueuePool, "_do_get", fail)
+    with pytest.raises(type(error)):
+        pool._do_get()
+
+
+def test_only_pool_timeouts_are_counted(monkeypatch):
+    pool = TimedQueuePool(lambda: None, pool_size=1, max_overflow=0)
+    checkout(pool, monkeypatch, PoolTimeout("pool exhausted"))
+    # A connection that fails to open is not a wait for the pool
+    checkout(pool, monkeypatch, OSError("connection refused"))
+    assert pool.timeouts == 1
+    assert pool.checkouts == 2
@@ -0,0 +1,97 @@
+from datetime import timedelta
+
+from sqlalchemy import update
+
+from db import SessionLocal
+from jobs import DONE, FAILED, QUEUED, RUNNING, JobQueue, create_job, get_job
+from models import TranscriptionJob, utcnow
+from usage import get_week_start, increment_usage, read_usage
+
+
+async def set_job(job_id, **values):
+    async with SessionLocal() as session:
+        await session.execute(
+            update(TranscriptionJob).where(TranscriptionJob.id == job_id).values(**values)
+        )
+        await session.commit()
+
+
+async def noop(job, report):
+    return {}
+
+
+def test_recover_requeues_stale_jobs(run_db):
+    async def run():
+        queue = JobQueue(noop, stale_s=60, max_attempts=3, retention_s=3600)
+        long_ago = utcnow() - timedelta(hours=2)
+        stale = await create_job(1, "tiny", b"audio", "audio/wav")
+        await set_job(stale.id, status=RUNNING, attempts=1, updated_at=long_ago)
+        fresh = await create_job(1, "tiny", b"audio", "audio/wav")
+        await set_job(fresh.id, status=RUNNING, attempts=1, updated_at=utcnow())
+        worn_out = await create_job(1, "tiny", b"audio", "audio/wav")
+        await set_job(worn_out.id, status=RUNNING, attempts=3, updated_at=long_ago)
+        expired = await create_job(1, "tiny", b"audio", "audio/wav")
+        await set_job(expired.id, status=DONE, finished_at=long_ago)
+
+        await queue.recover()
+
+        assert (await get_job(stale.id, 1)).status == QUEUED
+        assert (await get_job(fresh.id, 1)).status == RUNNING
+        async with SessionLocal() as session:
+            job = await session.get(TranscriptionJob, worn_out.id)
+        assert job.status == FAILED and job.audio is None
+        assert await get_job(expired.id, 1) is None
+
+    run_db(run)
+
+
+def test_superseded_run_records_and_charges_nothing(run_db):
+    async def run():
+        async def charge(session, job, result):
+            await increment_usage(session, job.user_id, get_week_start(), result["words"])
+            return result
+
+        async def process(job, report):
+            # Meanwhile the job is requeued and claimed by another worker
+            await set_job(job.id, attempts=job.attempts + 1)
+            return {"text": "hola", "words": 1}
+
+        queue = JobQueue(process, finish=charge)
+        job = await create_job(1, "tiny", b"audio", "audio/wav")
+        claimed = await queue._claim()
+        assert claimed.id == job.id and claimed.attempts == 1
+        await queue._run(claimed)
+
+        job = await get_job(job.id, 1)
+        assert job.status == RUNNING and job.result is None
+        assert queue.stats()["completed"] == 0
+        async with SessionLocal() as session:
+            assert await read_usage(session, 1, get_week_start()) == 0
+
+    run_db(run)
+
+
+def test_completed_run_is_charged_once(run_db):
+    async def run():
+        async def charge(session, job, result):
+            total = await increment_usage(session, job.user_id, get_week_start(), result["words"])
+            return {**result, "words_used_this_week": total}
+
+        async def process(job, report):
+            return {"text": "hola mundo", "words": 2}
+
+        queue = JobQueue(process, finish=charge)
+        job = await create_job(1, "tiny", b"audio", "audio/wav")
+        claimed = await queue._claim()
+        await queue._run(claimed)
+        # A second, late completion of the same attempt is ignored
+        await queue._run(claimed)
+
+        job = await get_job(job.id, 1)
+        assert job.status == DONE
+        assert job.result["words_used_this_week"] == 2
+        assert queue.stats()["completed"] == 1
+        async with SessionLocal() as session:
+            assert await read_usage(session, 1, get_week_start()) == 2
+
+    run_db(run)
@@ -0,0 +1,29 @@
+import pytest
+
+# The desktop client's input libraries need a display; skip where they
+# aren't installed (e.g. on the server)
+pytest.importorskip("pynput")
+pytest.importorskip("pyautogui")
+
+from engine.keyboard import PASTE_MIN_CHARS, KeyboardController
+
+
+@pytest.fixture
+def controller():
+    # choose_strategy needs no listener
+    return KeyboardController.__new__(KeyboardController)
+
+
+def test_short_ascii_is_typed(controller):
+    assert controller.choose_strategy("Hi there") == "type"
+    assert controller.choose_strategy("ok, 42!") == "type"
+
+
+def test_long_text_is_pasted(controller):
+    assert controller.choose_strategy("a" * PASTE_MIN_CHARS) == "paste"
+    assert controller.choose_strategy("a" * (PASTE_MIN_CHARS - 1)) == "type"
+
+
+def test_untypeable_characters_are_pasted(controller):
+    assert controller.choose_strategy("¿Qué tal?") == "paste"
+    assert controller.choose_strategy("año") == "paste"
@@ -0,0 +1,90 @@
+import numpy as np
+
+from engine.long_audio import _drop_repeat, plan_chunks, stitch, stitch_piece, text_of
+
+SR = 16000
+
+
+def segment(start, end, text):
+    return {"start": start, "end": end, "text": text}
+
+
+def test_short_audio_is_a_single_chunk():
+    audio = np.ones(10 * SR, dtype=np.float32)
+    assert plan_chunks(audio, chunk_s=28, overlap_s=1) == [(0, 10 * SR, 0, 10 * SR)]
+
+
+def test_cuts_fall_in_pauses_and_overlap():
+    rng = np.random.default_rng(0)
+    audio = rng.standard_normal(70 * SR).astype(np.float32)
+    # Quiet stretches just before each 28 s boundary
+    audio[int(25 * SR):int(25.5 * SR)] = 0
+    audio[int(52 * SR):int(52.5 * SR)] = 0
+    chunks = plan_chunks(audio, chunk_s=28, overlap_s=1)
+    assert len(chunks) == 3
+    cuts = [own_to for _, _, _, own_to in chunks[:-1]]
+    assert 25 * SR <= cuts[0] < 25.5 * SR
+    assert 52 * SR <= cuts[1] < 52.5 * SR
+    for (start, end, own_from, own_to), nxt in zip(chunks, chunks[1:]):
+        assert nxt[2] == own_to
+        assert end == own_to + SR and nxt[0] == own_to - SR
+    assert chunks[0][0] == 0 and chunks[-1][1] == len(audio)
+
+
+def test_stitch_single_chunk():
+    chunks = [(0, 10 * SR, 0, 10 * SR)]
+    segments = [segment(0.0, 2.0, "hola"), segment(2.0, 4.0, "mundo")]
+    assert stitch(chunks, [segments]) == segments
+
+
+def test_stitch_offsets_and_ownership():
+    # Second piece starts 1 s before the cut at 10 s
+    chunks = [(0, 11 * SR, 0, 10 * SR), (9 * SR, 20 * SR, 10 * SR, 20 * SR)]
+    first = [segment(0.0, 5.0, "uno"), segment(9.5, 10.8, "dos")]
+    # "dos" again (its midpoint is owned by the first piece), then new text
+    second = [segment(0.5, 1.8, "dos"), segment(2.0, 6.0, "tres")]
+    merged = stitch(chunks, [first, second])
+    assert text_of(merged) == "uno dos tres"
+    assert merged[-1]["start"] == 11.0 and merged[-1]["end"] == 15.0
+
+
+def test_stitch_drops_words_repeated_across_the_seam():
+    chunks = [(0, 11 * SR, 0, 10 * SR), (9 * SR, 20 * SR, 10 * SR, 20 * SR)]
+    first = [segment(0.0, 9.0, "esto es una prueba")]
+    second = [segment(1.5, 5.0, "Prueba, de audio largo")]
+    assert text_of(stitch(chunks, [first, second])) == "esto es una prueba de audio largo"
+
+
+def test_stitch_skips_empty_pieces():
+    chunks = [
+        (0, 11 * SR, 0, 10 * SR),
+        (9 * SR, 21 * SR, 10 * SR, 20 * SR),
+        (19 * SR, 30 * SR, 20 * SR, 30 * SR),
+    ]
+    first = [segment(0.0, 9.0, "antes")]
+    third = [segment(2.0, 5.0, "despues")]
+    merged = stitch(chunks, [first, [], third])
+    assert text_of(merged) == "antes despues"
+    # A piece that was nothing but the repeated words leaves no segment
+    assert text_of(stitch(chunks[:2], [first, [segment(1.5, 3.0, "antes")]])) == "antes"
+
+
+def test_stitch_piece_by_piece():
+    chunks = [(0, 11 * SR, 0, 10 * SR), (9 * SR, 20 * SR, 10 * SR, 20 * SR)]
+    first = [segment(0.0, 9.0, "esto es una prueba"), segment(9.5, 10.8, "de")]
+    second = [segment(0.5, 1.8, "de"), segment(1.9, 5.0, "audio largo")]
+    merged = []
+    # "de" belongs to the second piece, which owns its midpoint
+    assert text_of(stitch_piece(chunks, 0, first, merged)) == "esto es una prueba"
+    # Each piece returns only what it added
+    assert text_of(stitch_piece(chunks, 1, second, merged)) == "de audio largo"
+    assert merged == stitch(chunks, [first, second])
+
+
+def test_drop_repeat():
+    assert _drop_repeat("uno dos tres", "tres cuatro") == "cuatro"
+    assert _drop_repeat("uno dos tres", "dos tres cuatro") == "cuatro"
+    # Only a prefix that matches the end of the previous text is dropped
+    assert _drop_repeat("uno dos tres", "cuatro tres") == "cuatro tres"
+    assert _drop_repeat("", "hola") == "hola"
+    assert _drop_repeat("hola", "") == ""
@@ -0,0 +1,56 @@
+from metrics import StatsGauges
+
+
+def test_stats_gauges_label_item_names():
+    stats = {
+        "models": {
+            "large-v3": {"loaded": True, "memory_mb": 3000.0, "compute_type": "int8"},
+            "tiny": {"loaded": False},
+        },
+        "resident_mb": 3000.0,
+    }
+    gauges = StatsGauges("vox_models", lambda: stats, labels={"models": "model"})
+    assert list(gauges.render()) == [
+        "# TYPE vox_models_loaded gauge",
+        'vox_models_loaded{model="large-v3"} 1.0',
+        'vox_models_loaded{model="tiny"} 0.0',
+        "# TYPE vox_models_memory_mb gauge",
+        'vox_models_memory_mb{model="large-v3"} 3000.0',
+        "# TYPE vox_models_resident_mb gauge",
+        "vox_models_resident_mb 3000.0",
+    ]
+
+
+def test_stats_gauges_nested_labels_and_names():
+    stats = {
+        "sidecars": {
+            "sidecar0": {
+                "socket": "/tmp/s0",
+                # Not a map of per-model dicts: stays part of the name
+                "models": {"models": {"tiny": {"loaded": True}}, "evictions": 2},
+                "pool": {"queued": 1},
+            },
+            "sidecar1": {"socket": "/tmp/s1", "error": "refused"},
+        },
+        "hit-rate": 0.5,
+    }
+    gauges = StatsGauges(
+        "vox_models", lambda: stats, labels={"sidecars": "sidecar", "models": "model"}
+    )
+    assert list(gauges.render()) == [
+        "# TYPE vox_models_models_loaded gauge",
+        'vox_models_models_loaded{sidecar="sidecar0",model="tiny"} 1.0',
+        "# TYPE vox_models_models_evictions gauge",
+        'vox_models_models_evictions{sidecar="sidecar0"} 2.0',
+        "# TYPE vox_models_pool_queued gauge",
+        'vox_models_pool_queued{sidecar="sidecar0"} 1.0',
+        "# TYPE vox_models_hit_rate gauge",
+        "vox_models_hit_rate 0.5",
+    ]
+
+
+def test_stats_gauges_skip_failing_stats():
+    def broken():
+        raise RuntimeError("down")
+
+    assert list(StatsGauges("vox_x", broken).render()) == []
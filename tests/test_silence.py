@@ -0,0 +1,50 @@
+import numpy as np
+
+from engine.silence import trim_silence
+
+SR = 16000
+
+
+def tone(seconds):
+    t = np.arange(int(seconds * SR)) / SR
+    return (0.3 * np.sin(2 * np.pi * 220 * t)).astype(np.float32)
+
+
+def silence(seconds):
+    return np.zeros(int(seconds * SR), dtype=np.float32)
+
+
+def test_trims_edges_down_to_the_pad():
+    audio = np.concatenate([silence(2), tone(1), silence(2)])
+    trimmed = trim_silence(audio, SR, pad_ms=240)
+    # 1 s of speech plus 240 ms of pad on each side, to the frame
+    assert abs(len(trimmed) / SR - 1.48) < 0.031
+
+
+def test_shortens_long_pauses():
+    audio = np.concatenate([tone(1), silence(3), tone(1)])
+    trimmed = trim_silence(audio, SR, pad_ms=0, max_pause_ms=600)
+    assert abs(len(trimmed) / SR - 2.6) < 0.061
+    # Short pauses are left alone
+    audio = np.concatenate([tone(1), silence(0.3), tone(1)])
+    assert len(trim_silence(audio, SR, pad_ms=0, max_pause_ms=600)) == len(audio)
+
+
+def test_keeps_the_trailing_partial_frame():
+    # 2.3 s of speech isn't a whole number of 30 ms frames
+    audio = np.concatenate([tone(1), silence(3), tone(1.3)])
+    assert len(audio) % 480
+    trimmed = trim_silence(audio, SR, pad_ms=0, max_pause_ms=600)
+    np.testing.assert_array_equal(trimmed[-1000:], audio[-1000:])
+    # Same without pause shortening
+    audio = np.concatenate([silence(1), tone(1.3)])
+    np.testing.assert_array_equal(trim_silence(audio, SR)[-1000:], audio[-1000:])
+
+
+def test_silence_only_is_empty():
+    assert len(trim_silence(silence(2), SR)) == 0
+
+
+def test_shorter_than_a_frame_is_returned_as_is():
+    audio = tone(0.01)
+    assert trim_silence(audio, SR) is audio
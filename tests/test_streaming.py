@@ -0,0 +1,73 @@
+import numpy as np
+import pytest
+
+from engine.streaming import StreamingSession, SAMPLE_RATE
+
+
+def pcm(seconds, dtype="int16"):
+    return np.zeros(int(seconds * SAMPLE_RATE), dtype=dtype).tobytes()
+
+
+def segment(start, end, text):
+    return {"start": start, "end": end, "text": text}
+
+
+def test_feed_keeps_partial_samples_for_the_next_frame():
+    session = StreamingSession(dtype="int16")
+    data = pcm(1)
+    session.feed(data[:3])
+    session.feed(data[3:])
+    assert session.uncommitted == 1.0
+
+
+def test_decodes_every_step():
+    session = StreamingSession(dtype="int16", step_s=1.0)
+    session.feed(pcm(0.5))
+    assert not session.should_decode()
+    session.feed(pcm(0.5))
+    assert session.should_decode()
+    session.window()
+    assert not session.should_decode()
+
+
+def test_short_window_is_only_partial():
+    session = StreamingSession(dtype="int16", max_window_s=10)
+    session.feed(pcm(4))
+    session.window()
+    done, partial = session.update([segment(0, 2, "hola"), segment(2, 4, "mundo")])
+    assert done == []
+    assert partial == "hola mundo"
+    assert session.committed == []
+
+
+def test_long_window_commits_all_but_the_last_segment():
+    session = StreamingSession(dtype="int16", max_window_s=10)
+    session.feed(pcm(12))
+    session.window()
+    done, partial = session.update([segment(0, 5, "uno"), segment(5, 9, "dos"), segment(9, 12, "tres")])
+    assert [s["text"] for s in done] == ["uno", "dos"]
+    assert partial == "tres"
+    # Audio before the tail segment is dropped; times stay in stream time
+    assert session.offset == 9.0
+    assert session.uncommitted == 3.0
+
+    session.feed(pcm(1))
+    session.window()
+    done, _ = session.update([segment(0, 4, "tres cuatro")], final=True)
+    assert done == [segment(9.0, 13.0, "tres cuatro")]
+    assert session.text() == "uno dos tres cuatro"
+
+
+def test_commits_everything_after_a_long_stretch_without_boundaries():
+    session = StreamingSession(dtype="int16", max_window_s=5)
+    session.feed(pcm(11))
+    session.window()
+    done, partial = session.update([segment(0, 11, "largo")])
+    assert [s["text"] for s in done] == ["largo"]
+    assert partial == ""
+    assert session.uncommitted == 0
+
+
+def test_rejects_unknown_dtype():
+    with pytest.raises(ValueError):
+        StreamingSession(dtype="int8")
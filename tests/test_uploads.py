@@ -0,0 +1,67 @@
+import numpy as np
+import pytest
+
+from engine import uploads
+from engine.uploads import ChunkOutOfOrder, TooManyUploads, UploadStore, trim_pcm
+
+SR = 16000
+
+
+def pcm(samples):
+    return (np.clip(samples, -1, 1) * 32767).astype("<i2").tobytes()
+
+
+def test_chunks_in_order_and_retries():
+    store = UploadStore()
+    upload = store.create(1, "tiny", "accurate")
+    assert upload.append(0, b"ab")
+    # A retried chunk is ignored, a gap is refused
+    assert not upload.append(0, b"ab")
+    with pytest.raises(ChunkOutOfOrder) as e:
+        upload.append(2, b"cd")
+    assert e.value.expected == 1
+    assert upload.append(1, b"cd")
+    assert bytes(upload.data) == b"abcd"
+
+
+def test_uploads_belong_to_their_user():
+    store = UploadStore()
+    upload = store.create(1, "tiny", "accurate")
+    assert store.get(upload.id, 1) is upload
+    assert store.get(upload.id, 2) is None
+
+
+def test_per_user_limit_counts_open_uploads():
+    store = UploadStore(max_per_user=2)
+    first = store.create(1, "tiny", "accurate")
+    store.create(1, "tiny", "accurate")
+    with pytest.raises(TooManyUploads):
+        store.create(1, "tiny", "accurate")
+    # Other users have their own allowance
+    store.create(2, "tiny", "accurate")
+    # Finalized uploads (kept for retried finalize calls) don't count
+    first.result = {"text": ""}
+    store.create(1, "tiny", "accurate")
+    store.discard(first.id)
+    assert store.stats()["open"] == 3
+
+
+def test_idle_uploads_expire(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(uploads.time, "monotonic", lambda: now[0])
+    store = UploadStore(ttl=120, max_per_user=1)
+    upload = store.create(1, "tiny", "accurate")
+    now[0] += 121
+    assert store.get(upload.id, 1) is None
+    store.create(1, "tiny", "accurate")
+
+
+def test_trim_pcm():
+    t = np.arange(SR) / SR
+    tone = 0.3 * np.sin(2 * np.pi * 220 * t)
+    audio = np.concatenate([np.zeros(2 * SR), tone, np.zeros(3 * SR), tone, np.zeros(2 * SR)])
+    trimmed = trim_pcm(pcm(audio), max_pause_ms=600)
+    # Two 1 s tones, one 600 ms pause, two 250 ms pads
+    assert abs(len(trimmed) / 2 / SR - 3.1) < 0.07
+    silence = pcm(np.zeros(SR))
+    assert trim_pcm(silence) == silence
@@ -0,0 +1,102 @@
+from datetime import date, timedelta
+
+from sqlalchemy import text
+
+import usage
+from db import SessionLocal, engine
+from usage import UsageCounter, ensure_usage_index, read_usage, record_reports
+
+
+def test_write_through_add(run_db):
+    async def run():
+        counter = UsageCounter()
+        assert await counter.current(1) == 0
+        assert await counter.add(1, 5) == 5
+        assert await counter.add(1, 3) == 8
+        async with SessionLocal() as session:
+            assert await read_usage(session, 1, usage.get_week_start()) == 8
+
+    run_db(run)
+
+
+def test_batched_add_is_written_on_flush(run_db):
+    async def run():
+        counter = UsageCounter(flush_ms=1000)
+        assert await counter.add(1, 4) == 4
+        async with SessionLocal() as session:
+            assert await read_usage(session, 1, usage.get_week_start()) == 0
+        await counter.flush()
+        async with SessionLocal() as session:
+            assert await read_usage(session, 1, usage.get_week_start()) == 4
+        assert counter.stats()["pending_words"] == 0
+
+    run_db(run)
+
+
+def test_current_rereads_words_charged_elsewhere(run_db):
+    async def run():
+        here = UsageCounter(ttl_s=60)
+        other = UsageCounter()
+        assert await here.current(1) == 0
+        await other.add(1, 10)
+        # Still cached
+        assert await here.current(1) == 0
+        here.ttl_s = 0
+        assert await here.current(1) == 10
+
+    run_db(run)
+
+
+def test_old_weeks_are_pruned_in_write_through_mode(run_db, monkeypatch):
+    async def run():
+        week = usage.get_week_start()
+        counter = UsageCounter()
+        await counter.add(1, 2)
+        monkeypatch.setattr(usage, "get_week_start", lambda: week + timedelta(days=7))
+        assert await counter.current(2) == 0
+        assert counter.stats()["cached_counters"] == 1
+        # The new week starts from zero
+        assert await counter.current(1) == 0
+
+    run_db(run)
+
+
+def test_ensure_usage_index_merges_duplicates(run_db):
+    async def run():
+        week = date(2024, 1, 1)
+        async with engine.begin() as conn:
+            await conn.execute(text("DROP INDEX uq_weekly_usage_user_week"))
+            for words in (3, 4):
+                await conn.execute(
+                    text("INSERT INTO weekly_usage (user_id, week_start, words_used) VALUES (1, :w, :n)"),
+                    {"w": week, "n": words},
+                )
+        await ensure_usage_index()
+        # Running again (another worker starting) is a no-op
+        await ensure_usage_index()
+        async with SessionLocal() as session:
+            assert await read_usage(session, 1, week) == 7
+            rows = await session.execute(text("SELECT COUNT(*) FROM weekly_usage"))
+            assert rows.scalar_one() == 1
+
+    run_db(run)
+
+
+def test_record_reports_charges_each_id_once(run_db):
+    async def run():
+        async with SessionLocal() as session:
+            assert await record_reports(session, 1, {"a": 5, "b": 3}, keep_s=3600) == (8, 2)
+            await session.commit()
+        async with SessionLocal() as session:
+            # A resent batch with one new report
+            assert await record_reports(session, 1, {"a": 5, "b": 3, "c": 2}, keep_s=3600) == (2, 1)
+            # Report ids are per user
+            assert await record_reports(session, 2, {"a": 5}, keep_s=3600) == (5, 1)
+            await session.rollback()
+        async with SessionLocal() as session:
+            # Rolled back with the transaction, so still new
+            assert await record_reports(session, 1, {"c": 2}, keep_s=3600) == (2, 1)
+            # Reports older than keep_s are forgotten
+            assert await record_reports(session, 1, {"a": 5}, keep_s=-1) == (5, 1)
+
+    run_db(run)
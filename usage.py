@@ -0,0 +1,243 @@
+import asyncio
+import time
+from datetime import date, timedelta
+from sqlalchemy import delete, func, inspect, select, text
+from sqlalchemy.exc import DBAPIError
+from db import SessionLocal, engine
+from models import ReportedUsage, WeeklyUsage, utcnow
+
+
+def get_week_start() -> date:
+    today = date.today()
+    return today - timedelta(days=today.weekday())
+
+
+def _insert():
+    if engine.dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif engine.dialect.name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        raise RuntimeError(f"Usage upsert not supported on {engine.dialect.name}")
+    return insert
+
+
+async def increment_usage(session, user_id: int, week_start: date, words: int) -> int:
+    """Adds words to the (user, week) row in one statement, creating it if
+    needed, and returns the new total."""
+    stmt = _insert()(WeeklyUsage).values(
+        user_id=user_id, week_start=week_start, words_used=words
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["user_id", "week_start"],
+        set_={"words_used": func.coalesce(WeeklyUsage.words_used, 0) + stmt.excluded.words_used},
+    ).returning(WeeklyUsage.words_used)
+    result = await session.execute(stmt)
+    return result.scalar_one()
+
+
+async def read_usage(session, user_id: int, week_start: date) -> int:
+    result = await session.execute(
+        select(WeeklyUsage.words_used).where(
+            WeeklyUsage.user_id == user_id,
+            WeeklyUsage.week_start == week_start,
+        )
+    )
+    return result.scalar_one_or_none() or 0
+
+
+async def record_reports(session, user_id: int, reports: dict[str, int], keep_s: float) -> tuple[int, int]:
+    """Records POST /usage reports (report id -> words) for the user and
+    returns (words, count) of those not recorded before. Charge the words
+    in the same transaction, so a report is charged exactly when it is
+    recorded. Reports older than keep_s are forgotten."""
+    await session.execute(
+        delete(ReportedUsage).where(
+            ReportedUsage.user_id == user_id,
+            ReportedUsage.created_at < utcnow() - timedelta(seconds=keep_s),
+        )
+    )
+    if not reports:
+        return 0, 0
+    stmt = _insert()(ReportedUsage).values([
+        {"user_id": user_id, "report_id": report_id, "words": words, "created_at": utcnow()}
+        for report_id, words in reports.items()
+    ])
+    stmt = stmt.on_conflict_do_nothing(
+        index_elements=["user_id", "report_id"]
+    ).returning(ReportedUsage.words)
+    words = (await session.execute(stmt)).scalars().all()
+    return sum(words), len(words)
+
+
+async def _has_usage_index(conn) -> bool:
+    return await conn.run_sync(
+        lambda sync_conn: any(
+            index["name"] == "uq_weekly_usage_user_week"
+            for index in inspect(sync_conn).get_indexes("weekly_usage")
+        )
+    )
+
+
+async def ensure_usage_index():
+    # Tables created before the unique (user_id, week_start) index may hold
+    # duplicate rows from the old read-modify-write path; merge them first.
+    try:
+        async with engine.begin() as conn:
+            if await _has_usage_index(conn):
+                return
+            await _merge_and_index(conn)
+    except DBAPIError:
+        # Workers starting together race to create the index; losing the
+        # race is fine as long as somebody won it
+        async with engine.connect() as conn:
+            if not await _has_usage_index(conn):
+                raise
+
+
+async def _merge_and_index(conn):
+    await conn.execute(text("""
+        UPDATE weekly_usage SET words_used = (
+            SELECT SUM(COALESCE(w.words_used, 0)) FROM weekly_usage w
+            WHERE w.user_id = weekly_usage.user_id AND w.week_start = weekly_usage.week_start
+        )
+        WHERE id IN (
+            SELECT MIN(id) FROM weekly_usage GROUP BY user_id, week_start HAVING COUNT(*) > 1
+        )
+    """))
+    await conn.execute(text("""
+        DELETE FROM weekly_usage WHERE id NOT IN (
+            SELECT MIN(id) FROM weekly_usage GROUP BY user_id, week_start
+        )
+    """))
+    await conn.execute(text(
+        "CREATE UNIQUE INDEX IF NOT EXISTS uq_weekly_usage_user_week ON weekly_usage (user_id, week_start)"
+    ))
+
+
+class UsageCounter:
+    """Weekly word counts served from memory.
+
+    current() answers from memory and re-reads a user's count from the DB
+    once it is older than ttl_s, so words charged by other workers show
+    up within a few seconds. add() bumps the in-memory count; with
+    flush_ms > 0 the increments are batched and written every flush_ms
+    milliseconds by a background task (a crash loses at most one
+    interval), otherwise each add() is written through immediately.
+    Writes are atomic upserts, so several workers can count concurrently;
+    each flush re-syncs this worker's counters with the DB totals.
+    Only used from the event loop.
+    """
+
+    def __init__(self, flush_ms: int = 0, ttl_s: float = 5.0):
+        self.flush_ms = flush_ms
+        self.ttl_s = ttl_s
+        self._counts: dict[tuple[int, date], int] = {}
+        # key -> monotonic time the count was last synced with the DB
+        self._synced: dict[tuple[int, date], float] = {}
+        self._pending: dict[tuple[int, date], int] = {}
+        self._week = get_week_start()
+        self._task: asyncio.Task | None = None
+        self.flushes = 0
+
+    async def current(self, user_id: int) -> int:
+        self._roll_week()
+        key = (user_id, self._week)
+        synced = self._synced.get(key)
+        if synced is None or time.monotonic() - synced > self.ttl_s:
+            async with SessionLocal() as session:
+                used = await read_usage(session, *key)
+            # Words added while reading, or not flushed yet, aren't in `used`
+            self._sync(key, used + self._pending.get(key, 0))
+        return self._counts[key]
+
+    def _sync(self, key, total: int):
+        # Totals only grow; a slower concurrent read mustn't lower it
+        self._counts[key] = max(self._counts.get(key, 0), total)
+        self._synced[key] = time.monotonic()
+
+    def _roll_week(self):
+        # Drops last week's counters once a new week starts; unflushed
+        # ones stay until their increments are written
+        week = get_week_start()
+        if week == self._week:
+            return
+        self._week = week
+        for key in [k for k in self._counts if k[1] != self._week and k not in self._pending]:
+            del self._counts[key]
+            self._synced.pop(key, None)
+
+    def invalidate(self, user_id: int):
+        # Words were charged outside add() (finished jobs, POST /usage); re-read
+        # the count on the next current()
+        self._synced.pop((user_id, self._week), None)
+
+    async def add(self, user_id: int, words: int) -> int:
+        key = (user_id, get_week_start())
+        await self.current(user_id)
+        if not words:
+            return self._counts[key]
+
+        if self.flush_ms <= 0:
+            async with SessionLocal() as session:
+                total = await increment_usage(session, *key, words)
+                await session.commit()
+            self._sync(key, total)
+            return self._counts[key]
+
+        self._pending[key] = self._pending.get(key, 0) + words
+        self._counts[key] += words
+        return self._counts[key]
+
+    async def flush(self):
+        self._roll_week()
+        if not self._pending:
+            return
+        pending, self._pending = self._pending, {}
+        try:
+            async with SessionLocal() as session:
+                totals = {
+                    key: await increment_usage(session, *key, words)
+                    for key, words in pending.items()
+                }
+                await session.commit()
+        except BaseException:
+            # Keep the increments for the next attempt (also on cancel)
+            for key, words in pending.items():
+                self._pending[key] = self._pending.get(key, 0) + words
+            raise
+        self.flushes += 1
+        for key, total in totals.items():
+            self._counts[key] = total + self._pending.get(key, 0)
+            self._synced[key] = time.monotonic()
+
+    async def _flush_loop(self):
+        while True:
+            await asyncio.sleep(self.flush_ms / 1000)
+            try:
+                await self.flush()
+            except Exception as e:
+                print(f"Usage flush failed: {e}")
+
+    def start(self):
+        if self.flush_ms > 0 and self._task is None:
+            self._task = asyncio.create_task(self._flush_loop())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    def stats(self) -> dict:
+        return {
+            "flush_ms": self.flush_ms,
+            "cached_counters": len(self._counts),
+            "pending_users": len(self._pending),
+            "pending_words": sum(self._pending.values()),
+            "flushes": self.flushes,
+        }
@@ -17,12 +17,16 @@ a = Analysis(
         'pynput.mouse._darwin',
         'customtkinter',
         'requests',
+        'pyperclip',
         'sounddevice',
         'scipy.io.wavfile',
+        'soundfile',
     ],
     hookspath=[],
     hooksconfig={},
     runtime_hooks=[],
+    # The app transcribes on the server (VOX_INFERENCE=server); on-device
+    # modes need these and only work when running from source
     excludes=['faster_whisper', 'ctranslate2', 'onnxruntime', 'torch', 'whisper'],
     noarchive=False,
 )
@@ -0,0 +1,104 @@
+import asyncio
+import math
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+class PoolSaturated(Exception):
+    def __init__(self, retry_after: int):
+        super().__init__(f"Pool saturated, retry after {retry_after}s")
+        self.retry_after = retry_after
+
+
+class WorkerPool:
+    """Bounded thread pool for blocking work called from async handlers.
+
+    At most `workers` jobs run at once and at most `queue_depth` more wait
+    for a free thread; anything beyond that is rejected with PoolSaturated
+    so callers can answer 503 instead of piling requests up.
+    Admission bookkeeping only happens on the event loop thread, so it
+    needs no locking.
+    """
+
+    def __init__(self, name: str, workers: int = 1, queue_depth: int = 4):
+        self.name = name
+        self.workers = max(1, workers)
+        self.queue_depth = max(0, queue_depth)
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.workers, thread_name_prefix=name
+        )
+        self._in_flight = 0
+        self._running = 0
+        self._completed = 0
+        self._rejected = 0
+        # Moving average of job duration, used for Retry-After
+        self._avg_run_s = 1.0
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    @property
+    def queued(self) -> int:
+        return self._in_flight - self._running
+
+    def retry_after(self) -> int:
+        waves = (self.queued + 1) / self.workers
+        return max(1, math.ceil(waves * self._avg_run_s))
+
+    async def run(self, fn, *args, **kwargs):
+        """Run fn in the pool. Returns (result, timing) where timing holds
+        queue_ms and run_ms for this job."""
+        if self._in_flight >= self.workers + self.queue_depth:
+            self._rejected += 1
+            raise PoolSaturated(self.retry_after())
+
+        self._in_flight += 1
+        loop = asyncio.get_running_loop()
+        submitted = time.perf_counter()
+        marks = {}
+
+        def job():
+            marks["started"] = time.perf_counter()
+            loop.call_soon_threadsafe(self._job_started)
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                marks["finished"] = time.perf_counter()
+
+        # Accounting follows the job, not the caller: a cancelled request
+        # keeps its slot until the thread actually finishes.
+        future = self._executor.submit(job)
+        future.add_done_callback(
+            lambda _: loop.call_soon_threadsafe(self._job_done, marks)
+        )
+        result = await asyncio.wrap_future(future)
+        return result, {
+            "queue_ms": round((marks["started"] - submitted) * 1000, 1),
+            "run_ms": round((marks["finished"] - marks["started"]) * 1000, 1),
+        }
+
+    def _job_started(self):
+        self._running += 1
+
+    def _job_done(self, marks: dict):
+        self._in_flight -= 1
+        if "started" in marks:
+            self._running -= 1
+            self._completed += 1
+            run_s = marks["finished"] - marks["started"]
+            self._avg_run_s = 0.8 * self._avg_run_s + 0.2 * run_s
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "queue_depth": self.queue_depth,
+            "running": self._running,
+            "queued": self.queued,
+            "completed": self._completed,
+            "rejected": self._rejected,
+            "avg_run_ms": round(self._avg_run_s * 1000, 1),
+        }
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)